@@ -2,9 +2,8 @@ from fastapi import APIRouter, HTTPException
 from typing import List
 from ..models.task import Task, TaskStatus
 from ..models.result import Result
-from ..services.redis_service import RedisService
-from ..services.mongodb_service import MongoDBService
-from ..services.crawl_service import CrawlService
+from ..services.container import get_container
+from ..services.metrics import metrics
 from pydantic import BaseModel
 import logging
 
@@ -13,11 +12,6 @@ logger = logging.getLogger(__name__)
 # Khởi tạo router
 router = APIRouter()
 
-# Khởi tạo các services
-redis_service = RedisService()
-mongodb_service = MongoDBService()
-crawl_service = CrawlService()
-
 class CrawlRequest(BaseModel):
     userId: str
     topic: str
@@ -37,6 +31,7 @@ class CrawlStatusResponse(BaseModel):
     taskId: str
     status: str
     resultIds: List[str]
+    topics: List[str] = []
 
 class ResultResponse(BaseModel):
     resultId: str
@@ -48,12 +43,12 @@ class ResultResponse(BaseModel):
 @router.get("/data/suggestions")
 async def get_popular_topics():
     """Lấy danh sách chủ đề phổ biến"""
-    return await redis_service.get_popular_topics_from_redis()
+    return await get_container().redis_service.get_popular_topics_from_redis()
 
 @router.post("/data/crawl", response_model=CrawlResponse)
 async def crawl_data(request: CrawlRequest):
     """Tạo task crawl mới"""
-    return await crawl_service.create_crawl_task(
+    return await get_container().crawl_service.create_crawl_task(
         userId=request.userId,
         topic=request.topic,
         sources=request.sources,
@@ -67,20 +62,21 @@ async def crawl_data(request: CrawlRequest):
 @router.get("/data/status/{task_id}", response_model=CrawlStatusResponse)
 async def get_crawl_status(task_id: str):
     """Lấy trạng thái của task"""
-    task = await mongodb_service.get_task(task_id)
+    task = await get_container().mongodb_service.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     return CrawlStatusResponse(
         taskId=task_id,
         status=task["status"],
-        resultIds=task.get("result_ids", [])
+        resultIds=task.get("result_ids", []),
+        topics=task.get("topics", [])
     )
 
 @router.get("/data/result/{result_id}", response_model=ResultResponse)
 async def get_result(result_id: str):
     """Lấy kết quả crawl theo ID"""
-    result = await mongodb_service.get_result(result_id)
+    result = await get_container().mongodb_service.get_result(result_id)
     if not result:
         raise HTTPException(status_code=404, detail="Result not found")
     
@@ -90,4 +86,26 @@ async def get_result(result_id: str):
         source=result["source"],
         language=result["language"],
         text=result["text"]
-    ) 
\ No newline at end of file
+    )
+
+@router.get("/data/metrics")
+async def get_metrics():
+    """Lấy số liệu cache (hit/miss/latency theo từng tầng) và các bộ đếm khác"""
+    snapshot = metrics.snapshot()
+    # Hit vào nội dung do worker làm ấm cache nạp trước được tính riêng với hit thông thường
+    snapshot["cache_hit_ratio"] = {
+        tier: metrics.ratio(f"cache.{tier}.hit", f"cache.{tier}.warm_hit", f"cache.{tier}.miss")
+        for tier in ("redis", "mongodb")
+    }
+    snapshot["cache_warm_hit_ratio"] = {
+        tier: metrics.ratio(f"cache.{tier}.warm_hit", f"cache.{tier}.hit", f"cache.{tier}.miss")
+        for tier in ("redis", "mongodb")
+    }
+    snapshot["gemini_cache_hit_ratio"] = {
+        tier: metrics.ratio(f"gemini.cache.{tier}.hit", f"gemini.cache.{tier}.miss")
+        for tier in ("local", "redis")
+    }
+    container = get_container()
+    snapshot["pools"] = container.pool_stats()
+    snapshot["consumer_workers"] = container.rabbitmq_service.consumer_stats()
+    return snapshot
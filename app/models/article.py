@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import Iterable, List, Optional
+import hashlib
+
+class ArticleRecord(BaseModel):
+    """Bài báo khoa học đã chuẩn hóa từ các nguồn (Nature, PubMed)"""
+    source: str
+    title: str
+    abstract: str
+    doi: Optional[str] = None
+    url: Optional[str] = None
+    journal: Optional[str] = None
+    published: Optional[str] = None
+    authors: List[str] = Field(default_factory=list)
+
+    def to_text(self) -> str:
+        """Nội dung dạng text (cùng định dạng với các file trong nature_results)"""
+        return f"Title: {self.title}\nDOI: {self.doi or 'N/A'}\nAbstract: {self.abstract}\n"
+
+    def metadata(self) -> dict:
+        """Thông tin của bài báo (không kèm abstract) để lưu cùng kết quả"""
+        return self.dict(exclude={"abstract"})
+
+def records_to_text(records: List[ArticleRecord]) -> str:
+    """Ghép nhiều bài báo thành nội dung của một kết quả"""
+    return "\n".join(record.to_text() for record in records)
+
+def fingerprint(keys: Iterable[str]) -> str:
+    """Dấu vân tay của danh sách kết quả (theo thứ tự), dùng để biết kết quả tìm kiếm có thay đổi"""
+    return hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()
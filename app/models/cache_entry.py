@@ -0,0 +1,97 @@
+from datetime import datetime, UTC
+from pydantic import BaseModel, Field
+from typing import Optional
+import base64
+import hashlib
+import json
+
+# Tăng version khi thay đổi cấu trúc entry; entry khác version được coi là cache miss
+CACHE_SCHEMA_VERSION = 1
+
+def topic_cache_key(topic: str, language: str, source: str = "wikipedia") -> str:
+    """Key Redis chứa nội dung của một chủ đề (key của Wikipedia giữ định dạng cũ)"""
+    if source == "wikipedia":
+        return f"topic: {topic}, language: {language}"
+    return f"topic: {topic}, language: {language}, source: {source}"
+
+def content_hash(text: str) -> str:
+    """Hash SHA-256 của nội dung"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class TopicCacheEntry(BaseModel):
+    """Entry cache nội dung chủ đề, dùng chung cho mọi nơi đọc/ghi Redis"""
+    version: int = CACHE_SCHEMA_VERSION
+    result_id: str
+    topic: str
+    source: str
+    language: str
+    text: str
+    content_hash: str
+    cached_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    # Lần cuối nội dung được lấy hoặc xác nhận còn đúng với upstream (None: dùng cached_at)
+    validated_at: Optional[datetime] = None
+    # Thông tin cho request có điều kiện khi kiểm tra lại (revision id, ETag, ...)
+    validators: Optional[dict] = None
+    # Nội dung do worker làm ấm cache nạp trước và chưa được người dùng nào đọc
+    warmed: bool = False
+
+    @classmethod
+    def create(cls, result_id: str, topic: str, source: str, language: str, text: str,
+               validated_at: Optional[datetime] = None, validators: Optional[dict] = None,
+               warmed: bool = False) -> "TopicCacheEntry":
+        """Tạo entry mới và tính hash nội dung"""
+        return cls(
+            result_id=result_id,
+            topic=topic,
+            source=source,
+            language=language,
+            text=text,
+            content_hash=content_hash(text),
+            validated_at=validated_at,
+            validators=validators,
+            warmed=warmed
+        )
+
+    def freshness(self) -> dict:
+        """Thời điểm xác nhận, validators (dùng cho chính sách freshness) và đánh dấu làm ấm của nội dung"""
+        return {"validated_at": self.validated_at or self.cached_at, "validators": self.validators, "warmed": self.warmed}
+
+    def encode(self, codec=None) -> str:
+        """Chuyển entry thành chuỗi JSON để lưu vào Redis
+
+        Args:
+            codec: TextCodec dùng để nén nội dung (None hoặc codec tắt nén thì lưu nguyên văn)
+        """
+        data = self.dict()
+        data["cached_at"] = self.cached_at.isoformat()
+        if self.validated_at is not None:
+            data["validated_at"] = self.validated_at.isoformat()
+        if codec is not None and codec.enabled:
+            data["text_z"] = base64.b64encode(codec.compress(data.pop("text"))).decode("ascii")
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def decode(cls, raw: str, codec=None) -> Optional["TopicCacheEntry"]:
+        """Đọc entry từ Redis
+
+        Args:
+            raw: Chuỗi JSON trong Redis
+            codec: TextCodec dùng để giải nén nội dung
+
+        Returns:
+            TopicCacheEntry: Entry hợp lệ, None nếu sai định dạng, sai version hoặc sai hash
+        """
+        try:
+            data = json.loads(raw)
+            if not isinstance(data, dict) or data.get("version") != CACHE_SCHEMA_VERSION:
+                return None
+            if "text_z" in data:
+                if codec is None:
+                    return None
+                data["text"] = codec.decompress(base64.b64decode(data.pop("text_z")))
+            entry = cls(**data)
+        except (TypeError, ValueError):
+            return None
+        if entry.content_hash != content_hash(entry.text):
+            return None
+        return entry
@@ -1,13 +1,28 @@
 from datetime import datetime, UTC
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+import hashlib
+import re
+import unicodedata
+
+def normalize_text(text: str) -> str:
+    """Chuẩn hóa nội dung trước khi tính hash (Unicode NFC, xuống dòng, khoảng trắng cuối dòng)"""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    return re.sub(r"[ \t]+\n", "\n", text).strip()
+
+def result_content_hash(text: str) -> str:
+    """Hash SHA-256 của nội dung đã chuẩn hóa, dùng để lưu mỗi nội dung một lần"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
 
 class Result(BaseModel):
     task_id: str
     topic: str
+    # Mọi chủ đề có cùng nội dung (cùng nguồn, ngôn ngữ), gồm cả topic
+    topics: List[str] = Field(default_factory=list)
     source: str
     language: str
     text: str
+    content_hash: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
@@ -0,0 +1,43 @@
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta, UTC
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+load_dotenv()
+
+from app.services.mongodb_service import MongoDBService
+from app.services.redis_service import RedisService
+
+async def backfill(days: int, reset: bool, batch_size: int):
+    mongodb_service = MongoDBService()
+    redis_service = RedisService(mongodb_service)
+    await redis_service.connect()
+    counter = redis_service.popular_topics
+
+    # Mặc định thay thế điểm hiện có để chạy lại nhiều lần không bị cộng dồn
+    if reset:
+        await counter.reset()
+        print("Cleared existing popular topic scores")
+
+    since = datetime.now(UTC) - timedelta(days=days) if days else None
+    count = await counter.backfill(mongodb_service, since=since, batch_size=batch_size)
+    print(f"Backfilled popular topics from {count} completed tasks")
+    print(f"Top topics: {await counter.top(10)}")
+
+    await redis_service.close()
+    await mongodb_service.close()
+
+if __name__ == "__main__":
+    import asyncio
+    parser = argparse.ArgumentParser(description="Khởi tạo điểm chủ đề phổ biến trong Redis từ các task đã hoàn thành")
+    parser.add_argument("--days", type=int, default=0, help="Chỉ tính các task trong N ngày gần nhất (0 để tính tất cả)")
+    parser.add_argument("--keep", action="store_true", help="Cộng thêm vào điểm hiện có thay vì xóa trước")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.days, not args.keep, args.batch_size))
@@ -0,0 +1,84 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+from app.services.compression import TextCodec, build_dictionary
+
+load_dotenv()
+
+def load_samples_from_dir(directory: str) -> list:
+    texts = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+async def load_samples_from_mongodb(limit: int) -> list:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
+    codec = TextCodec()
+    texts = []
+    async for doc in client.data_management.results.find().limit(limit):
+        texts.append(codec.decode_document(doc))
+    client.close()
+    return texts
+
+def benchmark(name: str, codec: TextCodec, texts: list, rounds: int):
+    raw_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    # Kích thước khi lưu dạng JSON escape như cache cũ
+    json_bytes = sum(len(json.dumps(text)) for text in texts)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        payloads = [codec.compress(text) for text in texts]
+    encode_time = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            codec.decompress(payload)
+    decode_time = (time.perf_counter() - start) / rounds
+
+    compressed_bytes = sum(len(payload) for payload in payloads)
+    mb = raw_bytes / 1024 / 1024
+    print(
+        f"{name:<24} ratio={raw_bytes / compressed_bytes:5.2f}x "
+        f"(vs json {json_bytes / compressed_bytes:5.2f}x) "
+        f"encode={mb / encode_time:7.1f} MB/s decode={mb / decode_time:7.1f} MB/s "
+        f"encode_cpu={encode_time / len(texts) * 1000:.3f} ms/doc decode_cpu={decode_time / len(texts) * 1000:.3f} ms/doc"
+    )
+
+def main(texts: list, rounds: int):
+    if not texts:
+        print("No samples to benchmark")
+        return
+    print(f"{len(texts)} samples, {sum(len(t.encode('utf-8')) for t in texts)} bytes UTF-8")
+
+    # Huấn luyện dictionary trên nửa đầu, đo trên toàn bộ
+    dictionary = build_dictionary(texts[: max(len(texts) // 2, 1)])
+    for level in (1, 6, 9):
+        benchmark(f"zlib-{level}", TextCodec("zlib", level), texts, rounds)
+        benchmark(f"zlib-{level}+dict", TextCodec("zlib", level, dictionary), texts, rounds)
+
+if __name__ == "__main__":
+    import asyncio
+    parser = argparse.ArgumentParser(description="Đo tỉ lệ nén và chi phí CPU của TextCodec")
+    parser.add_argument("--dir", help="Thư mục chứa file .txt làm mẫu (mặc định đọc từ MongoDB)")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.dir:
+        samples = load_samples_from_dir(args.dir)
+    else:
+        samples = asyncio.run(load_samples_from_mongodb(args.limit))
+    main(samples, args.rounds)
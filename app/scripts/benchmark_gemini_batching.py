@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+from app.services.fake_gemini import FakeGenerativeModel
+from app.services.gemini_service import GeminiService
+from app.services.gemini_batcher import GeminiBatcher
+
+async def run(batching: bool, requests: int, arrival_rate: float, latency: float, max_concurrency: int):
+    model = FakeGenerativeModel(latency=latency, max_concurrency=max_concurrency)
+    service = GeminiService(model=model)
+    service.batcher = GeminiBatcher(service) if batching else None
+
+    async def one(index: int) -> float:
+        # Input khác nhau để không trúng cache
+        start = time.perf_counter()
+        await service.extract_topic(f"Tìm hiểu về lịch sử chủ đề số {index} Việt Nam", "vi")
+        return time.perf_counter() - start
+
+    tasks = []
+    start = time.perf_counter()
+    for index in range(requests):
+        tasks.append(asyncio.create_task(one(index)))
+        await asyncio.sleep(1 / arrival_rate)
+    latencies = sorted(await asyncio.gather(*tasks))
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"batching={'on ' if batching else 'off'} requests={requests} model_calls={model.calls:4d} "
+        f"throughput={requests / elapsed:7.1f} req/s "
+        f"p50={latencies[len(latencies) // 2] * 1000:7.1f}ms p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f}ms"
+    )
+
+async def main(args):
+    for batching in (False, True):
+        await run(batching, args.requests, args.rate, args.latency, args.max_concurrency)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark gom batch Gemini với model giả lập (offline)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=200, help="Số yêu cầu đến mỗi giây")
+    parser.add_argument("--latency", type=float, default=0.5, help="Độ trễ mỗi lời gọi model (giây)")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Số lời gọi model đồng thời tối đa")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+from aiohttp import web
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+load_dotenv()
+
+from app.services.nature_client import NatureClient
+from app.scripts.nature_fixture_server import API_PATH, create_app, load_corpus
+
+async def benchmark(topic: str, limit: int, latency: float, repeat: int, prefetch_values: list, port: int):
+    """So sánh thời gian tìm kiếm khi tải tuần tự từng trang và khi tải trước nhiều trang song song"""
+    app = create_app(load_corpus(os.path.join(root_dir, "nature_results"), repeat), latency=latency / 1000)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    api_url = f"http://127.0.0.1:{port}{API_PATH}"
+
+    for prefetch in prefetch_values:
+        client = NatureClient(api_url=api_url, api_key="fixture", prefetch_pages=prefetch, max_pages=50)
+        app["stats"]["requests"] = 0
+        start = time.perf_counter()
+        records = await client.search(topic, limit)
+        elapsed = time.perf_counter() - start
+        print(
+            f"prefetch={prefetch:<3} records={len(records):<4} requests={app['stats']['requests']:<4} "
+            f"time={elapsed * 1000:8.1f}ms"
+        )
+        await client.close()
+
+    await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Nature source trên fixture server (offline)")
+    parser.add_argument("--topic", default="ai")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=100, help="Độ trễ giả lập mỗi request (ms)")
+    parser.add_argument("--repeat", type=int, default=20, help="Nhân bản corpus N lần")
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[1, 3, 6])
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.topic, args.limit, args.latency, args.repeat, args.prefetch, args.port))
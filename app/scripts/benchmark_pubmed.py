@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+import aiohttp
+from aiohttp import web
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+load_dotenv()
+
+from app.services.pubmed_client import PubMedClient, parse_article
+from app.scripts.pubmed_fixture_server import API_PATH, create_app, search_ids
+
+def paced(rate: float):
+    """Giãn cách các request như limiter dùng chung của PubMed (không cần Redis khi benchmark)"""
+    lock = asyncio.Lock()
+    state = {"next": 0.0}
+
+    async def call(func, *args):
+        async with lock:
+            now = time.monotonic()
+            wait = state["next"] - now
+            state["next"] = max(now, state["next"]) + 1 / rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return await func(*args)
+
+    return call
+
+async def benchmark_batches(api_url: str, app: web.Application, limit: int, rate: float, batch_sizes: list):
+    """Thông lượng khi lấy limit bài báo với các kích thước lô efetch khác nhau"""
+    print(f"--- throughput: {limit} articles, {rate} req/s ---")
+    # Một limiter cho mọi lần chạy, giống limiter dùng chung giữa các worker
+    call = paced(rate)
+    for batch_size in batch_sizes:
+        client = PubMedClient(api_url=api_url, batch_size=batch_size, timeout=120)
+        client.max_ids = limit * 3
+        app["stats"].update(requests=0, ids=0, rate_limited=0)
+        start = time.perf_counter()
+        records = await client.search("machine learning", "en", limit, call=call)
+        elapsed = time.perf_counter() - start
+        stats = app["stats"]
+        print(
+            f"batch={batch_size:<5} records={len(records):<6} requests={stats['requests']:<4} "
+            f"429={stats['rate_limited']:<3} time={elapsed:7.2f}s rate={len(records) / elapsed:8.1f} articles/s"
+        )
+        await client.close()
+
+async def benchmark_memory(api_url: str, ids_count: int):
+    """Bộ nhớ đỉnh khi parse một response efetch lớn: stream (XMLPullParser) so với ET.fromstring"""
+    print(f"--- memory: efetch of {ids_count} ids ---")
+    ids = search_ids("memory", ids_count, 0, ids_count)
+
+    client = PubMedClient(api_url=api_url, batch_size=ids_count, timeout=120)
+    tracemalloc.start()
+    records = await client.efetch(ids)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await client.close()
+    print(f"streaming  records={len(records):<6} peak={peak / 1024 / 1024:8.1f} MB")
+    del records
+
+    tracemalloc.start()
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{api_url}/efetch.fcgi", data={"db": "pubmed", "id": ",".join(ids)}) as response:
+            body = await response.read()
+    tree = ET.fromstring(body)
+    records = [record for record in map(parse_article, tree.findall("PubmedArticle")) if record is not None]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"fromstring records={len(records):<6} peak={peak / 1024 / 1024:8.1f} MB (body {len(body) / 1024 / 1024:.1f} MB)")
+
+async def benchmark(limit: int, rate: float, batch_sizes: list, memory_ids: int, latency: float, port: int):
+    # Fixture server áp dụng cùng giới hạn tốc độ như NCBI: request vượt rate bị trả 429
+    app = create_app(corpus_size=max(limit * 3, memory_ids), latency=latency / 1000, rate=rate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    api_url = f"http://127.0.0.1:{port}{API_PATH}"
+
+    await benchmark_batches(api_url, app, limit, rate, batch_sizes)
+    if memory_ids:
+        # Chờ token bucket của server đầy lại trước phần đo bộ nhớ
+        await asyncio.sleep(1)
+        await benchmark_memory(api_url, memory_ids)
+
+    await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PubMed source trên server giả lập E-utilities (offline)")
+    parser.add_argument("--limit", type=int, default=1000, help="Số bài báo cần lấy")
+    parser.add_argument("--rate", type=float, default=3, help="Giới hạn request/giây của NCBI")
+    parser.add_argument("--batch", type=int, nargs="+", default=[20, 100, 200, 500])
+    parser.add_argument("--memory-ids", type=int, default=5000, help="Số ID cho phần đo bộ nhớ (0 = bỏ qua)")
+    parser.add_argument("--latency", type=float, default=50, help="Độ trễ giả lập mỗi request (ms)")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.limit, args.rate, args.batch, args.memory_ids, args.latency, args.port))
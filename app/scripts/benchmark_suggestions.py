@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+load_dotenv()
+
+def report(name: str, latencies: list, elapsed: float):
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<12} n={len(latencies)} rps={len(latencies) / elapsed:8.1f} "
+        f"mean={statistics.mean(latencies) * 1000:7.3f}ms p50={quantiles[49] * 1000:7.3f}ms "
+        f"p95={quantiles[94] * 1000:7.3f}ms p99={quantiles[98] * 1000:7.3f}ms"
+    )
+
+async def run(name: str, call, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    report(name, latencies, time.perf_counter() - start)
+
+async def benchmark_endpoint(url: str, requests: int, concurrency: int):
+    """Đo độ trễ của GET /data/suggestions trên server đang chạy"""
+    import httpx
+    async with httpx.AsyncClient(timeout=10) as client:
+        async def call():
+            response = await client.get(url)
+            response.raise_for_status()
+        await run("endpoint", call, requests, concurrency)
+
+async def benchmark_redis(requests: int, concurrency: int):
+    """So sánh đường đọc cũ (PING + đọc top-K) với đường đọc mới (chỉ đọc top-K) trên Redis thật"""
+    from app.services.redis_service import create_redis_pool
+    from app.services.popular_topics import PopularTopicsCounter
+    import redis.asyncio as redis
+    pool = create_redis_pool()
+    client = redis.Redis(connection_pool=pool)
+
+    async def before():
+        await client.ping()
+        await client.zrevrange(PopularTopicsCounter.SCORES_KEY, 0, 4)
+
+    async def after():
+        await client.zrevrange(PopularTopicsCounter.SCORES_KEY, 0, 4)
+
+    await run("ping+read", before, requests, concurrency)
+    await run("read", after, requests, concurrency)
+    await client.close()
+    await pool.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark độ trễ đọc danh sách chủ đề phổ biến")
+    parser.add_argument("--mode", choices=["endpoint", "redis"], default="endpoint")
+    parser.add_argument("--url", default=f"http://localhost:{os.getenv('PORT', 3000)}/api/v1/data/suggestions")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.mode == "endpoint":
+        asyncio.run(benchmark_endpoint(args.url, args.requests, args.concurrency))
+    else:
+        asyncio.run(benchmark_redis(args.requests, args.concurrency))
@@ -0,0 +1,37 @@
+import os
+import sys
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+load_dotenv()
+
+from app.services.mongodb_service import MongoDBService
+from app.services.index_manager import ensure_indexes
+
+async def compact(batch_size: int, interval: int):
+    mongodb_service = MongoDBService()
+    await mongodb_service.connect()
+    # Cần unique index trên content_hash để các lần ghi mới không tạo bản trùng
+    await ensure_indexes(mongodb_service.db)
+
+    while True:
+        stats = await mongodb_service.compact_results(batch_size)
+        print(f"Scanned {stats['scanned']} results, kept {stats['hashed']}, merged {stats['merged']} duplicates")
+        if not interval:
+            break
+        await asyncio.sleep(interval)
+
+    await mongodb_service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gộp các result trùng nội dung, ID cũ được giữ qua result_aliases")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--interval", type=int, default=0, help="Chạy lặp lại sau mỗi N giây (0 để chạy một lần)")
+    args = parser.parse_args()
+    asyncio.run(compact(args.batch_size, args.interval))
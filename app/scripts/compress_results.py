@@ -0,0 +1,67 @@
+import os
+import sys
+import argparse
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+from app.services.compression import get_text_codec
+
+load_dotenv()
+
+async def migrate_results(decompress: bool, batch_size: int):
+    # Kết nối MongoDB
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
+    results_collection = client.data_management.results
+    codec = get_text_codec()
+
+    if not decompress and not codec.enabled:
+        print("TEXT_COMPRESSION is not enabled, nothing to do")
+        client.close()
+        return
+
+    # Nén: các document còn lưu "text"; giải nén: các document đã có "text_z"
+    query = {"text_z": {"$exists": True}} if decompress else {"text": {"$exists": True}}
+    operations = []
+    migrated = 0
+    bytes_before = 0
+    bytes_after = 0
+
+    async for doc in results_collection.find(query):
+        text = codec.decode_document(doc)
+        if decompress:
+            update = {"$set": {"text": text}, "$unset": {"text_z": "", "compression": ""}}
+        else:
+            fields = codec.encode_fields(text)
+            bytes_before += len(text.encode("utf-8"))
+            bytes_after += len(fields["text_z"])
+            update = {"$set": fields, "$unset": {"text": ""}}
+        operations.append(UpdateOne({"_id": doc["_id"]}, update))
+
+        if len(operations) >= batch_size:
+            await results_collection.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+            print(f"Migrated {migrated} results")
+
+    if operations:
+        await results_collection.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+
+    print(f"Migrated {migrated} results")
+    if bytes_after:
+        print(f"Text size: {bytes_before} -> {bytes_after} bytes (ratio {bytes_before / bytes_after:.2f}x)")
+    client.close()
+
+if __name__ == "__main__":
+    import asyncio
+    parser = argparse.ArgumentParser(description="Nén (hoặc giải nén) nội dung các result đã lưu")
+    parser.add_argument("--decompress", action="store_true", help="Chuyển về dạng text không nén")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(migrate_results(args.decompress, args.batch_size))
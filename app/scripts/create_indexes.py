@@ -1,5 +1,6 @@
 import os
 import sys
+import argparse
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
@@ -10,29 +11,34 @@ sys.path.append(root_dir)
 
 load_dotenv()
 
-async def create_indexes():
+from app.services.index_manager import backfill_result_topics, ensure_indexes, verify_query_plans
+
+async def create_indexes(verify: bool = True):
     # Kết nối MongoDB
     client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
     db = client.data_management
-    
-    # Tạo index cho tasks collection
-    tasks_collection = db.tasks
-    # Index cho topics (để tìm kiếm theo chủ đề)
-    await tasks_collection.create_index("topics")
-    # Index cho created_at (để sắp xếp theo thời gian)
-    await tasks_collection.create_index("created_at")
-    print("Created indexes for tasks collection")
-    
-    # Tạo index cho results collection
-    results_collection = db.results
-    # Index cho task_id (để tìm kiếm kết quả theo task)
-    await results_collection.create_index("task_id")
-    # Index cho topic (để tìm kiếm theo chủ đề)
-    await results_collection.create_index("topic")
-    # Index cho created_at (để sắp xếp theo thời gian)
-    await results_collection.create_index("created_at")
-    print("Created indexes for results collection")
+
+    # Tạo các index đã khai báo trong index_manager (chạy lại nhiều lần không sao)
+    created = await ensure_indexes(db)
+    for collection_name, names in created.items():
+        print(f"Created indexes for {collection_name} collection: {', '.join(names)}")
+
+    # Gắn topics cho các kết quả cũ để tra cứu theo topics tìm thấy chúng
+    backfilled = await backfill_result_topics(db)
+    print(f"Backfilled topics of {backfilled} results")
+
+    # Kiểm tra query plan của các truy vấn nóng
+    if verify:
+        report = await verify_query_plans(db)
+        for name, plan in report.items():
+            status = "COLLSCAN" if plan["collscan"] else ("covered" if plan["covered"] else "index")
+            print(f"{name:<24} {status:<9} {' <- '.join(plan['stages'])}")
+
+    client.close()
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(create_indexes()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Tạo index MongoDB và kiểm tra query plan")
+    parser.add_argument("--no-verify", action="store_true", help="Bỏ qua bước explain()")
+    args = parser.parse_args()
+    asyncio.run(create_indexes(verify=not args.no_verify))
@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import hashlib
+import asyncio
+import argparse
+import aiohttp
+from aiohttp import web
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+load_dotenv()
+
+API_PATH = "/meta/v2/json"
+
+def load_corpus(directory: str, repeat: int = 1) -> list:
+    """Đọc các file .txt (định dạng của nature_results) thành record của Meta API
+
+    Args:
+        directory: Thư mục chứa file .txt
+        repeat: Nhân bản corpus N lần để có nhiều trang kết quả (cho benchmark)
+    """
+    base = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".txt"):
+            continue
+        fields = {}
+        key = None
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            for line in f:
+                prefix, _, value = line.partition(": ")
+                if prefix in ("Title", "DOI", "Abstract"):
+                    key = prefix
+                    fields[key] = value.rstrip("\n")
+                elif key:
+                    fields[key] += "\n" + line.rstrip("\n")
+        base.append(fields)
+
+    records = []
+    for copy in range(repeat):
+        for index, fields in enumerate(base):
+            suffix = f" ({copy})" if copy else ""
+            doi = fields.get("DOI", "")
+            records.append({
+                "title": fields.get("Title", "") + suffix,
+                "doi": f"{doi}.{copy}" if copy else doi,
+                "abstract": fields.get("Abstract", ""),
+                "publicationName": "Fixture Journal",
+                "publicationDate": "2025-01-01",
+                "creators": [{"creator": "Fixture, Author"}],
+                "url": [{"format": "html", "platform": "web", "value": f"https://example.org/{copy}/{index}"}]
+            })
+    return records
+
+def search_corpus(records: list, query: str, start: int, page_size: int) -> dict:
+    """Tìm trong corpus (khớp mọi từ trong tiêu đề hoặc abstract) và phân trang như Meta API"""
+    words = query.lower().split()
+    matched = [
+        record for record in records
+        if all(word in (record["title"] + " " + record["abstract"]).lower() for word in words)
+    ]
+    page = matched[start - 1:start - 1 + page_size]
+    return {
+        "apiMessage": "This JSON was provided by the Nature fixture server",
+        "query": query,
+        "result": [{"total": str(len(matched)), "start": str(start), "pageLength": str(page_size),
+                    "recordsDisplayed": str(len(page))}],
+        "records": page
+    }
+
+def create_app(corpus: list, fixtures_path: str = None, record: bool = False, latency: float = 0) -> web.Application:
+    """Tạo fixture server
+
+    Response đã ghi (fixtures_path, key "q|s|p") được trả nguyên văn; khi record=True các request
+    chưa có được chuyển tới NATURE_API_URL thật và lưu lại; còn lại được trả từ corpus.
+
+    Args:
+        corpus: Record dùng khi không có response đã ghi
+        fixtures_path: File JSON chứa các response đã ghi
+        record: Ghi lại response từ API thật
+        latency: Độ trễ giả lập cho mỗi request (giây)
+    """
+    recorded = {}
+    if fixtures_path and os.path.exists(fixtures_path):
+        with open(fixtures_path, encoding="utf-8") as f:
+            recorded = json.load(f)
+
+    def respond(request: web.Request, data: dict) -> web.Response:
+        """Trả JSON kèm ETag; trả 304 khi If-None-Match khớp (để thử request có điều kiện)"""
+        body = json.dumps(data, ensure_ascii=False)
+        etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            request.app["stats"]["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    async def handle(request: web.Request) -> web.Response:
+        query = request.query.get("q", "")
+        start = int(request.query.get("s", 1))
+        page_size = int(request.query.get("p", 10))
+        key = f"{query.lower()}|{start}|{page_size}"
+        request.app["stats"]["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+
+        if key in recorded:
+            return respond(request, recorded[key])
+        if record:
+            params = {"q": query, "s": str(start), "p": str(page_size), "api_key": os.getenv("NATURE_API_KEY", "")}
+            async with aiohttp.ClientSession() as session:
+                async with session.get(os.getenv("NATURE_API_URL", "https://api.springernature.com/meta/v2/json"),
+                                       params=params) as response:
+                    if response.status != 200:
+                        return web.Response(status=response.status, text=await response.text())
+                    recorded[key] = await response.json(content_type=None)
+            with open(fixtures_path, "w", encoding="utf-8") as f:
+                json.dump(recorded, f, ensure_ascii=False, indent=2)
+            return respond(request, recorded[key])
+        return respond(request, search_corpus(corpus, query, start, page_size))
+
+    app = web.Application()
+    app["stats"] = {"requests": 0, "not_modified": 0}
+    app.router.add_get(API_PATH, handle)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixture server giả lập Springer Nature Meta API để chạy offline")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--corpus", default=os.path.join(root_dir, "nature_results"), help="Thư mục file .txt")
+    parser.add_argument("--repeat", type=int, default=1, help="Nhân bản corpus N lần")
+    parser.add_argument("--fixtures", default=os.path.join(root_dir, "app", "fixtures", "nature_responses.json"),
+                        help="File JSON chứa response đã ghi")
+    parser.add_argument("--record", action="store_true", help="Ghi lại response từ API thật cho request chưa có")
+    parser.add_argument("--latency", type=float, default=0, help="Độ trễ giả lập mỗi request (ms)")
+    args = parser.parse_args()
+
+    if args.record:
+        os.makedirs(os.path.dirname(args.fixtures), exist_ok=True)
+    app = create_app(load_corpus(args.corpus, args.repeat), args.fixtures, args.record, args.latency / 1000)
+    print(f"Set NATURE_API_URL=http://localhost:{args.port}{API_PATH} to use this server")
+    web.run_app(app, port=args.port)
@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import json
+import zlib
+import asyncio
+import argparse
+from xml.sax.saxutils import escape
+from aiohttp import web
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+load_dotenv()
+
+API_PATH = "/entrez/eutils"
+FIRST_PMID = 30000000
+
+def search_ids(term: str, corpus_size: int, retstart: int, retmax: int) -> list:
+    """Danh sách PMID giả lập cho một truy vấn (cùng truy vấn luôn trả cùng kết quả)"""
+    offset = zlib.crc32(term.lower().encode("utf-8")) % 1000000
+    end = min(retstart + retmax, corpus_size)
+    return [str(FIRST_PMID + offset + index) for index in range(retstart, end)]
+
+def article_xml(pmid: str, abstract_words: int = 250) -> str:
+    """Sinh một <PubmedArticle> giả lập theo PMID
+
+    Cứ 5 bài thì có 1 bài không có abstract (giống dữ liệu thật, crawler phải bỏ qua).
+    """
+    number = int(pmid)
+    abstract = ""
+    if number % 5:
+        words = " ".join(f"term{(number * 31 + index) % 997}" for index in range(abstract_words))
+        abstract = (
+            "<Abstract>"
+            f"<AbstractText Label=\"BACKGROUND\">Fixture background for article {pmid}: {words}</AbstractText>"
+            f"<AbstractText Label=\"RESULTS\">Fixture results with <i>inline</i> markup {number % 97}.</AbstractText>"
+            "</Abstract>"
+        )
+    return (
+        "<PubmedArticle><MedlineCitation Status=\"MEDLINE\" Owner=\"NLM\">"
+        f"<PMID Version=\"1\">{pmid}</PMID>"
+        "<Article PubModel=\"Print\">"
+        "<Journal><JournalIssue CitedMedium=\"Internet\"><PubDate>"
+        f"<Year>{2000 + number % 25}</Year><Month>Jan</Month></PubDate></JournalIssue>"
+        "<Title>Fixture Journal of Medicine</Title></Journal>"
+        f"<ArticleTitle>Fixture article {escape(pmid)} on <i>machine</i> learning</ArticleTitle>"
+        f"{abstract}"
+        "<AuthorList CompleteYN=\"Y\">"
+        f"<Author ValidYN=\"Y\"><LastName>Fixture</LastName><ForeName>Author {number % 13}</ForeName></Author>"
+        "<Author ValidYN=\"Y\"><CollectiveName>Fixture Consortium</CollectiveName></Author>"
+        "</AuthorList>"
+        f"<ELocationID EIdType=\"doi\" ValidYN=\"Y\">10.0000/fixture.{pmid}</ELocationID>"
+        "</Article></MedlineCitation>"
+        "<PubmedData><ArticleIdList>"
+        f"<ArticleId IdType=\"pubmed\">{pmid}</ArticleId>"
+        f"<ArticleId IdType=\"doi\">10.0000/fixture.{pmid}</ArticleId>"
+        "</ArticleIdList></PubmedData></PubmedArticle>\n"
+    )
+
+def create_app(corpus_size: int = 5000, latency: float = 0, rate: float = 0, abstract_words: int = 250) -> web.Application:
+    """Tạo server giả lập E-utilities (esearch.fcgi, efetch.fcgi)
+
+    Args:
+        corpus_size: Số bài báo khớp với mọi truy vấn
+        latency: Độ trễ giả lập cho mỗi request (giây)
+        rate: Số request/giây tối đa như NCBI (0 = không giới hạn); vượt quá trả 429
+        abstract_words: Số từ trong abstract mỗi bài (điều chỉnh kích thước response)
+    """
+    # Token bucket với sức chứa bằng rate (NCBI cho phép dồn tối đa rate request trong 1 giây)
+    bucket = {"tokens": rate, "updated": time.monotonic()}
+
+    async def admit(request: web.Request):
+        """Ghi nhận request và trả 429 khi vượt quá giới hạn tốc độ"""
+        stats = request.app["stats"]
+        stats["requests"] += 1
+        if rate:
+            now = time.monotonic()
+            bucket["tokens"] = min(rate, bucket["tokens"] + (now - bucket["updated"]) * rate)
+            bucket["updated"] = now
+            if bucket["tokens"] < 1:
+                stats["rate_limited"] += 1
+                return web.json_response({"error": "API rate limit exceeded", "count": str(int(rate))}, status=429)
+            bucket["tokens"] -= 1
+        if latency:
+            await asyncio.sleep(latency)
+        return None
+
+    async def esearch(request: web.Request) -> web.Response:
+        rejected = await admit(request)
+        if rejected is not None:
+            return rejected
+        params = request.query
+        term = params.get("term", "")
+        retstart = int(params.get("retstart", 0))
+        retmax = int(params.get("retmax", 20))
+        ids = search_ids(term, corpus_size, retstart, retmax)
+        if params.get("retmode") == "json":
+            return web.json_response({
+                "header": {"type": "esearch", "version": "0.3"},
+                "esearchresult": {"count": str(corpus_size), "retmax": str(len(ids)), "retstart": str(retstart),
+                                  "idlist": ids, "querytranslation": term}
+            })
+        body = "".join(f"<Id>{pmid}</Id>" for pmid in ids)
+        return web.Response(
+            text=f"<eSearchResult><Count>{corpus_size}</Count><IdList>{body}</IdList></eSearchResult>",
+            content_type="text/xml"
+        )
+
+    async def efetch(request: web.Request) -> web.StreamResponse:
+        rejected = await admit(request)
+        if rejected is not None:
+            return rejected
+        params = dict(request.query)
+        if request.method == "POST":
+            params.update(await request.post())
+        ids = [pmid for pmid in params.get("id", "").split(",") if pmid]
+        request.app["stats"]["ids"] += len(ids)
+
+        # Ghi từng bài báo để client nhận response dạng chunked như E-utilities thật
+        response = web.StreamResponse(headers={"Content-Type": "text/xml"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        await response.write(b"<?xml version=\"1.0\" ?>\n<PubmedArticleSet>\n")
+        for pmid in ids:
+            await response.write(article_xml(pmid, abstract_words).encode("utf-8"))
+        await response.write(b"</PubmedArticleSet>\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app["stats"] = {"requests": 0, "ids": 0, "rate_limited": 0}
+    app.router.add_get(f"{API_PATH}/esearch.fcgi", esearch)
+    app.router.add_get(f"{API_PATH}/efetch.fcgi", efetch)
+    app.router.add_post(f"{API_PATH}/efetch.fcgi", efetch)
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.Response(text=json.dumps(request.app["stats"]), content_type="application/json")
+
+    app.router.add_get("/stats", stats)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server giả lập NCBI E-utilities (PubMed) để test và benchmark offline")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--corpus-size", type=int, default=5000, help="Số bài báo khớp với mọi truy vấn")
+    parser.add_argument("--latency", type=float, default=0, help="Độ trễ giả lập mỗi request (ms)")
+    parser.add_argument("--rate", type=float, default=3, help="Giới hạn request/giây như NCBI (0 = không giới hạn)")
+    parser.add_argument("--abstract-words", type=int, default=250, help="Số từ trong abstract mỗi bài")
+    args = parser.parse_args()
+
+    app = create_app(args.corpus_size, args.latency / 1000, args.rate, args.abstract_words)
+    print(f"Set PUBMED_API_URL=http://localhost:{args.port}{API_PATH} to use this server")
+    web.run_app(app, port=args.port)
@@ -0,0 +1,55 @@
+import os
+import sys
+import zlib
+import argparse
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+from app.services.compression import build_dictionary, get_text_codec
+
+load_dotenv()
+
+async def train_dictionary(output: str, samples: int, size: int):
+    # Kết nối MongoDB
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
+    results_collection = client.data_management.results
+    codec = get_text_codec()
+
+    # Lấy ngẫu nhiên các bài viết làm mẫu
+    texts = []
+    async for doc in results_collection.aggregate([{"$sample": {"size": samples}}]):
+        texts.append(codec.decode_document(doc))
+    client.close()
+
+    if not texts:
+        print("No results found to train dictionary")
+        return
+
+    dictionary = build_dictionary(texts, size)
+    # Tên file theo ID của dictionary; không ghi đè file đã có vì document cũ cần dictionary đó để giải nén
+    output = output or f"compression-{zlib.crc32(dictionary):08x}.dict"
+    if os.path.exists(output):
+        print(f"{output} already exists, choose another --output (old dictionaries must be kept)")
+        return
+    with open(output, "wb") as f:
+        f.write(dictionary)
+    print(f"Trained {len(dictionary)} byte dictionary from {len(texts)} samples -> {output}")
+    print(f"Set TEXT_COMPRESSION_DICT={output} to use it")
+    current = os.getenv("TEXT_COMPRESSION_DICT")
+    if current:
+        previous = ",".join(path for path in (current, os.getenv("TEXT_COMPRESSION_PREVIOUS_DICTS")) if path)
+        print(f"and TEXT_COMPRESSION_PREVIOUS_DICTS={previous} so results compressed with the current dictionary stay readable")
+
+if __name__ == "__main__":
+    import asyncio
+    parser = argparse.ArgumentParser(description="Huấn luyện zlib dictionary từ results collection")
+    parser.add_argument("--output", default=None, help="Mặc định compression-<id>.dict")
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--size", type=int, default=32768)
+    args = parser.parse_args()
+    asyncio.run(train_dictionary(args.output, args.samples, args.size))
@@ -0,0 +1,53 @@
+import os
+import sys
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# Thêm thư mục gốc vào Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(root_dir)
+
+load_dotenv()
+
+from app.services.mongodb_service import MongoDBService
+from app.services.redis_service import RedisService
+from app.services.rate_limiter import configure_upstream_guards
+from app.services.source_registry import get_source_registry
+from app.services.crawler import Crawler
+from app.services.cache_warmer import CacheWarmer
+
+async def warm(interval: int, budget: int, rate: float, sources: list):
+    mongodb_service = MongoDBService()
+    await mongodb_service.connect()
+    redis_service = RedisService(mongodb_service)
+    await redis_service.connect()
+    # Dùng chung limiter và circuit breaker của upstream với các worker crawl
+    configure_upstream_guards(redis_service)
+    registry = get_source_registry()
+    crawler = Crawler(redis_service, mongodb_service, registry)
+    warmer = CacheWarmer(crawler, mongodb_service, redis_service, budget=budget, rate=rate, sources=sources)
+
+    try:
+        while True:
+            stats = await warmer.run_once()
+            print(f"Warmed {stats.get('warmed', 0)} topics from {stats['candidates']} candidates: {stats}")
+            if not interval:
+                break
+            await asyncio.sleep(interval)
+    finally:
+        await crawler.close()
+        await registry.close()
+        await redis_service.close()
+        await mongodb_service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nạp trước vào MongoDB và Redis nội dung các chủ đề sắp được yêu cầu")
+    parser.add_argument("--interval", type=int, default=int(os.getenv("WARM_INTERVAL", 0)),
+                        help="Chạy lặp lại sau mỗi N giây (0 để chạy một lần)")
+    parser.add_argument("--budget", type=int, default=None, help="Số chủ đề crawl tối đa mỗi lượt (mặc định WARM_BUDGET)")
+    parser.add_argument("--rate", type=float, default=None, help="Số request/giây tới upstream (mặc định WARM_RATE)")
+    parser.add_argument("--sources", nargs="+", default=None, help="Các nguồn được làm ấm (mặc định WARM_SOURCES)")
+    args = parser.parse_args()
+    asyncio.run(warm(args.interval, args.budget, args.rate, args.sources))
@@ -0,0 +1,184 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List, Optional, Tuple
+from .metrics import metrics
+from .rate_limiter import get_upstream_guard
+from .wikipedia_client import WikipediaClient, get_wikipedia_client
+
+logger = logging.getLogger(__name__)
+
+Candidate = Tuple[str, str]  # (chủ đề, ngôn ngữ)
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+class CacheWarmer:
+    """Nạp trước vào MongoDB và Redis nội dung của các chủ đề nhiều khả năng sắp được yêu cầu
+
+    Ứng viên lấy từ chủ đề của các task gần đây, chủ đề phổ biến (gợi ý) và các bài viết
+    Wikipedia liên quan tới chủ đề phổ biến, được xếp hạng theo điểm. Mỗi lượt chỉ crawl tối
+    đa budget chủ đề chưa có trong cache, các request tới upstream được giãn cách theo rate.
+    """
+
+    def __init__(self, crawler, mongodb_service, redis_service, budget: int = None, rate: float = None,
+                 sources: List[str] = None, wikipedia_client: Optional[WikipediaClient] = None):
+        """Khởi tạo worker làm ấm cache
+
+        Args:
+            crawler: Crawler dùng để tra cache, crawl và lưu kết quả
+            mongodb_service: MongoDB service (đọc các task gần đây)
+            redis_service: Redis service (đọc chủ đề phổ biến)
+            budget: Số chủ đề được crawl từ upstream tối đa mỗi lượt
+            rate: Số request/giây tối đa worker gửi tới upstream (0 = không giới hạn)
+            sources: Các nguồn được làm ấm
+            wikipedia_client: Client dùng để tìm bài viết liên quan
+        """
+        self.crawler = crawler
+        self.mongodb_service = mongodb_service
+        self.redis_service = redis_service
+        self.budget = budget if budget is not None else int(os.getenv("WARM_BUDGET", 50))
+        self.rate = rate if rate is not None else float(os.getenv("WARM_RATE", 1))
+        self.sources = sources or _env_list("WARM_SOURCES", "wikipedia")
+        self.concurrency = int(os.getenv("WARM_CONCURRENCY", 2))
+        # Ngôn ngữ dùng cho chủ đề phổ biến chưa xuất hiện trong task gần đây
+        self.languages = _env_list("WARM_LANGUAGES", "vi")
+        self.recent_hours = float(os.getenv("WARM_RECENT_HOURS", 24))
+        self.recent_limit = int(os.getenv("WARM_RECENT_LIMIT", 100))
+        self.popular_limit = int(os.getenv("WARM_POPULAR_LIMIT", 20))
+        # Tìm bài viết liên quan cho top WARM_RELATED_SEEDS chủ đề phổ biến
+        self.related_seeds = int(os.getenv("WARM_RELATED_SEEDS", 5))
+        self.related_limit = int(os.getenv("WARM_RELATED_LIMIT", 5))
+        self.recent_weight = float(os.getenv("WARM_WEIGHT_RECENT", 1))
+        self.popular_weight = float(os.getenv("WARM_WEIGHT_POPULAR", 2))
+        self.related_weight = float(os.getenv("WARM_WEIGHT_RELATED", 0.5))
+        self.wikipedia_client = wikipedia_client or get_wikipedia_client()
+        self._lock = asyncio.Lock()
+        self._next_request = 0.0
+        self._spent = 0
+
+    async def _pace(self):
+        """Chờ tới lượt gửi request tiếp theo theo rate của worker"""
+        if not self.rate:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + 1 / self.rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _admit(self) -> bool:
+        """Trừ một lượt crawl khỏi budget của lượt chạy và chờ tới lượt gửi request
+
+        Returns:
+            bool: False nếu đã hết budget
+        """
+        async with self._lock:
+            if self._spent >= self.budget:
+                return False
+            self._spent += 1
+        await self._pace()
+        return True
+
+    async def _recent_topics(self) -> Dict[Candidate, int]:
+        """Số lần mỗi (chủ đề, ngôn ngữ) xuất hiện trong các task gần đây"""
+        since = datetime.now(UTC) - timedelta(hours=self.recent_hours)
+        pipeline = [
+            # Dùng index created_at
+            {"$match": {"created_at": {"$gte": since}}},
+            {"$project": {"topics": 1, "language": 1}},
+            {"$unwind": "$topics"},
+            {"$group": {"_id": {"topic": "$topics", "language": "$language"}, "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": self.recent_limit}
+        ]
+        counts = {}
+        async for group in self.mongodb_service.tasks_collection.aggregate(pipeline):
+            topic, language = group["_id"].get("topic"), group["_id"].get("language")
+            if topic and language:
+                counts[(topic, language)] = group["count"]
+        return counts
+
+    async def _related_topics(self, topic: str, language: str) -> List[str]:
+        """Các bài viết Wikipedia liên quan tới một chủ đề phổ biến (lỗi thì bỏ qua)"""
+        try:
+            await self._pace()
+            return await get_upstream_guard("wikipedia").call(
+                self.wikipedia_client.fetch_related, topic, language, self.related_limit
+            )
+        except Exception as e:
+            logger.warning(f"Error finding topics related to {topic} ({language}): {str(e)}")
+            return []
+
+    async def candidates(self) -> List[Candidate]:
+        """Các (chủ đề, ngôn ngữ) cần làm ấm, theo điểm giảm dần
+
+        Điểm = số lần xuất hiện trong task gần đây * WARM_WEIGHT_RECENT
+             + thứ hạng trong chủ đề phổ biến * WARM_WEIGHT_POPULAR
+             + điểm của chủ đề gốc * thứ hạng liên quan * WARM_WEIGHT_RELATED
+        """
+        scores: Dict[Candidate, float] = {}
+
+        recent = {}
+        try:
+            recent = await self._recent_topics()
+        except Exception as e:
+            logger.error(f"Error reading recent task topics: {str(e)}")
+        for candidate, count in recent.items():
+            scores[candidate] = scores.get(candidate, 0) + count * self.recent_weight
+
+        popular = await self.redis_service.get_popular_topics_from_redis(self.popular_limit)
+        recent_languages: Dict[str, List[str]] = {}
+        for topic, language in recent:
+            recent_languages.setdefault(topic, []).append(language)
+        for rank, topic in enumerate(popular):
+            weight = (len(popular) - rank) / len(popular) * self.popular_weight
+            for language in recent_languages.get(topic) or self.languages:
+                scores[(topic, language)] = scores.get((topic, language), 0) + weight
+
+        # Bài viết liên quan của các chủ đề phổ biến nhất, thừa hưởng một phần điểm của chủ đề gốc
+        seeds = [candidate for candidate in sorted(scores, key=scores.get, reverse=True)
+                 if candidate[0] in popular][:self.related_seeds]
+        related = await asyncio.gather(*(self._related_topics(topic, language) for topic, language in seeds))
+        for (topic, language), titles in zip(seeds, related):
+            for rank, title in enumerate(titles):
+                if title == topic:
+                    continue
+                weight = scores[(topic, language)] * (len(titles) - rank) / len(titles) * self.related_weight
+                scores[(title, language)] = scores.get((title, language), 0) + weight
+
+        return sorted(scores, key=scores.get, reverse=True)
+
+    async def _warm(self, semaphore: asyncio.Semaphore, topic: str, language: str, source: str,
+                    stats: Dict[str, int]):
+        async with semaphore:
+            try:
+                status = await self.crawler.warm(topic, language, source, admit=self._admit)
+            except Exception as e:
+                status = "errors"
+                logger.error(f"Error warming {topic} ({source}, {language}): {str(e)}")
+        stats[status] = stats.get(status, 0) + 1
+        metrics.incr(f"warm.{status}")
+
+    async def run_once(self) -> Dict[str, int]:
+        """Chạy một lượt làm ấm cache
+
+        Returns:
+            Dict[str, int]: Số ứng viên và số chủ đề theo từng kết quả của Crawler.warm
+        """
+        with metrics.timer("warm.duration"):
+            self._spent = 0
+            candidates = await self.candidates()
+            metrics.set_gauge("warm.candidates", len(candidates))
+            stats: Dict[str, int] = {"candidates": len(candidates)}
+            semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+            # Ứng viên điểm cao được xử lý trước; khi hết budget các ứng viên còn lại chỉ được tra cache
+            await asyncio.gather(*(
+                self._warm(semaphore, topic, language, source, stats)
+                for topic, language in candidates for source in self.sources
+            ))
+        logger.info(f"Cache warming finished: {stats}")
+        return stats
@@ -0,0 +1,172 @@
+import os
+import struct
+import zlib
+import logging
+from collections import Counter
+from typing import Optional, Dict, Any, List
+from bson import Binary
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Header: magic (2 byte) + version (1 byte) + CRC32 của dictionary (4 byte, 0 nếu không dùng)
+_MAGIC = b"ZT"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct(">2sBI")
+
+class CompressionError(ValueError):
+    """Lỗi khi giải nén nội dung"""
+
+def _dictionary_id(dictionary: bytes) -> int:
+    """ID của dictionary được ghi trong header của dữ liệu nén"""
+    return zlib.crc32(dictionary)
+
+class TextCodec:
+    """Nén/giải nén nội dung bài viết bằng zlib, có thể dùng dictionary huấn luyện từ corpus
+
+    Dữ liệu mới được nén bằng dictionary hiện tại; các dictionary cũ được giữ trong keyring
+    (theo ID trong header) để dữ liệu đã nén trước khi đổi dictionary vẫn đọc được.
+    """
+
+    def __init__(self, algorithm: str = None, level: int = None, dictionary: Optional[bytes] = None,
+                 previous_dictionaries: Optional[List[bytes]] = None):
+        """Khởi tạo codec
+
+        Args:
+            algorithm: "zlib" để bật nén, "none" để lưu nguyên văn (mặc định lấy từ TEXT_COMPRESSION)
+            level: Mức nén zlib 1-9
+            dictionary: Preset dictionary cho zlib (tối đa 32KB), dùng khi nén
+            previous_dictionaries: Các dictionary đã dùng trước đây, chỉ dùng khi giải nén
+        """
+        self.algorithm = (algorithm or os.getenv("TEXT_COMPRESSION", "none")).lower()
+        self.level = level or int(os.getenv("TEXT_COMPRESSION_LEVEL", 6))
+        self.dictionary = dictionary
+        self.dictionary_id = _dictionary_id(dictionary) if dictionary else 0
+        self.keyring: Dict[int, bytes] = {
+            _dictionary_id(item): item for item in (previous_dictionaries or []) if item
+        }
+        if dictionary:
+            self.keyring[self.dictionary_id] = dictionary
+
+    @property
+    def enabled(self) -> bool:
+        return self.algorithm == "zlib"
+
+    def compress(self, text: str) -> bytes:
+        """Nén nội dung thành bytes (kèm header)"""
+        if self.dictionary:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(self.level)
+        body = compressor.compress(text.encode("utf-8")) + compressor.flush()
+        return _HEADER.pack(_MAGIC, _FORMAT_VERSION, self.dictionary_id) + body
+
+    def decompress(self, data: bytes) -> str:
+        """Giải nén bytes do compress tạo ra
+
+        Raises:
+            CompressionError: Khi dữ liệu sai định dạng hoặc dictionary không khớp
+        """
+        if len(data) < _HEADER.size:
+            raise CompressionError("Compressed payload is too short")
+        magic, version, dictionary_id = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise CompressionError("Unknown compressed payload format")
+        if dictionary_id and dictionary_id not in self.keyring:
+            raise CompressionError(
+                f"Payload requires dictionary {dictionary_id:08x}, add it to TEXT_COMPRESSION_PREVIOUS_DICTS"
+            )
+        try:
+            if dictionary_id:
+                decompressor = zlib.decompressobj(zdict=self.keyring[dictionary_id])
+            else:
+                decompressor = zlib.decompressobj()
+            raw = decompressor.decompress(data[_HEADER.size:]) + decompressor.flush()
+            return raw.decode("utf-8")
+        except (zlib.error, UnicodeDecodeError) as e:
+            raise CompressionError(str(e)) from e
+
+    def encode_fields(self, text: str) -> Dict[str, Any]:
+        """Các trường lưu nội dung trong MongoDB document"""
+        if not self.enabled:
+            return {"text": text}
+        return {"text_z": Binary(self.compress(text)), "compression": "zlib"}
+
+    def decode_document(self, doc: Dict[str, Any]) -> str:
+        """Đọc nội dung từ MongoDB document (hỗ trợ cả dạng nén và không nén)"""
+        if doc.get("text_z") is not None:
+            return self.decompress(bytes(doc["text_z"]))
+        return doc.get("text", "")
+
+
+def build_dictionary(samples: List[str], size: int = 32768) -> bytes:
+    """Huấn luyện preset dictionary cho zlib từ các mẫu nội dung
+
+    Chọn các cụm 1-3 từ xuất hiện nhiều nhất (tính theo số byte tiết kiệm được).
+    zlib ưu tiên các chuỗi ở cuối dictionary nên cụm phổ biến nhất được đặt cuối.
+
+    Args:
+        samples: Danh sách nội dung mẫu
+        size: Kích thước tối đa của dictionary (zlib chỉ dùng 32KB cuối)
+
+    Returns:
+        bytes: Dictionary
+    """
+    counts = Counter()
+    for sample in samples:
+        words = sample.split()
+        for n in (1, 2, 3):
+            for i in range(len(words) - n + 1):
+                counts[" ".join(words[i:i + n])] += 1
+
+    scored = sorted(
+        ((count * len(phrase.encode("utf-8")), phrase) for phrase, count in counts.items() if count > 1),
+        reverse=True
+    )
+    chosen = []
+    total = 0
+    for _, phrase in scored:
+        encoded = (phrase + " ").encode("utf-8")
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+    return b"".join(reversed(chosen))
+
+
+def load_dictionaries(paths: str) -> List[bytes]:
+    """Đọc các dictionary từ danh sách đường dẫn phân cách bằng dấu phẩy (bỏ qua file lỗi)"""
+    dictionaries = []
+    for path in (paths or "").split(","):
+        dictionary = load_dictionary(path.strip())
+        if dictionary:
+            dictionaries.append(dictionary)
+    return dictionaries
+
+
+def load_dictionary(path: str) -> Optional[bytes]:
+    """Đọc dictionary từ file, None nếu không có"""
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError as e:
+        logger.error(f"Error loading compression dictionary {path}: {str(e)}")
+        return None
+
+
+_codec: Optional[TextCodec] = None
+
+def get_text_codec() -> TextCodec:
+    """Trả về codec dùng chung cho toàn process"""
+    global _codec
+    if _codec is None:
+        _codec = TextCodec(
+            dictionary=load_dictionary(os.getenv("TEXT_COMPRESSION_DICT")),
+            # Các dictionary trước đây, cần giữ khi còn document được nén bằng chúng
+            previous_dictionaries=load_dictionaries(os.getenv("TEXT_COMPRESSION_PREVIOUS_DICTS"))
+        )
+    return _codec
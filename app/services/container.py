@@ -0,0 +1,152 @@
+import os
+import logging
+from typing import Optional, Dict, Any
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from dotenv import load_dotenv
+from .mongodb_service import MongoDBService
+from .redis_service import RedisService, create_redis_pool
+from .rabbitmq_service import RabbitMQService
+from .gemini_service import GeminiService
+from .crawl_service import CrawlService
+from .source_registry import get_source_registry
+from .metrics import metrics
+from .rate_limiter import configure_upstream_guards
+from .index_manager import backfill_result_topics, ensure_indexes, verify_query_plans
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Theo dõi số kết nối MongoDB đang mở và đang được sử dụng"""
+
+    def __init__(self):
+        self.open_connections = 0
+        self.checked_out = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.open_connections = max(self.open_connections - 1, 0)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        metrics.incr("pool.mongodb.checkout_failed")
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out = max(self.checked_out - 1, 0)
+
+
+class ServiceContainer:
+    """Quản lý các service dùng chung của process: một Motor client, một Redis pool, một kết nối RabbitMQ"""
+
+    def __init__(self):
+        self.mongo_max_pool_size = int(os.getenv("MONGODB_MAX_POOL_SIZE", 50))
+        self.mongo_min_pool_size = int(os.getenv("MONGODB_MIN_POOL_SIZE", 0))
+        self.redis_max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+        self.ensure_indexes = os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() == "true"
+
+        self.mongo_listener = MongoPoolListener()
+        self.mongo_client = AsyncIOMotorClient(
+            os.getenv("MONGODB_URI"),
+            maxPoolSize=self.mongo_max_pool_size,
+            minPoolSize=self.mongo_min_pool_size,
+            event_listeners=[self.mongo_listener]
+        )
+        self.redis_pool = create_redis_pool(self.redis_max_connections)
+
+        self.mongodb_service = MongoDBService(self.mongo_client)
+        self.redis_service = RedisService(self.mongodb_service, self.redis_pool)
+        # Limiter và circuit breaker của các upstream dùng Redis để chia sẻ trạng thái giữa các process
+        configure_upstream_guards(self.redis_service)
+        self.rabbitmq_service = RabbitMQService()
+        self.gemini_service = GeminiService(self.redis_service)
+        # Các nguồn crawl được import và tạo client khi được dùng lần đầu
+        self.sources = get_source_registry()
+        self.crawl_service = CrawlService(
+            mongodb_service=self.mongodb_service,
+            redis_service=self.redis_service,
+            rabbitmq_service=self.rabbitmq_service,
+            gemini_service=self.gemini_service
+        )
+
+    async def start(self):
+        """Mở kết nối tới MongoDB, Redis và RabbitMQ"""
+        await self.mongodb_service.connect()
+        if self.ensure_indexes:
+            # Tạo index cho các truy vấn nóng và kiểm tra query plan
+            await ensure_indexes(self.mongodb_service.db)
+            await backfill_result_topics(self.mongodb_service.db)
+            await verify_query_plans(self.mongodb_service.db)
+        await self.redis_service.connect()
+        await self.rabbitmq_service.connect()
+        logger.info("Service container started")
+
+    async def close(self):
+        """Đóng toàn bộ kết nối dùng chung"""
+        # Dừng các lần kiểm tra lại ở nền trước khi đóng kết nối
+        await self.crawl_service.crawler.close()
+        await self.redis_service.close()
+        await self.redis_pool.disconnect()
+        await self.rabbitmq_service.close()
+        await self.sources.close()
+        self.mongo_client.close()
+        logger.info("Service container closed")
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Thống kê mức sử dụng các connection pool"""
+        redis_in_use = self.redis_pool.in_use_connections
+        stats = {
+            "mongodb": {
+                "max_pool_size": self.mongo_max_pool_size,
+                "open_connections": self.mongo_listener.open_connections,
+                "in_use": self.mongo_listener.checked_out,
+                "utilisation": self.mongo_listener.checked_out / self.mongo_max_pool_size
+            },
+            "redis": {
+                "max_connections": self.redis_max_connections,
+                "open_connections": self.redis_pool.created_connections,
+                "in_use": redis_in_use,
+                "utilisation": redis_in_use / self.redis_max_connections
+            },
+            "rabbitmq": {
+                "connected": self.rabbitmq_service._is_connected
+            }
+        }
+        for pool, values in stats.items():
+            for name, value in values.items():
+                metrics.set_gauge(f"pool.{pool}.{name}", float(value))
+        return stats
+
+
+_container: Optional[ServiceContainer] = None
+
+def get_container() -> ServiceContainer:
+    """Trả về container dùng chung cho toàn process, tạo ở lần gọi đầu tiên (khi app khởi động,
+    không phải lúc import) để việc import không cần cấu hình kết nối"""
+    global _container
+    if _container is None:
+        _container = ServiceContainer()
+    return _container
@@ -1,22 +1,38 @@
 from datetime import datetime, UTC
+import asyncio
 import logging
+import os
 from ..models.task import Task, TaskStatus
 from ..services.crawler import Crawler
 from ..services.gemini_service import GeminiService
 from ..services.mongodb_service import MongoDBService
 from ..services.rabbitmq_service import RabbitMQService
 from ..services.redis_service import RedisService
+from ..services.task_unit_of_work import TaskUnitOfWork
 from typing import List, Dict, Any
 
 logger = logging.getLogger(__name__)
 
 class CrawlService:
-    def __init__(self):
-        self.mongodb_service = MongoDBService()
-        self.redis_service = RedisService()
-        self.rabbitmq_service = RabbitMQService()
-        self.gemini_service = GeminiService()
+    def __init__(self, mongodb_service: MongoDBService = None, redis_service: RedisService = None,
+                 rabbitmq_service: RabbitMQService = None, gemini_service: GeminiService = None):
+        """Khởi tạo CrawlService
+        
+        Args:
+            mongodb_service: MongoDB service dùng chung (mặc định tạo mới)
+            redis_service: Redis service dùng chung (mặc định tạo mới)
+            rabbitmq_service: RabbitMQ service dùng chung (mặc định tạo mới)
+            gemini_service: Gemini service dùng chung (mặc định tạo mới)
+        """
+        self.mongodb_service = mongodb_service or MongoDBService()
+        self.redis_service = redis_service or RedisService(self.mongodb_service)
+        self.rabbitmq_service = rabbitmq_service or RabbitMQService()
+        self.gemini_service = gemini_service or GeminiService()
         self.crawler = Crawler(self.redis_service, self.mongodb_service)
+        # "sync": API chờ Gemini trích xuất chủ đề; "async": API trả về ngay, worker trích xuất chủ đề
+        self.topic_extraction_mode = os.getenv("TOPIC_EXTRACTION_MODE", "sync")
+        # "concurrent": crawl đồng thời mọi cặp (chủ đề, nguồn); "sequential": lần lượt từng chủ đề
+        self.crawl_mode = os.getenv("CRAWL_MODE", "concurrent")
 
     async def create_crawl_task(self, userId: str, topic: str, sources: List[str], audience: str, style: str, language: str, length: str, limit: int = 1) -> Dict[str, Any]:
         """Tạo task crawl mới
@@ -35,8 +51,11 @@ class CrawlService:
             Dict chứa thông tin task và chủ đề đã trích xuất
         """
         try:
-            # Trích xuất chủ đề con bằng Gemini
-            extracted_topics = await self.gemini_service.extract_topic(topic, language)
+            # Trích xuất chủ đề con bằng Gemini; ở chế độ async việc này do worker thực hiện
+            if self.topic_extraction_mode == "async":
+                extracted_topics = []
+            else:
+                extracted_topics = await self.gemini_service.extract_topic(topic, language)
             
             # Tạo task mới
             task = Task(
@@ -92,70 +111,41 @@ class CrawlService:
         """
         task_id = data["task_id"]
         crawl_data = data["data"]
-        crawler = None
-        all_results = []
         limit = crawl_data.get("limit", 5)  # Mặc định giới hạn 5 kết quả
 
+        # Gom các thao tác ghi MongoDB của task, chỉ ghi ở cuối mỗi giai đoạn
+        uow = TaskUnitOfWork(self.mongodb_service, task_id)
+
         try:
             logger.info(f"Processing task {task_id}")
             # Cập nhật trạng thái task
-            await self.mongodb_service.update_task_status(task_id, TaskStatus.IN_PROGRESS)
+            uow.set_status(TaskStatus.IN_PROGRESS)
+            await uow.flush()
             
-            # Thực hiện crawl dữ liệu cho từng chủ đề
-            for topic in crawl_data["topics"]:
-                try:
-                    logger.info(f"Crawling topic: {topic}")
-                    crawler = Crawler(self.redis_service, self.mongodb_service)
-                    results = await crawler.crawl(
-                        task_id=task_id,
-                        topic=topic,
-                        sources=crawl_data["sources"],
-                        language=crawl_data["language"]
-                    )
-                    
-                    # Kiểm tra kết quả crawl chi tiết
-                    if not results:
-                        logger.warning(f"No results returned for topic {topic}")
-                        continue
-                        
-                    # Kiểm tra từng nguồn dữ liệu
-                    valid_results = {source: content for source, content in results.items() 
-                                   if content and content.strip()}
-                    
-                    if not valid_results:
-                        logger.warning(f"No valid content found for topic {topic}")
-                        continue
-                        
-                    logger.info(f"Successfully crawled topic {topic} from sources: {list(valid_results.keys())}")
-                    
-                    # Thêm kết quả vào danh sách
-                    for source, content in valid_results.items():
-                        all_results.append({
-                            "title": topic,
-                            "content": content
-                        })
-                        
-                        # Kiểm tra giới hạn số lượng kết quả
-                        if len(all_results) >= limit:
-                            logger.info(f"Reached limit of {limit} results")
-                            break
-                    
-                    # Nếu đã đạt giới hạn, dừng vòng lặp
-                    if len(all_results) >= limit:
-                        break
-                        
-                except Exception as e:
-                    logger.error(f"Error crawling topic {topic}: {str(e)}")
-                    continue
-                finally:
-                    if crawler:
-                        await crawler.close()
-                        crawler = None
+            # Bước đầu tiên của pipeline: trích xuất chủ đề nếu API chưa làm
+            if not crawl_data.get("topics"):
+                crawl_data["topics"] = await self.gemini_service.extract_topic(
+                    crawl_data["input_user"],
+                    crawl_data["language"]
+                )
+                uow.set_fields(topics=crawl_data["topics"])
+                await uow.flush()
+                logger.info(f"Extracted topics for task {task_id}: {crawl_data['topics']}")
+            
+            # Thực hiện crawl dữ liệu cho các chủ đề
+            if self.crawl_mode == "sequential":
+                all_results = await self._crawl_sequential(task_id, crawl_data, limit, uow)
+            else:
+                all_results = await self._crawl_concurrent(task_id, crawl_data, limit, uow)
             
-            # Cập nhật trạng thái hoàn thành
-            await self.mongodb_service.update_task_status(task_id, TaskStatus.COMPLETED)
+            # Ghi kết quả, result_ids và trạng thái hoàn thành trong một lần
+            uow.set_status(TaskStatus.COMPLETED)
+            await uow.flush()
             logger.info(f"Task {task_id} completed successfully")
             
+            # Cộng điểm phổ biến cho các chủ đề có kết quả
+            await self.redis_service.record_popular_topics([result["title"] for result in all_results])
+            
             # Gửi dữ liệu lên script_generate_queue
             if all_results:
                 generate_data = {
@@ -176,8 +166,114 @@ class CrawlService:
             
         except Exception as e:
             logger.error(f"Error processing task {task_id}: {str(e)}")
-            # Cập nhật trạng thái lỗi
-            await self.mongodb_service.update_task_status(task_id, TaskStatus.FAILED, str(e))
+            # Cập nhật trạng thái lỗi (kèm các kết quả đã crawl được)
+            uow.set_status(TaskStatus.FAILED, str(e))
+            await uow.flush()
         finally:
-            if crawler:
-                await crawler.close() 
\ No newline at end of file
+            uow.record_metrics()
+
+    async def _crawl_pair(self, task_id: str, topic: str, source: str, language: str, uow: TaskUnitOfWork) -> str:
+        """Crawl một cặp (chủ đề, nguồn), giới hạn đồng thời và thời hạn do nguồn khai báo"""
+        logger.info(f"Crawling topic {topic} from {source}")
+        return await self.crawler.crawl_source(task_id, topic, source, language, uow)
+
+    async def _crawl_concurrent(self, task_id: str, crawl_data: Dict[str, Any], limit: int,
+                                uow: TaskUnitOfWork = None) -> List[Dict[str, str]]:
+        """Crawl đồng thời tất cả các cặp (chủ đề, nguồn), dừng sớm khi đủ limit kết quả
+        
+        Args:
+            task_id: ID của task
+            crawl_data: Dữ liệu task từ RabbitMQ
+            limit: Số lượng kết quả hợp lệ cần thu thập
+            uow: Unit of work gom các thao tác ghi của task
+            
+        Returns:
+            List[Dict[str, str]]: Kết quả theo thứ tự chủ đề/nguồn ban đầu
+        """
+        pairs = [(topic, source) for topic in crawl_data["topics"] for source in crawl_data["sources"]]
+        tasks = {
+            asyncio.create_task(self._crawl_pair(task_id, topic, source, crawl_data["language"], uow)): index
+            for index, (topic, source) in enumerate(pairs)
+        }
+        collected = {}
+        pending = set(tasks)
+        try:
+            while pending and len(collected) < limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    topic, source = pairs[tasks[finished]]
+                    try:
+                        content = finished.result()
+                    except Exception as e:
+                        logger.error(f"Error crawling topic {topic} from {source}: {str(e)}")
+                        continue
+                    if not content or not content.strip():
+                        logger.warning(f"No valid content found for topic {topic} from {source}")
+                        continue
+                    collected[tasks[finished]] = {"title": topic, "content": content}
+            if len(collected) >= limit:
+                logger.info(f"Reached limit of {limit} results, cancelling {len(pending)} pending fetches")
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        return [collected[index] for index in sorted(collected)][:limit]
+
+    async def _crawl_sequential(self, task_id: str, crawl_data: Dict[str, Any], limit: int,
+                                uow: TaskUnitOfWork = None) -> List[Dict[str, str]]:
+        """Crawl lần lượt từng chủ đề (chế độ cũ)
+        
+        Args:
+            task_id: ID của task
+            crawl_data: Dữ liệu task từ RabbitMQ
+            limit: Số lượng kết quả hợp lệ cần thu thập
+            uow: Unit of work gom các thao tác ghi của task
+            
+        Returns:
+            List[Dict[str, str]]: Kết quả crawl được
+        """
+        all_results = []
+        for topic in crawl_data["topics"]:
+            try:
+                logger.info(f"Crawling topic: {topic}")
+                results = await self.crawler.crawl(
+                    task_id=task_id,
+                    topic=topic,
+                    sources=crawl_data["sources"],
+                    language=crawl_data["language"],
+                    uow=uow
+                )
+                
+                # Kiểm tra kết quả crawl chi tiết
+                if not results:
+                    logger.warning(f"No results returned for topic {topic}")
+                    continue
+                    
+                # Kiểm tra từng nguồn dữ liệu
+                valid_results = {source: content for source, content in results.items() 
+                               if content and content.strip()}
+                
+                if not valid_results:
+                    logger.warning(f"No valid content found for topic {topic}")
+                    continue
+                    
+                logger.info(f"Successfully crawled topic {topic} from sources: {list(valid_results.keys())}")
+                
+                # Thêm kết quả vào danh sách
+                for source, content in valid_results.items():
+                    all_results.append({
+                        "title": topic,
+                        "content": content
+                    })
+                    
+                    # Kiểm tra giới hạn số lượng kết quả
+                    if len(all_results) >= limit:
+                        logger.info(f"Reached limit of {limit} results")
+                        return all_results
+                    
+            except Exception as e:
+                logger.error(f"Error crawling topic {topic}: {str(e)}")
+                continue
+        return all_results 
\ No newline at end of file
@@ -1,242 +1,466 @@
-import wikipediaapi
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Awaitable
 import logging
 import os
-import requests
 import asyncio
 from datetime import datetime, UTC
-import json
 from bson.objectid import ObjectId
+from .metrics import metrics
+from .source_registry import SourceRegistry, get_source_registry
+from ..models.cache_entry import TopicCacheEntry
+from .task_unit_of_work import TaskUnitOfWork
+from .single_flight import SingleFlight
+from .revalidator import Revalidator
 
 
 logger = logging.getLogger(__name__)
 
 class Crawler:
-    def __init__(self, redis_service, mongodb_service):
+    def __init__(self, redis_service, mongodb_service, sources: Optional[SourceRegistry] = None):
         """Khởi tạo Crawler
         
         Args:
             redis_service: Redis service instance
             mongodb_service: MongoDB service instance
+            sources: Registry các nguồn dữ liệu (mặc định dùng registry chung của process)
         """
-        # User agent format: <project-name>/<version> (<contact-url>; <email>)
-        # Ví dụ: TKPM-Data-Crawler/1.0 (https://github.com/quockhanh41/User-Management-Service.git; quockhanh41@gmail.com)
-        self.wiki = wikipediaapi.Wikipedia(
-            user_agent=os.getenv('WIKIPEDIA_API_USER_AGENT'),
-            language='en'  # Default language, will be changed in crawl_wikipedia
-        )
+        # Các nguồn (Wikipedia, Nature, PubMed, plugin) chỉ được import khi được dùng lần đầu
+        self.sources = sources or get_source_registry()
+        # Thời gian chờ cache trước khi gửi request song song tới upstream (giây)
+        self.cache_hedge_delay = float(os.getenv("CACHE_HEDGE_DELAY", 0.25))
         self.redis_service = redis_service
         self.mongodb_service = mongodb_service
+        # Gộp các lần crawl cùng (nguồn, chủ đề, ngôn ngữ) giữa các worker: chỉ một worker gọi upstream
+        self.single_flight = None
+        if os.getenv("CRAWL_SINGLE_FLIGHT", "true").lower() == "true":
+            self.single_flight = SingleFlight(redis_service, "crawl")
+        # Lease của single-flight giữ lâu hơn thời hạn crawl của nguồn một khoảng này (giây)
+        self.single_flight_margin = float(os.getenv("SINGLE_FLIGHT_LEASE_MARGIN", 5))
+        # Stale-while-revalidate: trả nội dung cache ngay, kiểm tra lại ở nền khi quá soft TTL của nguồn
+        self.revalidator = None
+        if os.getenv("FRESHNESS_REVALIDATE", "true").lower() == "true":
+            self.revalidator = Revalidator(self)
 
-    async def check_redis_cache(self, topic: str, language: str) -> Optional[tuple]:
+    async def check_redis_cache(self, topic: str, language: str, source: str = "wikipedia") -> Optional[tuple]:
         """Kiểm tra dữ liệu trong Redis cache
         
         Args:
             topic: Chủ đề cần kiểm tra
             language: Ngôn ngữ
+            source: Nguồn dữ liệu
             
         Returns:
-            tuple: (content, result_id) từ cache nếu có, None nếu không có
+            tuple: (content, result_id, freshness) từ cache nếu có, None nếu không có
         """
         try:
-            cached_content = await self.redis_service.get_topic_data(topic, language)
-            if cached_content:
+            entry = await self.redis_service.get_topic_data(topic, language, source)
+            if entry:
                 logger.info(f"Found cached content for {topic} in {language}")
-                # Parse JSON data từ Redis
-                data = json.loads(cached_content)
-                return data.get("text"), data.get("resultId")
+                return entry.text, entry.result_id, entry.freshness()
             return None
         except Exception as e:
             logger.error(f"Error checking Redis cache: {str(e)}")
             return None
 
-    async def check_mongodb(self, topic: str, language: str) -> Optional[tuple]:
+    async def check_mongodb(self, topic: str, language: str, source: str = "wikipedia") -> Optional[tuple]:
         """Kiểm tra dữ liệu trong MongoDB
         
         Args:
             topic: Chủ đề cần kiểm tra
             language: Ngôn ngữ
+            source: Nguồn dữ liệu
             
         Returns:
-            tuple: (text, _id) từ MongoDB nếu có, None nếu không có
+            tuple: (text, _id, freshness) từ MongoDB nếu có, None nếu không có
         """
         try:
-            result = await self.mongodb_service.results_collection.find_one({
-                "topic": topic,
-                "language": language
-            })
+            # Tìm bản mới nhất qua index (topics, language, source, created_at), chỉ trả về _id; topics gồm cả
+            # các chủ đề có cùng nội dung với chủ đề đầu tiên (ví dụ redirect)
+            probe = await self.mongodb_service.results_collection.find_one(
+                {"topics": topic, "language": language, "source": source},
+                {"_id": 1},
+                sort=[("created_at", -1)]
+            )
+            if not probe:
+                return None
+            # Chỉ đọc nội dung và freshness khi có kết quả
+            result = await self.mongodb_service.results_collection.find_one(
+                {"_id": probe["_id"]},
+                {"text": 1, "text_z": 1, "compression": 1, "created_at": 1, "validated_at": 1, "validators": 1,
+                 "warmed": 1}
+            )
             if result:
                 logger.info(f"Found content in MongoDB for {topic} in {language}")
-                return result["text"], str(result["_id"])
+                freshness = {
+                    "validated_at": result.get("validated_at") or result.get("created_at"),
+                    "validators": result.get("validators"),
+                    "warmed": bool(result.get("warmed"))
+                }
+                return self.mongodb_service.decode_text(result), str(result["_id"]), freshness
             return None
         except Exception as e:
             logger.error(f"Error checking MongoDB: {str(e)}")
             return None
 
-    async def crawl_wikipedia(self, topic: str, language: str) -> tuple:
-        """Crawl dữ liệu từ Wikipedia
+    async def _lookup_cache_tiers(self, topic: str, language: str, source: str = "wikipedia") -> Optional[tuple]:
+        """Tra cứu lần lượt các tầng cache cục bộ (Redis -> MongoDB)
         
         Args:
-            topic: Chủ đề cần crawl
+            topic: Chủ đề cần kiểm tra
             language: Ngôn ngữ
+            source: Nguồn dữ liệu
             
         Returns:
-            tuple: (content, None) nếu crawl thành công, ("", None) nếu thất bại
+            tuple: (content, result_id, tier, freshness) từ tầng đầu tiên có dữ liệu, None nếu không tầng nào có
+        """
+        for tier, lookup in (("redis", self.check_redis_cache), ("mongodb", self.check_mongodb)):
+            with metrics.timer(f"cache.{tier}.latency"):
+                result = await lookup(topic, language, source)
+            if result is not None and result[0]:
+                # Nội dung do worker làm ấm cache nạp trước được tính riêng (warm hit)
+                metrics.incr(f"cache.{tier}.warm_hit" if result[2].get("warmed") else f"cache.{tier}.hit")
+                return result[0], result[1], tier, result[2]
+            metrics.incr(f"cache.{tier}.miss")
+        return None
+
+    async def _populate_cache(self, topic: str, language: str, source: str, content: str, result_id: str,
+                              validated_at: Optional[datetime] = None, validators: Optional[dict] = None,
+                              warmed: bool = False):
+        """Ghi nội dung vào Redis theo định dạng entry chung
+        
+        Args:
+            validated_at: Thời điểm nội dung được xác nhận với upstream (None: vừa lấy xong)
+            validators: Revision id/ETag để kiểm tra lại nội dung
+            warmed: Nội dung do worker làm ấm cache nạp trước, chưa được người dùng đọc
+        """
+        entry = TopicCacheEntry.create(
+            result_id=result_id,
+            topic=topic,
+            source=source,
+            language=language,
+            text=content,
+            validated_at=validated_at,
+            validators=validators,
+            warmed=warmed
+        )
+        plugin = self.sources.get(source)
+        ttl = plugin.cache_ttl if plugin is not None else self.redis_service.topic_ttl
+        await self.redis_service.set_topic_data(entry, ttl=ttl)
+
+    async def _store_result(self, task_id: str, topic: str, source: str, language: str, content: str,
+                            uow: Optional[TaskUnitOfWork] = None, extra: Optional[dict] = None) -> Optional[str]:
+        """Lưu kết quả mới vào MongoDB và Redis
+        
+        Khi có unit of work, kết quả được gom lại và chỉ ghi (kèm cache) khi flush.
+        
+        Args:
+            extra: Các trường bổ sung của kết quả (ví dụ thông tin các bài báo)
+        
+        Returns:
+            str: ID của kết quả, None nếu lưu thất bại
         """
+        validators = (extra or {}).get("validators")
+        warmed = bool((extra or {}).get("warmed"))
+        if uow is not None:
+            result_id = uow.add_result(topic, source, language, content, extra)
+            uow.after_flush(lambda: self._populate_cache(topic, language, source, content, result_id,
+                                                         validators=validators, warmed=warmed))
+            return result_id
         try:
-            # Sử dụng instance Wikipedia đã được tạo trong __init__
-            self.wiki.language = language
-            
-            # Lấy trang
-            page = self.wiki.page(topic)
-            
-            if page.exists():
-                content = page.text
-                # Lưu vào Redis set TTL is 1 hour
-                await self.redis_service.redis_client.set(f"topic: {topic}, language: {language}", json.dumps(content), ex=3600)
-                return content, None
+            result_id = await self.mongodb_service.insert_result(
+                task_id=task_id,
+                topic=topic,
+                source=source,
+                language=language,
+                text=content,
+                extra=extra,
+                # Người gọi gắn kết quả vào task qua _link_result (gom vào unit of work nếu có)
+                link_task=False
+            )
+            if result_id:
+                logger.info(f"Successfully inserted result for topic {topic} with ID {result_id}")
+                await self._populate_cache(topic, language, source, content, result_id,
+                                           validators=validators, warmed=warmed)
             else:
-                logger.warning(f"Wikipedia page not found for topic: {topic}")
-                return "", None
+                logger.error(f"Failed to insert result for topic {topic} - No result ID returned")
+            return result_id
         except Exception as e:
-            logger.error(f"Error crawling Wikipedia: {str(e)}")
-            return "", None
+            logger.error(f"Error inserting result into MongoDB for topic {topic}: {str(e)}")
+            return None
 
-    async def crawl_nature(self, topic: str, language: str) -> str:
-        # Implement Nature crawling logic
+    async def _link_result(self, task_id: str, result_id: str, uow: Optional[TaskUnitOfWork] = None):
+        """Thêm result_id vào mảng result_ids của task"""
+        if uow is not None:
+            uow.link_result(result_id)
+            return
         try:
-            # Implement Nature crawling logic
-            api_key = os.getenv('NATURE_API_KEY')
-            api_url = os.getenv('NATURE_API_URL')
+            await self.mongodb_service.tasks_collection.update_one(
+                {"_id": ObjectId(task_id)},
+                {
+                    "$addToSet": {"result_ids": result_id},
+                    "$set": {"updated_at": datetime.now(UTC)}
+                }
+            )
+            logger.info(f"Added result_id {result_id} to task {task_id}")
+        except Exception as e:
+            logger.error(f"Error adding result_id to task {task_id}: {str(e)}")
 
-            # Tạo truy vấn tìm kiếm 
-            query = f"q={topic}&api_key={api_key}&p=10"  # Lấy tối đa 10 kết quả
+    async def _fetch_upstream(self, task_id: str, topic: str, language: str, source: str,
+                              fetch: Callable[[str, str], Awaitable[tuple]],
+                              uow: Optional[TaskUnitOfWork] = None) -> tuple:
+        """Lấy nội dung mới từ upstream và lưu kết quả
+        
+        Khi bật single-flight, chỉ một worker gọi upstream cho mỗi (nguồn, chủ đề, ngôn ngữ);
+        các worker khác dùng lại result_id của worker đó.
+        
+        Args:
+            fetch: Hàm crawl của nguồn, trả về (content, extra)
+        
+        Returns:
+            tuple: (content, result_id), ("", None) nếu không có nội dung
+        """
+        if self.single_flight is None:
+            content, extra = await fetch(topic, language)
+            result_id = await self._store_result(task_id, topic, source, language, content, uow, extra) if content else None
+            return content, result_id
 
-            # Gửi yêu cầu GET đến API
-            response = requests.get(f"{api_url}/search", params=query)
-            response.raise_for_status()  # Ném ra lỗi nếu trả về không thành công
+        async def lead():
+            content, extra = await fetch(topic, language)
+            # Ghi ngay thay vì qua unit of work để các worker đang chờ đọc được kết quả; chỉ lưu
+            # document kết quả, việc gắn vào task do người gọi thực hiện (qua unit of work nếu có)
+            result_id = await self._store_result(task_id, topic, source, language, content, extra=extra) if content else None
+            return (content, result_id), result_id or ""
 
-            # Xử lý dữ liệu trả về
-            data = response.json()
-            print(data)
+        async def follow(result_id: str):
+            return await self._load_result(topic, language, source, result_id)
 
-            return ""
+        # Leader có thể chạy tới hết thời hạn crawl của nguồn (ví dụ 45 giây với PubMed); lease hết hạn sớm
+        # hơn thì các worker đang chờ sẽ tự gọi upstream
+        plugin = self.sources.get(source)
+        lease_ttl = plugin.timeout + self.single_flight_margin if plugin is not None else None
+        return await self.single_flight.run(f"{source}:{language}:{topic}", lead, follow, lease_ttl=lease_ttl)
+
+    async def _load_result(self, topic: str, language: str, source: str, result_id: str) -> Optional[tuple]:
+        """Đọc kết quả do worker khác vừa lưu
+        
+        Returns:
+            tuple: (content, result_id), ("", None) nếu worker đó không tìm thấy nội dung,
+                None nếu không đọc được kết quả
+        """
+        if not result_id:
+            return "", None
+        cached = await self.check_redis_cache(topic, language, source)
+        if cached and cached[1] == result_id:
+            return cached[:2]
+        result = await self.mongodb_service.get_result(result_id)
+        if result:
+            return result["text"], result_id
+        return None
+
+    def _revalidate_if_stale(self, topic: str, language: str, source: str, content: str, result_id: str,
+                             freshness: dict):
+        """Xếp hàng kiểm tra lại ở nền khi nội dung cache đã quá soft TTL của nguồn"""
+        plugin = self.sources.get(source)
+        if plugin is None or not result_id:
+            return
+        if not plugin.is_stale(freshness.get("validated_at"), language):
+            metrics.incr(f"freshness.{source}.fresh")
+            return
+        metrics.incr(f"freshness.{source}.stale")
+        if self.revalidator is not None:
+            self.revalidator.schedule(source, topic, language, content, result_id, freshness.get("validators"))
+
+    async def _crawl_read_through(self, task_id: str, topic: str, language: str, source: str,
+                                  fetch: Callable[[str, str], Awaitable[tuple]],
+                                  uow: Optional[TaskUnitOfWork] = None) -> str:
+        """Crawl một chủ đề từ một nguồn theo cơ chế read-through cache và gắn kết quả vào task
+        
+        Các tầng cache được kiểm tra trước; request tới upstream chỉ được gửi khi cache
+        không có dữ liệu, hoặc gửi song song (hedged) nếu cache chưa trả lời sau
+        cache_hedge_delay giây.
+        
+        Args:
+            task_id: ID của task
+            topic: Chủ đề cần crawl
+            language: Ngôn ngữ
+            source: Nguồn dữ liệu
+            fetch: Hàm crawl của nguồn, trả về (content, extra)
+            uow: Unit of work gom các thao tác ghi của task (None để ghi ngay)
+            
+        Returns:
+            str: Nội dung crawl được, chuỗi rỗng nếu thất bại
+        """
+        cache_task = asyncio.create_task(self._lookup_cache_tiers(topic, language, source))
+        upstream_task = None
+        try:
+            done, _ = await asyncio.wait({cache_task}, timeout=self.cache_hedge_delay)
+            if done:
+                cached = cache_task.result()
+            else:
+                # Cache chưa trả lời kịp, gửi request tới upstream song song
+                metrics.incr("cache.upstream.hedged")
+                upstream_task = asyncio.create_task(self._fetch_upstream(task_id, topic, language, source, fetch, uow))
+                done, _ = await asyncio.wait({cache_task, upstream_task}, return_when=asyncio.FIRST_COMPLETED)
+                if upstream_task in done and upstream_task.result()[0]:
+                    cache_task.cancel()
+                    cached = None
+                else:
+                    cached = await cache_task
+
+            if cached:
+                content, result_id, tier, freshness = cached
+                logger.info(f"Using content from {tier} for topic {topic} ({source})")
+                # Nạp lại Redis khi dữ liệu lấy từ MongoDB (giữ thời điểm xác nhận của bản gốc);
+                # nội dung được làm ấm trước chỉ tính warm hit ở lần đọc đầu tiên nên bỏ đánh dấu
+                if result_id and (tier == "mongodb" or freshness["warmed"]):
+                    await self._populate_cache(topic, language, source, content, result_id,
+                                               validated_at=freshness["validated_at"],
+                                               validators=freshness["validators"])
+                if result_id and freshness["warmed"]:
+                    await self.mongodb_service.clear_warmed(result_id)
+                self._revalidate_if_stale(topic, language, source, content, result_id, freshness)
+            else:
+                if upstream_task is None:
+                    upstream_task = asyncio.create_task(self._fetch_upstream(task_id, topic, language, source, fetch, uow))
+                # Kết quả mới từ upstream đã được lưu vào MongoDB
+                content, result_id = await upstream_task
+                logger.info(f"Using content from {source} for topic {topic}")
+            
+            # Thêm result_id vào mảng result_ids của task nếu có
+            if result_id:
+                await self._link_result(task_id, result_id, uow)
+            
+            return content
+            
         except Exception as e:
-            logger.error(f"Error crawling Nature: {str(e)}")
+            logger.error(f"Error processing {source} crawl for topic {topic}: {str(e)}")
             return ""
+        finally:
+            # Hủy các request còn đang chạy (kể cả khi task bị hủy từ bên ngoài)
+            for task in (cache_task, upstream_task):
+                if task is not None and not task.done():
+                    task.cancel()
 
-    async def crawl_pubmed(self, topic: str) -> str:
-        # Implement PubMed crawling logic
-        return ""
+    async def crawl_source(self, task_id: str, topic: str, source: str, language: str,
+                           uow: Optional[TaskUnitOfWork] = None) -> str:
+        """Crawl một chủ đề từ một nguồn dữ liệu trong giới hạn đồng thời và thời hạn của nguồn
+        
+        Args:
+            task_id: ID của task
+            topic: Chủ đề cần crawl
+            source: Tên nguồn trong registry (wikipedia, nature, pubmed, plugin)
+            language: Ngôn ngữ
+            uow: Unit of work gom các thao tác ghi của task (None để ghi ngay)
+            
+        Returns:
+            str: Nội dung crawl được, chuỗi rỗng nếu không có hoặc quá hạn
+        """
+        plugin = self.sources.get(source)
+        if plugin is None:
+            logger.warning(f"Unknown source: {source}")
+            return ""
 
-    async def crawl(self, task_id: str, topic: str, sources: List[str], language: str) -> Dict[str, str]:
-        """Crawl dữ liệu từ nhiều nguồn
+        async def run() -> str:
+            async with plugin.semaphore:
+                return await self._crawl_read_through(task_id, topic, language, source, plugin.crawl, uow)
+
+        try:
+            with metrics.timer(f"source.{source}.latency"):
+                return await asyncio.wait_for(run(), timeout=plugin.timeout)
+        except asyncio.TimeoutError:
+            metrics.incr(f"source.{source}.timeout")
+            logger.warning(f"Crawling topic {topic} from {source} exceeded {plugin.timeout}s, skipping source")
+            return ""
+
+    async def crawl(self, task_id: str, topic: str, sources: List[str], language: str,
+                    uow: Optional[TaskUnitOfWork] = None) -> Dict[str, str]:
+        """Crawl dữ liệu từ nhiều nguồn song song, mỗi nguồn có thời hạn riêng
+        
+        Nguồn lỗi hoặc quá hạn trả về chuỗi rỗng, kết quả của các nguồn khác vẫn được giữ.
         
         Args:
             task_id: ID của task
             topic: Chủ đề cần crawl
             sources: Danh sách nguồn dữ liệu
             language: Ngôn ngữ
+            uow: Unit of work gom các thao tác ghi của task (None để ghi ngay)
             
         Returns:
             Dict[str, str]: Kết quả crawl từ các nguồn
         """
+        contents = await asyncio.gather(
+            *(self.crawl_source(task_id, topic, source, language, uow) for source in sources),
+            return_exceptions=True
+        )
         results = {}
-        for source in sources:
-            if source == "wikipedia":
-                try:
-                    # Tạo các task cho 3 nguồn dữ liệu
-                    redis_task = asyncio.create_task(self.check_redis_cache(topic, language))
-                    mongodb_task = asyncio.create_task(self.check_mongodb(topic, language))
-                    wiki_task = asyncio.create_task(self.crawl_wikipedia(topic, language))
-                    
-                    # Đợi task đầu tiên hoàn thành và có kết quả khác None
-                    while True:
-                        done, pending = await asyncio.wait(
-                            [redis_task, mongodb_task, wiki_task],
-                            return_when=asyncio.FIRST_COMPLETED
-                        )
-                        
-                        completed_task = done.pop()
-                        result = completed_task.result()
-                        
-                        # Nếu có kết quả hợp lệ, dừng vòng lặp
-                        if result is not None and result[0] != "":
-                            # Hủy các task còn lại
-                            for task in pending:
-                                task.cancel()
-                            break
-                            
-                        # Nếu wiki_task trả về kết quả rỗng, dừng vòng lặp
-                        if completed_task == wiki_task:
-                            # Hủy các task còn lại
-                            for task in pending:
-                                task.cancel()
-                            break
-                            
-                        # Nếu không có kết quả, tiếp tục đợi task khác
-                        if completed_task == redis_task:
-                            redis_task = asyncio.create_task(self.check_redis_cache(topic, language))
-                        elif completed_task == mongodb_task:
-                            mongodb_task = asyncio.create_task(self.check_mongodb(topic, language))
-                        else:
-                            wiki_task = asyncio.create_task(self.crawl_wikipedia(topic, language))
-                    
-                    content, result_id = result
-                    
-                    # Xác định nguồn dữ liệu
-                    if completed_task == redis_task:
-                        logger.info(f"Using cached content from Redis for topic {topic}")
-                    elif completed_task == mongodb_task:
-                        logger.info(f"Using content from MongoDB for topic {topic}")
-                    else:
-                        logger.info(f"Using content from Wikipedia for topic {topic}")
-                        # Lưu vào MongoDB nếu có dữ liệu mới từ Wikipedia
-                        if content:
-                            try:
-                                result_id = await self.mongodb_service.insert_result(
-                                    task_id=task_id,
-                                    topic=topic,
-                                    source=source,
-                                    language=language,
-                                    text=content
-                                )
-                                if result_id:
-                                    logger.info(f"Successfully inserted result for topic {topic} with ID {result_id}")
-                                else:
-                                    logger.error(f"Failed to insert result for topic {topic} - No result ID returned")
-                            except Exception as e:
-                                logger.error(f"Error inserting result into MongoDB for topic {topic}: {str(e)}")
-                    
-                    # Thêm result_id vào mảng result_ids của task nếu có
-                    if result_id:
-                        try:
-                            await self.mongodb_service.tasks_collection.update_one(
-                                {"_id": ObjectId(task_id)},
-                                {
-                                    "$addToSet": {"result_ids": result_id},
-                                    "$set": {"updated_at": datetime.now(UTC)}
-                                }
-                            )
-                            logger.info(f"Added result_id {result_id} to task {task_id}")
-                        except Exception as e:
-                            logger.error(f"Error adding result_id to task {task_id}: {str(e)}")
-                    
-                    results[source] = content
-                    
-                except Exception as e:
-                    logger.error(f"Error processing Wikipedia crawl for topic {topic}: {str(e)}")
-                    results[source] = ""
-            elif source == "nature":
-                results[source] = await self.crawl_nature(topic, language)
-            elif source == "pubmed":
-                results[source] = await self.crawl_pubmed(topic)
+        for source, content in zip(sources, contents):
+            if isinstance(content, Exception):
+                logger.error(f"Error crawling topic {topic} from {source}: {str(content)}")
+                content = ""
+            results[source] = content
         return results
 
+    async def warm(self, topic: str, language: str, source: str,
+                   admit: Optional[Callable[[], Awaitable[bool]]] = None) -> str:
+        """Nạp trước nội dung của một chủ đề vào MongoDB và Redis (dùng cho worker làm ấm cache)
+        
+        Không tính hit/miss của cache như request của người dùng. Nội dung đã có và còn mới
+        chỉ được nạp lại vào Redis nếu thiếu; nội dung đã cũ được kiểm tra lại với upstream.
+        
+        Args:
+            topic: Chủ đề
+            language: Ngôn ngữ
+            source: Tên nguồn trong registry
+            admit: Được gọi trước mỗi lần gửi request tới upstream, trả về False để bỏ qua
+                (ví dụ khi đã hết budget của worker)
+            
+        Returns:
+            str: "fresh" (đã có trong Redis), "promoted" (nạp từ MongoDB vào Redis),
+                "revalidated" (đã kiểm tra lại nội dung cũ), "warmed" (vừa crawl), "empty" (upstream
+                không có nội dung), "over_budget" (admit từ chối) hoặc "unknown" (nguồn chưa đăng ký)
+        """
+        plugin = self.sources.get(source)
+        if plugin is None:
+            return "unknown"
+
+        tier = "redis"
+        cached = await self.check_redis_cache(topic, language, source)
+        if not cached or not cached[0]:
+            tier = "mongodb"
+            cached = await self.check_mongodb(topic, language, source)
+        if cached and cached[0]:
+            content, result_id, freshness = cached
+            if self.revalidator is not None and result_id and plugin.is_stale(freshness.get("validated_at"), language):
+                if admit is not None and not await admit():
+                    return "over_budget"
+                await self.revalidator.revalidate(source, topic, language, content, result_id,
+                                                  freshness.get("validators"))
+                return "revalidated"
+            if tier == "redis":
+                return "fresh"
+            await self._populate_cache(topic, language, source, content, result_id,
+                                       validated_at=freshness["validated_at"], validators=freshness["validators"],
+                                       warmed=True)
+            return "promoted"
+
+        async def fetch(topic: str, language: str) -> tuple:
+            content, extra = await plugin.crawl(topic, language)
+            return content, {**(extra or {}), "warmed": True} if content else extra
+
+        if admit is not None and not await admit():
+            return "over_budget"
+
+        async def run() -> tuple:
+            async with plugin.semaphore:
+                return await self._fetch_upstream(None, topic, language, source, fetch)
+
+        content, _ = await asyncio.wait_for(run(), timeout=plugin.timeout)
+        return "warmed" if content else "empty"
+
     async def close(self):
-        """Đóng kết nối"""
-        # No need to close anything for wikipedia-api
-        pass 
+        """Dừng các lần kiểm tra lại đang chạy ở nền"""
+        # Các nguồn trong registry dùng chung, được đóng khi app shutdown
+        if self.revalidator is not None:
+            await self.revalidator.close()
 
 # # test wikipedia
 # if __name__ == "__main__":
@@ -244,7 +468,7 @@ class Crawler:
     
 #     async def main():
 #         crawler = Crawler()
-#         result = await crawler.crawl_wikipedia("AI", "en")
+#         result = await crawler.sources.get("wikipedia").fetch("AI", "en")
 #         print(result)
 #         await crawler.close()
     
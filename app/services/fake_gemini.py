@@ -0,0 +1,46 @@
+import asyncio
+import json
+import re
+from typing import Optional
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeGenerativeModel:
+    """Model giả lập Gemini để chạy và benchmark offline
+
+    Mô phỏng độ trễ cố định mỗi lời gọi cộng thêm độ trễ theo số input,
+    và giới hạn số lời gọi đồng thời như rate limit của API thật.
+    """
+
+    def __init__(self, latency: float = 0.5, per_item_latency: float = 0.02, max_concurrency: Optional[int] = 4):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.calls = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    @staticmethod
+    def _topics_for(text: str) -> list:
+        words = [word.strip(".,!?\"'") for word in text.split()]
+        return [word for word in words if len(word) > 3][:3] or [text]
+
+    async def _respond(self, prompt: str) -> FakeResponse:
+        self.calls += 1
+        batch_match = re.search(r"Inputs \(JSON\):\s*(\[.*?\])\s*\n\s*Return", prompt, re.DOTALL)
+        if batch_match:
+            inputs = json.loads(batch_match.group(1))
+            await asyncio.sleep(self.latency + self.per_item_latency * len(inputs))
+            results = [{"id": item["id"], "topics": self._topics_for(item["text"])} for item in inputs]
+            return FakeResponse(json.dumps({"results": results}, ensure_ascii=False))
+
+        single_match = re.search(r'"(.*?)"', prompt)
+        text = single_match.group(1) if single_match else ""
+        await asyncio.sleep(self.latency + self.per_item_latency)
+        return FakeResponse(json.dumps({"topics": self._topics_for(text), "context": ""}, ensure_ascii=False))
+
+    async def generate_content_async(self, prompt: str, generation_config=None) -> FakeResponse:
+        if self._semaphore is None:
+            return await self._respond(prompt)
+        async with self._semaphore:
+            return await self._respond(prompt)
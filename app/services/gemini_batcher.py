@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import List, Optional, Tuple
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BATCH_PROMPT = """
+Analyze each of the following inputs and extract Wikipedia-searchable topics for each one.
+Each input has an "id", a "language" code and a "text". Topics must be written in the input's language.
+
+Requirements:
+1. Extract only topics that can be searched on Wikipedia
+2. Each topic should be a specific concept, event, person, or location
+3. Remove unnecessary words like "I want", "give me", "article", "video"
+4. Keep important context to understand search intent
+5. Sort topics by relevance
+6. Topic should not be in parentheses, for example: "Khế (thực vật)"
+
+Inputs (JSON):
+{inputs}
+
+Return the result in JSON format, exactly one entry per input id:
+{{
+  "results": [{{"id": 0, "topics": ["topic 1", "topic 2", ...]}}, ...]
+}}
+
+Return only JSON, no other text.
+"""
+
+class GeminiBatcher:
+    """Gom các yêu cầu trích xuất chủ đề đến trong một khoảng thời gian ngắn thành một lời gọi Gemini"""
+
+    def __init__(self, gemini_service, window: float = None, max_batch_size: int = None):
+        """Khởi tạo batcher
+
+        Args:
+            gemini_service: GeminiService dùng để gọi model và làm fallback gọi đơn lẻ
+            window: Thời gian gom yêu cầu tối đa (giây)
+            max_batch_size: Số yêu cầu tối đa trong một batch
+        """
+        self.gemini_service = gemini_service
+        self.window = window if window is not None else float(os.getenv("GEMINI_BATCH_WINDOW", 0.05))
+        self.max_batch_size = max_batch_size or int(os.getenv("GEMINI_BATCH_SIZE", 16))
+        # Lời gọi batch lỗi (429, timeout, ...) được thử lại với thời gian chờ tăng gấp đôi
+        self.retries = int(os.getenv("GEMINI_BATCH_RETRIES", 2))
+        self.retry_delay = float(os.getenv("GEMINI_BATCH_RETRY_DELAY", 1))
+        # Giới hạn số lời gọi đơn lẻ đồng thời, để một batch lỗi không biến thành
+        # max_batch_size request cùng lúc tới model đang bị quá tải
+        self._fallback_semaphore = asyncio.Semaphore(max(int(os.getenv("GEMINI_BATCH_FALLBACK_CONCURRENCY", 4)), 1))
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def submit(self, user_input: str, language: str) -> Optional[List[str]]:
+        """Thêm yêu cầu vào batch hiện tại và chờ kết quả
+
+        Returns:
+            List[str]: Danh sách chủ đề, None nếu không trích xuất được
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((user_input, language, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        """Gửi batch hiện tại"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        """Gọi Gemini cho cả batch, gọi đơn lẻ cho các yêu cầu không có kết quả hợp lệ"""
+        metrics.incr("gemini.batch.calls")
+        metrics.incr("gemini.batch.items", len(batch))
+        results = {}
+        if len(batch) > 1:
+            results = await self._extract_batch_with_retry([(text, language) for text, language, _ in batch])
+
+        async def resolve(index: int, user_input: str, language: str, future: asyncio.Future):
+            topics = results.get(index)
+            if topics is None:
+                if len(batch) > 1:
+                    metrics.incr("gemini.batch.fallback")
+                try:
+                    async with self._fallback_semaphore:
+                        topics = await self.gemini_service._extract_topic_uncached(user_input, language)
+                except Exception as e:
+                    logger.error(f"Error extracting topics: {str(e)}")
+                    topics = None
+            if not future.done():
+                future.set_result(topics)
+
+        await asyncio.gather(*(
+            resolve(index, user_input, language, future)
+            for index, (user_input, language, future) in enumerate(batch)
+        ))
+
+    async def _extract_batch_with_retry(self, items: List[Tuple[str, str]]) -> dict:
+        """Gọi _extract_batch, thử lại tối đa GEMINI_BATCH_RETRIES lần khi lời gọi lỗi
+
+        Returns:
+            dict: {id: danh sách chủ đề}, rỗng nếu mọi lần thử đều lỗi
+        """
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._extract_batch(items)
+            except Exception as e:
+                logger.error(f"Error extracting topics in batch of {len(items)} (attempt {attempt + 1}): {str(e)}")
+                if attempt < self.retries:
+                    metrics.incr("gemini.batch.retry")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+        return {}
+
+    async def _extract_batch(self, items: List[Tuple[str, str]]) -> dict:
+        """Gửi một prompt nhiều input và tách kết quả theo id
+
+        Returns:
+            dict: {id: danh sách chủ đề} cho các input có kết quả hợp lệ
+        """
+        inputs = [{"id": index, "language": language, "text": text} for index, (text, language) in enumerate(items)]
+        prompt = BATCH_PROMPT.format(inputs=json.dumps(inputs, ensure_ascii=False, indent=2))
+        response = await self.gemini_service.generate(prompt, max_output_tokens=512 * len(items))
+        return parse_batch_response(response.text, len(items))
+
+
+def parse_batch_response(text: str, count: int) -> dict:
+    """Tách phản hồi JSON của batch thành danh sách chủ đề theo id
+
+    Args:
+        text: Nội dung phản hồi của model
+        count: Số input trong batch
+
+    Returns:
+        dict: {id: danh sách chủ đề}, bỏ qua các entry sai định dạng
+    """
+    json_match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not json_match:
+        logger.error(f"No JSON found in batch response: {text}")
+        return {}
+    try:
+        data = json.loads(json_match.group())
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error in batch response: {str(e)}")
+        return {}
+
+    results = {}
+    for entry in data.get("results", []) if isinstance(data, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("id")
+        topics = entry.get("topics")
+        if (
+            isinstance(index, int) and 0 <= index < count
+            and isinstance(topics, list) and topics
+            and all(isinstance(topic, str) for topic in topics)
+        ):
+            results[index] = topics
+    return results
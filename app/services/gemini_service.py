@@ -1,21 +1,149 @@
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import logging
 import json
-from typing import List
+from typing import List, Dict, Optional
 import re
+import asyncio
+import hashlib
+import unicodedata
+from cachetools import TTLCache
+from .metrics import metrics
+from .gemini_batcher import GeminiBatcher
+from .rate_limiter import get_upstream_guard
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Tăng version khi thay đổi prompt để bỏ qua các kết quả đã cache của prompt cũ
+PROMPT_TEMPLATE_VERSION = "1"
+
+def normalize_input(user_input: str) -> str:
+    """Chuẩn hóa input người dùng để dùng làm key cache"""
+    text = unicodedata.normalize("NFC", user_input).lower()
+    return " ".join(text.split())
+
 class GeminiService:
-    def __init__(self):
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, redis_service=None, model=None):
+        """Khởi tạo Gemini service
+        
+        Args:
+            redis_service: Redis service dùng làm cache cấp 2 (None để chỉ dùng cache trong process)
+            model: Model thay thế (ví dụ FakeGenerativeModel khi chạy offline)
+        """
+        # Model thật được tạo ở lần gọi đầu tiên để worker không phải import SDK của Gemini khi khởi động
+        self._model = model
+        # Gom các yêu cầu đến cùng lúc thành một lời gọi Gemini (bật bằng GEMINI_BATCHING=true)
+        self.batcher = GeminiBatcher(self) if os.getenv("GEMINI_BATCHING", "false").lower() == "true" else None
+        self.redis_service = redis_service
+        # Cache cấp 1: LRU có TTL trong process
+        self._local_cache = TTLCache(
+            maxsize=int(os.getenv("GEMINI_LOCAL_CACHE_SIZE", 1024)),
+            ttl=int(os.getenv("GEMINI_LOCAL_CACHE_TTL", 3600))
+        )
+        # Cache cấp 2: Redis, dùng chung giữa các process
+        self.redis_cache_ttl = int(os.getenv("GEMINI_CACHE_TTL", 86400))
+        # Các lời gọi đang chạy, để các request giống nhau dùng chung một lời gọi LLM
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def model(self):
+        """Model Gemini (import google.generativeai khi cần dùng lần đầu)"""
+        if self._model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+            self._model = genai.GenerativeModel('gemini-2.0-flash')
+        return self._model
+
+    @staticmethod
+    def cache_key(user_input: str, language: str) -> str:
+        """Key cache theo input đã chuẩn hóa, ngôn ngữ và version của prompt"""
+        digest = hashlib.sha256(normalize_input(user_input).encode("utf-8")).hexdigest()
+        return f"gemini:topics:v{PROMPT_TEMPLATE_VERSION}:{language}:{digest}"
 
     async def extract_topic(self, user_input: str, language: str) -> List[str]:
+        """Trích xuất chủ đề từ input, có cache 2 cấp và gộp các request trùng nhau
+        
+        Args:
+            user_input: Nội dung người dùng nhập
+            language: Ngôn ngữ
+            
+        Returns:
+            List[str]: Danh sách chủ đề, [user_input] nếu không trích xuất được
+        """
+        key = self.cache_key(user_input, language)
+
+        topics = self._local_cache.get(key)
+        if topics is not None:
+            metrics.incr("gemini.cache.local.hit")
+            return list(topics)
+        metrics.incr("gemini.cache.local.miss")
+
+        if key in self._in_flight:
+            metrics.incr("gemini.cache.deduplicated")
+            topics = await asyncio.shield(self._in_flight[key])
+            return list(topics) if topics else [user_input]
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            topics = await self._get_from_redis(key)
+            if topics is None:
+                with metrics.timer("gemini.extract.latency"):
+                    if self.batcher:
+                        topics = await self.batcher.submit(user_input, language)
+                    else:
+                        topics = await self._extract_topic_uncached(user_input, language)
+                if topics:
+                    await self._set_in_redis(key, topics)
+            if topics:
+                self._local_cache[key] = topics
+            future.set_result(topics)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            del self._in_flight[key]
+
+        return list(topics) if topics else [user_input]
+
+    async def _get_from_redis(self, key: str) -> Optional[List[str]]:
+        """Đọc kết quả từ cache Redis"""
+        if self.redis_service is None:
+            return None
+        topics = await self.redis_service.get_json(key)
+        if isinstance(topics, list) and topics:
+            metrics.incr("gemini.cache.redis.hit")
+            return topics
+        metrics.incr("gemini.cache.redis.miss")
+        return None
+
+    async def _set_in_redis(self, key: str, topics: List[str]):
+        """Ghi kết quả vào cache Redis"""
+        if self.redis_service is not None:
+            await self.redis_service.set_json(key, topics, ttl=self.redis_cache_ttl)
+
+    async def generate(self, prompt: str, max_output_tokens: int = 2048):
+        """Gọi model với cấu hình sinh nội dung chung"""
+        # Sử dụng generation_config đúng cách, đi qua limiter và circuit breaker của Gemini
+        return await get_upstream_guard("gemini").call(
+            self.model.generate_content_async,
+            prompt,
+            generation_config={
+                "temperature": 0.7,
+                "top_p": 0.8,
+                "top_k": 40,
+                "max_output_tokens": max_output_tokens,
+            }
+        )
+
+    async def _extract_topic_uncached(self, user_input: str, language: str) -> Optional[List[str]]:
+        """Gọi Gemini để trích xuất chủ đề
+        
+        Returns:
+            List[str]: Danh sách chủ đề, None nếu không trích xuất được (kết quả không được cache)
+        """
         try:
             # Tạo prompt phù hợp với ngôn ngữ
             if language == 'vi':
@@ -79,22 +207,13 @@ class GeminiService:
                 Return only JSON, no other text.
                 """
             
-            # Sử dụng generation_config đúng cách
-            response = await self.model.generate_content_async(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    top_p=0.8,
-                    top_k=40,
-                    max_output_tokens=2048,
-                )
-            )
+            response = await self.generate(prompt)
             
             # Tìm JSON trong response
             json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
             if not json_match:
                 logger.error(f"No JSON found in response: {response.text}")
-                return [user_input]
+                return None
                 
             json_str = json_match.group()
             logger.info(f"Extracted JSON: {json_str}")
@@ -103,17 +222,17 @@ class GeminiService:
             result = json.loads(json_str)
             if "topics" not in result:
                 logger.error(f"Invalid JSON structure: {result}")
-                return [user_input]
+                return None
                 
             return result["topics"]
             
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error: {str(e)}")
             logger.error(f"Response text: {response.text}")
-            return [user_input]
+            return None
         except Exception as e:
             logger.error(f"Error extracting topics with Gemini: {str(e)}")
-            return [user_input]  # Trả về input gốc trong một list nếu có lỗi
+            return None
         
 # test
 if __name__ == "__main__":
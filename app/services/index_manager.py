@@ -0,0 +1,166 @@
+import logging
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Index cần cho các truy vấn nóng, theo từng collection. Dùng tên mặc định của MongoDB (ví dụ
+# task_id_1) để trùng với các index đã được tạo trước đây trên cùng key, tránh IndexOptionsConflict
+INDEXES: Dict[str, List[IndexModel]] = {
+    "results": [
+        # Tra cứu cache theo (chủ đề, ngôn ngữ, nguồn), lấy bản mới nhất; topics chứa mọi chủ đề
+        # trỏ tới cùng nội dung (multikey)
+        IndexModel(
+            [("topics", ASCENDING), ("language", ASCENDING), ("source", ASCENDING), ("created_at", DESCENDING),
+             ("_id", ASCENDING)]
+        ),
+        # Mỗi nội dung chỉ lưu một lần cho mỗi (nguồn, ngôn ngữ); document cũ chưa có hash được gộp bởi compact_results
+        IndexModel(
+            [("content_hash", ASCENDING), ("source", ASCENDING), ("language", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}}
+        ),
+        # Kết quả của một task
+        IndexModel([("task_id", ASCENDING)]),
+        # Index một trường duyệt được cả hai chiều
+        IndexModel([("created_at", ASCENDING)])
+    ],
+    "tasks": [
+        # Tìm task theo chủ đề
+        IndexModel([("topics", ASCENDING)]),
+        # Thống kê chủ đề phổ biến trên các task đã hoàn thành, task gần đây
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("created_at", ASCENDING)])
+    ]
+}
+
+# Index đã được thay thế, bị xóa (theo key) trước khi tạo index mới
+OBSOLETE_INDEXES: Dict[str, List[List[tuple]]] = {
+    "results": [
+        # Unique trên riêng nội dung: chặn lưu cùng nội dung cho nguồn/ngôn ngữ khác
+        [("content_hash", 1)],
+        [("topic", 1), ("language", 1), ("created_at", -1), ("_id", 1)],
+        [("topic", 1), ("language", 1), ("source", 1), ("created_at", -1), ("_id", 1)]
+    ]
+}
+
+# Các truy vấn nóng cần kiểm tra bằng explain(): (tên, collection, filter, projection, sort, covered)
+HOT_QUERIES = [
+    # Bước dò của Crawler.check_mongodb: IXSCAN theo thứ tự created_at của index, không SORT trong bộ nhớ.
+    # topics là trường mảng (index multikey) nên MongoDB vẫn cần FETCH để kiểm tra điều kiện, nhưng chỉ
+    # trả về _id; nội dung bài viết chỉ được đọc theo _id khi có kết quả
+    ("result_exists", "results",
+     {"topics": "", "language": "", "source": ""}, {"_id": 1},
+     [("created_at", DESCENDING)], False),
+    ("latest_result_by_topic", "results",
+     {"topics": ""}, None,
+     [("created_at", DESCENDING)], False),
+    ("result_by_content_hash", "results",
+     {"content_hash": ""}, {"_id": 0, "content_hash": 1, "source": 1, "language": 1},
+     None, True),
+    ("results_by_task", "results",
+     {"task_id": None}, {"_id": 1},
+     None, False),
+    ("completed_tasks", "tasks",
+     {"status": "completed", "result_ids": {"$exists": True, "$ne": []}}, {"topics": 1, "result_ids": 1},
+     None, False)
+]
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Liệt kê các stage trong một query plan"""
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+async def backfill_result_topics(db) -> int:
+    """Gắn mảng topics cho các kết quả lưu trước khi có trường này (idempotent)
+
+    Tra cứu cache và làm mới Redis lọc theo topics, kết quả chỉ có topic sẽ không bao giờ được tìm thấy.
+    Điều kiện topics = null dùng được index (topics, ...) nên khi đã gắn xong chỉ tốn một lần đọc index.
+
+    Args:
+        db: Database Motor
+
+    Returns:
+        int: Số kết quả đã được gắn topics
+    """
+    result = await db.results.update_many(
+        {"topics": None, "topic": {"$exists": True}},
+        [{"$set": {"topics": ["$topic"]}}]
+    )
+    if result.modified_count:
+        logger.info(f"Backfilled topics of {result.modified_count} results")
+    return result.modified_count
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Tạo các index đã khai báo (idempotent, index đã tồn tại được bỏ qua)
+
+    Args:
+        db: Database Motor
+
+    Returns:
+        Dict[str, List[str]]: Tên các index đã đảm bảo theo collection
+    """
+    created = {}
+    for collection_name, obsolete in OBSOLETE_INDEXES.items():
+        try:
+            for name, spec in (await db[collection_name].index_information()).items():
+                if [(field, int(direction)) for field, direction in spec["key"]] in obsolete:
+                    await db[collection_name].drop_index(name)
+                    logger.info(f"Dropped obsolete index {name} on {collection_name}")
+        except OperationFailure as e:
+            logger.error(f"Error dropping obsolete indexes on {collection_name}: {str(e)}")
+    for collection_name, indexes in INDEXES.items():
+        created[collection_name] = []
+        # Tạo từng index để một index xung đột không làm hỏng cả lô
+        for index in indexes:
+            try:
+                created[collection_name].extend(await db[collection_name].create_indexes([index]))
+            except OperationFailure as e:
+                # Index cùng tên hoặc cùng key nhưng khác định nghĩa: cần xóa thủ công trước khi tạo lại
+                metrics.incr("mongodb.index_conflicts")
+                logger.error(f"Index conflict on {collection_name} ({index.document['name']}): {str(e)}")
+        logger.info(f"Ensured indexes for {collection_name}: {created[collection_name]}")
+    return created
+
+async def verify_query_plans(db) -> Dict[str, Dict[str, Any]]:
+    """Chạy explain() cho các truy vấn nóng và báo lỗi nếu có collection scan
+
+    Args:
+        db: Database Motor
+
+    Returns:
+        Dict[str, Dict]: Với mỗi truy vấn: các stage của winning plan, có COLLSCAN không, có được cover không,
+            có sắp xếp trong bộ nhớ không
+    """
+    report = {}
+    for name, collection_name, query, projection, sort, expect_covered in HOT_QUERIES:
+        try:
+            cursor = db[collection_name].find(query, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.limit(1).explain()
+            stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+        except Exception as e:
+            logger.error(f"Error explaining query {name}: {str(e)}")
+            continue
+
+        collscan = "COLLSCAN" in stages
+        covered = "FETCH" not in stages and not collscan
+        # Sắp xếp trong bộ nhớ: index không cho thứ tự cần thiết
+        blocking_sort = "SORT" in stages
+        report[name] = {"stages": stages, "collscan": collscan, "covered": covered, "blocking_sort": blocking_sort}
+        if collscan:
+            metrics.incr("mongodb.collscan_queries")
+            logger.warning(f"Query {name} on {collection_name} uses a collection scan: {stages}")
+        elif blocking_sort:
+            logger.warning(f"Query {name} on {collection_name} sorts in memory: {stages}")
+        elif expect_covered and not covered:
+            logger.warning(f"Query {name} on {collection_name} is not covered by an index: {stages}")
+    return report
@@ -0,0 +1,69 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Any
+
+class Metrics:
+    """Bộ đếm và thống kê thời gian đơn giản trong process"""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        """Tăng bộ đếm"""
+        self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        """Ghi giá trị hiện tại của một đại lượng"""
+        self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """Ghi nhận một lần đo thời gian (giây)"""
+        timing = self._timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Đo thời gian thực thi của một khối lệnh"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def get(self, name: str) -> float:
+        """Lấy giá trị bộ đếm"""
+        return self._counters.get(name, 0)
+
+    def ratio(self, hits: str, *others: str) -> float:
+        """Tỉ lệ hits / (hits + các bộ đếm còn lại), 0 nếu chưa có dữ liệu"""
+        total = self.get(hits) + sum(self.get(name) for name in others)
+        return self.get(hits) / total if total else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Trả về toàn bộ số liệu hiện tại"""
+        return {
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+            "timings": {
+                name: {
+                    "count": timing["count"],
+                    "avg_ms": round(timing["total"] / timing["count"] * 1000, 3) if timing["count"] else 0,
+                    "max_ms": round(timing["max"] * 1000, 3)
+                }
+                for name, timing in self._timings.items()
+            }
+        }
+
+    def reset(self):
+        """Xóa toàn bộ số liệu"""
+        self._counters.clear()
+        self._gauges.clear()
+        self._timings.clear()
+
+
+metrics = Metrics()
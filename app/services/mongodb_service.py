@@ -2,17 +2,33 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, UTC
 import os
 import logging
+from typing import Dict, List, Tuple
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from .compression import get_text_codec
+from .index_manager import backfill_result_topics
+from .metrics import metrics
+from ..models.result import result_content_hash
 
 logger = logging.getLogger(__name__)
 
 class MongoDBService:
-    def __init__(self):
-        """Khởi tạo kết nối MongoDB"""
-        self.client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
+    def __init__(self, client: AsyncIOMotorClient = None):
+        """Khởi tạo kết nối MongoDB
+        
+        Args:
+            client: Motor client dùng chung (mặc định tạo client riêng)
+        """
+        self._owns_client = client is None
+        self.client = client or AsyncIOMotorClient(os.getenv("MONGODB_URI"))
         self.db = self.client.data_management
         self.tasks_collection = self.db.tasks
         self.results_collection = self.db.results
+        # ID cũ của các kết quả trùng nội dung đã được gộp -> ID của kết quả được giữ lại
+        self.result_aliases_collection = self.db.result_aliases
+        # Codec nén nội dung bài viết (bật bằng TEXT_COMPRESSION=zlib)
+        self.codec = get_text_codec()
 
     async def connect(self):
         """Kiểm tra kết nối MongoDB"""
@@ -24,50 +40,10 @@ class MongoDBService:
             raise
 
     async def close(self):
-        """Đóng kết nối MongoDB"""
-        self.client.close()
-        logger.info("Disconnected from MongoDB")
-
-    async def get_popular_topics(self, limit: int = 5) -> list:
-        """Lấy danh sách chủ đề phổ biến từ MongoDB
-        
-        Args:
-            limit: Số lượng chủ đề phổ biến cần lấy (mặc định là 5)
-            
-        Returns:
-            list: Danh sách các chủ đề phổ biến
-        """
-        try:
-            # Lấy các chủ đề được tìm kiếm nhiều nhất trong tất cả thời gian
-            pipeline = [
-                {
-                    "$match": {
-                        "topics": {"$exists": True, "$ne": []},
-                        "status": "completed"  # Chỉ lấy các task đã hoàn thành
-                    }
-                },
-                {"$unwind": "$topics"},
-                {"$group": {"_id": "$topics", "count": {"$sum": 1}}},
-                {"$sort": {"count": -1}},
-                {"$limit": limit * 2}  # Lấy gấp đôi để dự phòng
-            ]
-            
-            cursor = self.tasks_collection.aggregate(pipeline)
-            popular_topics = []
-            
-            async for doc in cursor:
-                # Kiểm tra xem chủ đề có tồn tại trong results_collection không
-                result = await self.results_collection.find_one({"topic": doc["_id"]})
-                if result:
-                    popular_topics.append(doc["_id"])
-                    if len(popular_topics) >= limit:
-                        break
-            
-            return popular_topics[:limit]  # Đảm bảo trả về đúng số lượng yêu cầu
-            
-        except Exception as e:
-            logger.error(f"Error getting popular topics: {str(e)}")
-            return []
+        """Đóng kết nối MongoDB (client dùng chung do container đóng)"""
+        if self._owns_client:
+            self.client.close()
+            logger.info("Disconnected from MongoDB")
 
     async def get_task(self, task_id: str) -> dict:
         """Lấy thông tin task theo ID
@@ -112,7 +88,223 @@ class MongoDBService:
         except Exception as e:
             logger.error(f"Error updating task {task_id} status: {str(e)}")
 
-    async def insert_result(self, task_id: str, topic: str, source: str, language: str, text: str) -> str:
+    def build_result_document(self, task_id: str, topic: str, source: str, language: str, text: str,
+                              extra: dict = None) -> dict:
+        """Tạo document kết quả (có sẵn _id) để ghi vào results collection
+        
+        Args:
+            task_id: ID của task (None khi kết quả được lấy lại ở nền, không thuộc task nào)
+            topic: Chủ đề
+            source: Nguồn dữ liệu
+            language: Ngôn ngữ
+            text: Nội dung
+            extra: Các trường bổ sung (ví dụ thông tin các bài báo, validators)
+            
+        Returns:
+            dict: Document kết quả
+        """
+        now = datetime.now(UTC)
+        return {
+            **(extra or {}),
+            "_id": ObjectId(),
+            "task_id": ObjectId(task_id) if task_id else None,
+            "topic": topic,
+            # Mọi chủ đề có cùng nội dung (cùng nguồn, ngôn ngữ) trỏ tới kết quả này
+            "topics": [topic],
+            "source": source,
+            "language": language,
+            **self.codec.encode_fields(text),
+            "content_hash": result_content_hash(text),
+            "created_at": now,
+            "updated_at": now,
+            # Thời điểm nội dung được xác nhận khớp với upstream (dùng cho chính sách freshness)
+            "validated_at": now
+        }
+
+    @staticmethod
+    def _dedup_key(document: dict, content_hash: str = None) -> Tuple[str, str, str]:
+        """Khóa gộp kết quả: cùng nội dung, cùng nguồn và cùng ngôn ngữ"""
+        return content_hash or document["content_hash"], document.get("source"), document.get("language")
+
+    async def _find_by_dedup_keys(self, keys) -> Dict[Tuple[str, str, str], ObjectId]:
+        """ID của các kết quả đã lưu theo khóa gộp"""
+        keys = set(keys)
+        if not keys:
+            return {}
+        cursor = self.results_collection.find(
+            {"content_hash": {"$in": list({key[0] for key in keys})}},
+            {"content_hash": 1, "source": 1, "language": 1}
+        )
+        found = {}
+        async for doc in cursor:
+            key = self._dedup_key(doc)
+            if key in keys:
+                found[key] = doc["_id"]
+        return found
+
+    async def store_result_documents(self, documents: List[dict], record_aliases: bool = True) -> Dict[str, str]:
+        """Lưu các document kết quả, mỗi nội dung của một (nguồn, ngôn ngữ) chỉ lưu một lần
+        
+        Document có nội dung đã tồn tại không được thêm mới mà dùng lại kết quả cũ; chủ đề của
+        document được thêm vào mảng topics của kết quả đó để tra cứu theo chủ đề vẫn tìm thấy
+        (ví dụ các chủ đề là redirect tới cùng một trang Wikipedia).
+        
+        Args:
+            documents: Các document do build_result_document tạo
+            record_aliases: Ghi alias từ ID đã cấp cho document sang ID được dùng lại
+            
+        Returns:
+            Dict[str, str]: ID đã cấp -> ID kết quả được lưu (không có nếu lưu thất bại)
+        """
+        stored: Dict[str, str] = {}
+        if not documents:
+            return stored
+
+        # Gộp các document trùng nội dung trong cùng lô
+        by_key: Dict[Tuple[str, str, str], List[dict]] = {}
+        for document in documents:
+            by_key.setdefault(self._dedup_key(document), []).append(document)
+
+        def group_topics(group: List[dict]) -> List[str]:
+            return list(dict.fromkeys(topic for document in group for topic in document.get("topics") or [document["topic"]]))
+
+        existing = {key: str(result_id) for key, result_id in (await self._find_by_dedup_keys(by_key)).items()}
+        to_insert = []
+        for key, group in by_key.items():
+            if key not in existing:
+                group[0]["topics"] = group_topics(group)
+                to_insert.append(group[0])
+        inserted = {self._dedup_key(document): str(document["_id"]) for document in to_insert}
+        if to_insert:
+            try:
+                await self.results_collection.insert_many(to_insert, ordered=False)
+            except BulkWriteError as e:
+                # Worker khác vừa lưu cùng nội dung (trùng unique index): dùng lại kết quả đó
+                failed = {self._dedup_key(to_insert[error["index"]]) for error in e.details.get("writeErrors", [])}
+                for key in failed:
+                    inserted.pop(key, None)
+                existing.update({key: str(result_id) for key, result_id in (await self._find_by_dedup_keys(failed)).items()})
+
+        if existing:
+            metrics.incr("mongodb.results.deduplicated", sum(len(by_key[key]) for key in existing if key in by_key))
+            # Nội dung vừa lấy từ upstream trùng với bản đã lưu: bản đó được xác nhận là còn mới
+            now = datetime.now(UTC)
+            operations = []
+            for key, result_id in existing.items():
+                group = by_key.get(key, [{}])
+                fields = {"updated_at": now, "validated_at": now}
+                validators = group[0].get("validators")
+                if validators:
+                    fields["validators"] = validators
+                update = {"$set": fields}
+                topics = group_topics(group) if group[0] else []
+                if topics:
+                    update["$addToSet"] = {"topics": {"$each": topics}}
+                operations.append(UpdateOne({"_id": ObjectId(result_id)}, update))
+            await self.results_collection.bulk_write(operations, ordered=False)
+
+        aliases = []
+        for key, group in by_key.items():
+            result_id = inserted.get(key) or existing.get(key)
+            if not result_id:
+                continue
+            for document in group:
+                stored[str(document["_id"])] = result_id
+                if str(document["_id"]) != result_id:
+                    aliases.append({"_id": document["_id"], "result_id": ObjectId(result_id), "created_at": datetime.now(UTC)})
+        if aliases and record_aliases:
+            await self.save_result_aliases(aliases)
+        return stored
+
+    async def compact_results(self, batch_size: int = 500) -> Dict[str, int]:
+        """Gộp các kết quả cũ (chưa có content_hash) trùng nội dung, nguồn và ngôn ngữ
+        
+        Mỗi nội dung giữ lại một document; các document trùng bị xóa, chủ đề của chúng được
+        thêm vào topics của document được giữ và ID của chúng được ghi vào result_aliases để
+        vẫn đọc được qua get_result.
+        
+        Args:
+            batch_size: Số document xử lý mỗi lô
+            
+        Returns:
+            Dict[str, int]: Số document đã quét, đã gắn hash và đã gộp
+        """
+        stats = {"scanned": 0, "hashed": 0, "merged": 0}
+        # Kết quả lưu trước khi có mảng topics: tra cứu theo chủ đề dùng topics
+        await backfill_result_topics(self.db)
+        last_id = None
+        while True:
+            query = {"content_hash": {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            documents = await self.results_collection.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not documents:
+                break
+            last_id = documents[-1]["_id"]
+            stats["scanned"] += len(documents)
+
+            by_key: Dict[Tuple[str, str, str], List[dict]] = {}
+            for document in documents:
+                try:
+                    content_hash = result_content_hash(self.decode_text(document))
+                    by_key.setdefault(self._dedup_key(document, content_hash), []).append(document)
+                except Exception as e:
+                    logger.error(f"Error reading result {document['_id']} during compaction: {str(e)}")
+
+            canonical = await self._find_by_dedup_keys(by_key)
+
+            # Document đầu tiên của mỗi nội dung chưa có bản lưu sẽ được giữ lại
+            keep = {key: group[0] for key, group in by_key.items() if key not in canonical}
+            if keep:
+                operations = [
+                    UpdateOne({"_id": document["_id"]}, {"$set": {"content_hash": key[0]}})
+                    for key, document in keep.items()
+                ]
+                try:
+                    await self.results_collection.bulk_write(operations, ordered=False)
+                except BulkWriteError as e:
+                    # Nội dung vừa được lưu bởi worker khác: gộp vào bản đó
+                    keys = list(keep)
+                    for error in e.details.get("writeErrors", []):
+                        keep.pop(keys[error["index"]], None)
+                    canonical.update(await self._find_by_dedup_keys(
+                        key for key in by_key if key not in keep and key not in canonical
+                    ))
+                for key, document in keep.items():
+                    canonical[key] = document["_id"]
+                stats["hashed"] += len(keep)
+
+            now = datetime.now(UTC)
+            aliases = []
+            operations = []
+            for key, group in by_key.items():
+                if key not in canonical:
+                    continue
+                merged = [document for document in group if document["_id"] != canonical[key]]
+                if not merged:
+                    continue
+                aliases.extend({"_id": document["_id"], "result_id": canonical[key], "created_at": now} for document in merged)
+                topics = list(dict.fromkeys(topic for document in merged for topic in document.get("topics") or [document["topic"]]))
+                operations.append(UpdateOne({"_id": canonical[key]}, {"$addToSet": {"topics": {"$each": topics}}}))
+            if aliases:
+                # Ghi alias và chủ đề trước khi xóa để ID cũ và chủ đề cũ luôn đọc được
+                await self.save_result_aliases(aliases)
+                await self.results_collection.bulk_write(operations, ordered=False)
+                await self.results_collection.delete_many({"_id": {"$in": [alias["_id"] for alias in aliases]}})
+                stats["merged"] += len(aliases)
+            logger.info(f"Compacted results: {stats}")
+        return stats
+
+    async def save_result_aliases(self, aliases: List[dict]):
+        """Ghi alias ID cũ -> ID kết quả (bỏ qua alias đã có)"""
+        try:
+            await self.result_aliases_collection.insert_many(aliases, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                logger.error(f"Error saving result aliases: {str(e)}")
+
+    async def insert_result(self, task_id: str, topic: str, source: str, language: str, text: str,
+                            extra: dict = None, link_task: bool = True) -> str:
         """Thêm kết quả crawl vào database
         
         Args:
@@ -121,33 +313,31 @@ class MongoDBService:
             source: Nguồn dữ liệu
             language: Ngôn ngữ
             text: Nội dung
+            extra: Các trường bổ sung của kết quả
+            link_task: Thêm kết quả vào result_ids của task (False khi người gọi tự gắn)
             
         Returns:
             str: ID của kết quả mới được thêm
         """
         try:
-            now = datetime.now(UTC)
-            result = {
-                "task_id": ObjectId(task_id),
-                "topic": topic,
-                "source": source,
-                "language": language,
-                "text": text,
-                "created_at": now,
-                "updated_at": now
-            }
+            result = self.build_result_document(task_id, topic, source, language, text, extra)
+            now = result["created_at"]
             
-            result = await self.results_collection.insert_one(result)
-            result_id = str(result.inserted_id)
+            # Dùng lại kết quả cũ nếu nội dung đã được lưu
+            stored = await self.store_result_documents([result], record_aliases=False)
+            result_id = stored.get(str(result["_id"]))
+            if not result_id:
+                return None
             
             # Cập nhật result_ids trong task
-            await self.tasks_collection.update_one(
-                {"_id": ObjectId(task_id)},
-                {
-                    "$push": {"result_ids": result_id},
-                    "$set": {"updated_at": now}
-                }
-            )
+            if task_id and link_task:
+                await self.tasks_collection.update_one(
+                    {"_id": ObjectId(task_id)},
+                    {
+                        "$addToSet": {"result_ids": result_id},
+                        "$set": {"updated_at": now}
+                    }
+                )
             
             logger.info(f"Inserted result for task {task_id}")
             return result_id
@@ -155,6 +345,48 @@ class MongoDBService:
             logger.error(f"Error inserting result for task {task_id}: {str(e)}")
             return None
 
+    async def touch_result(self, result_id: str, validators: dict = None) -> bool:
+        """Đánh dấu kết quả vừa được xác nhận không đổi so với upstream
+        
+        Args:
+            result_id: ID của kết quả (có thể là ID cũ của kết quả đã gộp)
+            validators: Validators mới (revision id, ETag, ...) nếu có
+            
+        Returns:
+            bool: True nếu cập nhật thành công
+        """
+        try:
+            now = datetime.now(UTC)
+            fields = {"validated_at": now, "updated_at": now}
+            if validators:
+                fields["validators"] = validators
+            result = await self.results_collection.update_one({"_id": ObjectId(result_id)}, {"$set": fields})
+            if result.matched_count == 0:
+                # ID cũ của một kết quả đã được gộp: cập nhật kết quả được giữ lại
+                alias = await self.result_aliases_collection.find_one({"_id": ObjectId(result_id)})
+                if alias:
+                    result = await self.results_collection.update_one({"_id": alias["result_id"]}, {"$set": fields})
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"Error touching result {result_id}: {str(e)}")
+            return False
+
+    async def clear_warmed(self, result_id: str) -> bool:
+        """Bỏ đánh dấu làm ấm khi kết quả được người dùng đọc lần đầu
+
+        Returns:
+            bool: True nếu kết quả vẫn còn đánh dấu và vừa được bỏ
+        """
+        try:
+            result = await self.results_collection.update_one(
+                {"_id": ObjectId(result_id), "warmed": True},
+                {"$unset": {"warmed": ""}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error clearing warmed flag of result {result_id}: {str(e)}")
+            return False
+
     async def update_result(self, result_id: str, text: str) -> bool:
         """Cập nhật nội dung kết quả
         
@@ -167,13 +399,17 @@ class MongoDBService:
         """
         try:
             now = datetime.now(UTC)
+            text_fields = {**self.codec.encode_fields(text), "content_hash": result_content_hash(text)}
+            # Xóa các trường của định dạng lưu trữ cũ
+            unset_fields = {"text": ""} if "text_z" in text_fields else {"text_z": "", "compression": ""}
             result = await self.results_collection.update_one(
                 {"_id": ObjectId(result_id)},
                 {
                     "$set": {
-                        "text": text,
+                        **text_fields,
                         "updated_at": now
-                    }
+                    },
+                    "$unset": unset_fields
                 }
             )
             
@@ -183,6 +419,9 @@ class MongoDBService:
             else:
                 logger.warning(f"Result {result_id} not found for update")
                 return False
+        except DuplicateKeyError:
+            logger.warning(f"Result {result_id} not updated: the same content is stored in another result")
+            return False
         except Exception as e:
             logger.error(f"Error updating result {result_id}: {str(e)}")
             return False
@@ -198,10 +437,57 @@ class MongoDBService:
         """
         try:
             result = await self.results_collection.find_one({"_id": ObjectId(result_id)})
+            if not result:
+                # ID cũ của một kết quả đã được gộp
+                alias = await self.result_aliases_collection.find_one({"_id": ObjectId(result_id)})
+                if alias:
+                    result = await self.results_collection.find_one({"_id": alias["result_id"]})
             if not result:
                 logger.warning(f"Result {result_id} not found")
                 return None
+            result["text"] = self.decode_text(result)
+            result.pop("text_z", None)
             return result
         except Exception as e:
             logger.error(f"Error getting result {result_id}: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    async def get_result_topics(self, result_ids: list) -> Dict[str, List[str]]:
+        """Lấy các chủ đề của nhiều kết quả (ID cũ của kết quả đã gộp được đổi sang kết quả được giữ)
+        
+        Args:
+            result_ids: Các ID kết quả (ObjectId hoặc chuỗi)
+            
+        Returns:
+            Dict[str, List[str]]: ID được yêu cầu (dạng chuỗi) -> chủ đề của kết quả, bỏ qua ID không tồn tại
+        """
+        ids = list(dict.fromkeys(ObjectId(result_id) for result_id in result_ids))
+        topics = {}
+        async for result in self.results_collection.find({"_id": {"$in": ids}}, {"topic": 1, "topics": 1}):
+            topics[result["_id"]] = result.get("topics") or [result["topic"]]
+        missing = [result_id for result_id in ids if result_id not in topics]
+        if missing:
+            aliases = {}
+            async for alias in self.result_aliases_collection.find({"_id": {"$in": missing}}):
+                aliases[alias["_id"]] = alias["result_id"]
+            canonical = {}
+            if aliases:
+                async for result in self.results_collection.find(
+                    {"_id": {"$in": list(set(aliases.values()))}}, {"topic": 1, "topics": 1}
+                ):
+                    canonical[result["_id"]] = result.get("topics") or [result["topic"]]
+            for alias_id, result_id in aliases.items():
+                if result_id in canonical:
+                    topics[alias_id] = canonical[result_id]
+        return {str(result_id): result_topics for result_id, result_topics in topics.items()}
+
+    def decode_text(self, result: dict) -> str:
+        """Đọc nội dung của một result document (nén hoặc không nén)
+        
+        Args:
+            result: Document trong results collection
+            
+        Returns:
+            str: Nội dung bài viết
+        """
+        return self.codec.decode_document(result)
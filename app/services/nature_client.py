@@ -0,0 +1,223 @@
+import aiohttp
+import asyncio
+import os
+import re
+import html
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from ..models.article import ArticleRecord
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+def _clean(value: Any) -> str:
+    """Bỏ thẻ HTML và khoảng trắng thừa"""
+    if isinstance(value, dict):
+        # Một số phiên bản API trả abstract dạng {"h1": "Abstract", "p": [...]}
+        value = " ".join(value.get("p", [])) if isinstance(value.get("p"), list) else value.get("p", "")
+    if not isinstance(value, str):
+        return ""
+    return _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", value))).strip()
+
+def title_matches(topic: str, title: str) -> bool:
+    """Tiêu đề chứa đúng từ khóa/cụm từ của chủ đề (không tính khi chỉ là một phần của từ khác)"""
+    return re.search(rf"(?<!\w){re.escape(topic.lower())}(?!\w)", title.lower()) is not None
+
+def parse_record(raw: Dict[str, Any]) -> Optional[ArticleRecord]:
+    """Chuyển một record của Springer Nature Meta API thành ArticleRecord
+
+    Returns:
+        ArticleRecord: Bài báo, None nếu thiếu tiêu đề hoặc abstract
+    """
+    title = _clean(raw.get("title"))
+    abstract = _clean(raw.get("abstract"))
+    if not title or not abstract:
+        return None
+    urls = [url for url in raw.get("url", []) if isinstance(url, dict) and url.get("value")]
+    html_urls = [url["value"] for url in urls if url.get("format") == "html"]
+    return ArticleRecord(
+        source="nature",
+        title=title,
+        abstract=abstract,
+        doi=raw.get("doi") or None,
+        url=(html_urls or [url["value"] for url in urls] or [None])[0],
+        journal=raw.get("publicationName") or None,
+        published=raw.get("publicationDate") or None,
+        authors=[creator["creator"] for creator in raw.get("creators", [])
+                 if isinstance(creator, dict) and creator.get("creator")]
+    )
+
+class NatureClient:
+    """Client bất đồng bộ cho Springer Nature Meta API, tải trước nhiều trang song song"""
+
+    def __init__(self, api_url: str = None, api_key: str = None, timeout: float = None, pool_size: int = None,
+                 page_size: int = None, prefetch_pages: int = None, max_pages: int = None):
+        """Khởi tạo Nature client
+
+        Args:
+            api_url: Endpoint của Meta API (mặc định lấy từ NATURE_API_URL)
+            api_key: API key (mặc định lấy từ NATURE_API_KEY)
+            timeout: Thời gian chờ tối đa cho mỗi request (giây)
+            pool_size: Số kết nối tối đa trong pool
+            page_size: Số record mỗi trang
+            prefetch_pages: Số trang được tải song song mỗi đợt
+            max_pages: Số trang tối đa cho một lần tìm kiếm
+        """
+        self.api_url = api_url or os.getenv("NATURE_API_URL", "https://api.springernature.com/meta/v2/json")
+        self.api_key = api_key or os.getenv("NATURE_API_KEY")
+        self.timeout = timeout or float(os.getenv("NATURE_TIMEOUT", 10))
+        self.pool_size = pool_size or int(os.getenv("NATURE_POOL_SIZE", 10))
+        self.page_size = page_size or int(os.getenv("NATURE_PAGE_SIZE", 10))
+        self.prefetch_pages = prefetch_pages or int(os.getenv("NATURE_PREFETCH_PAGES", 3))
+        self.max_pages = max_pages or int(os.getenv("NATURE_MAX_PAGES", 6))
+        self.title_filter = os.getenv("NATURE_TITLE_FILTER", "true").lower() == "true"
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Tạo session khi cần (phải chạy bên trong event loop)"""
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout)
+                    )
+        return self._session
+
+    async def fetch_page(self, topic: str, start: int,
+                         validators: Optional[Dict[str, Any]] = None) -> Optional[Tuple[List[Dict[str, Any]], Optional[int], Dict[str, Any]]]:
+        """Lấy một trang kết quả tìm kiếm
+
+        Args:
+            topic: Từ khóa tìm kiếm
+            start: Vị trí bắt đầu (tính từ 1)
+            validators: ETag/Last-Modified của lần lấy trước để gửi request có điều kiện
+
+        Returns:
+            tuple: (danh sách record, tổng số kết quả nếu API trả về, validators của response),
+                None nếu API trả 304 (trang không đổi)
+
+        Raises:
+            asyncio.TimeoutError: Khi request vượt quá thời gian chờ
+            aiohttp.ClientResponseError: Khi API trả lỗi (401 khi API key sai)
+        """
+        session = await self._get_session()
+        params = {"q": topic, "p": str(self.page_size), "s": str(start)}
+        if self.api_key:
+            params["api_key"] = self.api_key
+        headers = {}
+        if validators and validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators and validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        async with session.get(self.api_url, params=params, headers=headers) as response:
+            if response.status == 304:
+                return None
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+            page_validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+
+        total = None
+        for result in data.get("result", []):
+            try:
+                total = int(result.get("total"))
+            except (TypeError, ValueError):
+                pass
+        return data.get("records", []), total, {key: value for key, value in page_validators.items() if value}
+
+    async def search(self, topic: str, limit: int, call: Callable[..., Awaitable[Any]] = None,
+                     first_page: Optional[tuple] = None,
+                     on_first_page: Callable[[tuple], None] = None) -> List[ArticleRecord]:
+        """Tìm các bài báo có tiêu đề chứa chủ đề, tải song song prefetch_pages trang mỗi đợt
+
+        Args:
+            topic: Chủ đề
+            limit: Số bài báo cần lấy
+            call: Hàm bao mỗi request (ví dụ UpstreamGuard.call để giới hạn tốc độ)
+            first_page: Trang đầu đã lấy trước đó (kết quả của fetch_page), không cần tải lại
+            on_first_page: Hàm nhận trang đầu khi được tải (để lưu validators cho lần kiểm tra sau)
+
+        Returns:
+            List[ArticleRecord]: Các bài báo theo thứ tự của API
+        """
+        call = call or (lambda func, *args: func(*args))
+        records: List[ArticleRecord] = []
+        seen = set()
+        start = 1
+        pages = 0
+        total = None
+        prefetched = []
+        if first_page is not None:
+            prefetched = [first_page]
+            start = 1 + self.page_size
+            pages = 1
+        while prefetched or (len(records) < limit and pages < self.max_pages):
+            if prefetched:
+                pages_data, prefetched = prefetched, []
+            else:
+                starts = []
+                for index in range(min(self.prefetch_pages, self.max_pages - pages)):
+                    page_start = start + index * self.page_size
+                    if total is not None and page_start > total:
+                        break
+                    starts.append(page_start)
+                if not starts:
+                    break
+
+                pages_data = await asyncio.gather(*(call(self.fetch_page, topic, page_start) for page_start in starts))
+                if starts[0] == 1 and on_first_page is not None:
+                    on_first_page(pages_data[0])
+                pages += len(starts)
+                start = starts[-1] + self.page_size
+
+            exhausted = False
+            for raw_records, page_total, _ in pages_data:
+                total = page_total if page_total is not None else total
+                if not raw_records:
+                    exhausted = True
+                    break
+                for raw in raw_records:
+                    record = parse_record(raw)
+                    if record is None or (self.title_filter and not title_matches(topic, record.title)):
+                        continue
+                    key = record.doi or record.title
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    records.append(record)
+                    if len(records) >= limit:
+                        break
+                if len(records) >= limit:
+                    break
+            if exhausted:
+                break
+
+        logger.info(f"Found {len(records)} Nature articles for topic {topic} in {pages} pages")
+        return records
+
+    async def close(self):
+        """Đóng HTTP session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed Nature HTTP session")
+        self._session = None
+
+
+_client: Optional[NatureClient] = None
+
+def get_nature_client() -> NatureClient:
+    """Trả về Nature client dùng chung cho toàn process"""
+    global _client
+    if _client is None:
+        _client = NatureClient()
+    return _client
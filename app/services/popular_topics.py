@@ -0,0 +1,147 @@
+import os
+import time
+import logging
+from datetime import UTC
+from typing import Iterable, List, Optional
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Điểm của chủ đề giảm một nửa sau mỗi half-life (forward decay): mỗi lần xuất hiện cộng
+# 2^((t - epoch) / half_life) nên không cần giảm điểm các chủ đề cũ. Khi trọng số quá lớn,
+# toàn bộ điểm được chia lại và epoch được dời tới hiện tại (hiếm khi xảy ra).
+# KEYS: scores, epoch
+# ARGV: now, half_life, event_time, max_age, max_members, topic...
+_RECORD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local half_life = tonumber(ARGV[2])
+local epoch = tonumber(redis.call('GET', KEYS[2]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[2], tostring(epoch))
+end
+local age = (now - epoch) / half_life
+if age > tonumber(ARGV[4]) then
+    local factor = 2 ^ (-age)
+    local members = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+    for i = 1, #members, 2 do
+        redis.call('ZADD', KEYS[1], tostring(tonumber(members[i + 1]) * factor), members[i])
+    end
+    epoch = now
+    redis.call('SET', KEYS[2], tostring(epoch))
+end
+local weight = 2 ^ ((tonumber(ARGV[3]) - epoch) / half_life)
+for i = 6, #ARGV do
+    redis.call('ZINCRBY', KEYS[1], tostring(weight), ARGV[i])
+end
+local max_members = tonumber(ARGV[5])
+if max_members > 0 then
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -max_members - 1)
+end
+return tostring(weight)
+"""
+
+class PopularTopicsCounter:
+    """Đếm độ phổ biến của chủ đề trong Redis sorted set, cập nhật khi task hoàn thành
+
+    Đọc top-K chỉ là một lệnh ZREVRANGE (O(log n + K)).
+    """
+
+    SCORES_KEY = "popular_topics:scores"
+    EPOCH_KEY = "popular_topics:epoch"
+
+    def __init__(self, redis_service, half_life_hours: float = None, max_members: int = None):
+        """Khởi tạo bộ đếm
+
+        Args:
+            redis_service: Redis service
+            half_life_hours: Số giờ để điểm của một lần xuất hiện giảm một nửa
+            max_members: Số chủ đề tối đa được giữ lại (0 để không giới hạn)
+        """
+        self.redis_service = redis_service
+        self.half_life = (half_life_hours or float(os.getenv("POPULAR_TOPICS_HALF_LIFE_HOURS", 168))) * 3600
+        self.max_members = max_members if max_members is not None else int(os.getenv("POPULAR_TOPICS_MAX_MEMBERS", 10000))
+        # Chia lại điểm khi trọng số vượt 2^32
+        self.max_age = 32
+        self._record_script = None
+
+    async def record(self, topics: Iterable[str], at: Optional[float] = None):
+        """Cộng điểm cho các chủ đề
+
+        Args:
+            topics: Các chủ đề (trùng lặp chỉ tính một lần)
+            at: Thời điểm xuất hiện (unix timestamp, mặc định là hiện tại)
+        """
+        topics = list(dict.fromkeys(topic for topic in topics if topic))
+        if not topics:
+            return
+        now = time.time()
+        client = self.redis_service.redis_client
+        if self._record_script is None:
+            self._record_script = client.register_script(_RECORD_SCRIPT)
+        await self._record_script(
+            keys=[self.SCORES_KEY, self.EPOCH_KEY],
+            args=[now, self.half_life, at or now, self.max_age, self.max_members, *topics]
+        )
+        metrics.incr("popular_topics.recorded", len(topics))
+
+    async def top(self, limit: int = 5) -> List[str]:
+        """Các chủ đề có điểm cao nhất"""
+        return await self.redis_service.redis_client.zrevrange(self.SCORES_KEY, 0, limit - 1)
+
+    async def reset(self):
+        """Xóa toàn bộ điểm"""
+        await self.redis_service.redis_client.delete(self.SCORES_KEY, self.EPOCH_KEY)
+
+    async def backfill(self, mongodb_service, since=None, batch_size: int = 1000) -> int:
+        """Khởi tạo điểm từ các task đã hoàn thành trong MongoDB
+
+        Giống như khi task hoàn thành, chỉ các chủ đề đã có kết quả được tính. Mỗi task được
+        tính với trọng số theo thời điểm hoàn thành của nó.
+
+        Args:
+            mongodb_service: MongoDB service
+            since: Chỉ tính các task tạo sau thời điểm này (datetime, None để tính tất cả)
+            batch_size: Số task đọc mỗi lần
+
+        Returns:
+            int: Số task đã tính
+        """
+        query = {"status": "completed", "result_ids": {"$exists": True, "$ne": []}}
+        if since is not None:
+            query["created_at"] = {"$gte": since}
+        cursor = mongodb_service.tasks_collection.find(
+            query, {"topics": 1, "result_ids": 1, "created_at": 1, "updated_at": 1}
+        ).sort("created_at", 1).batch_size(batch_size)
+
+        count = 0
+        batch = []
+        async for task in cursor:
+            batch.append(task)
+            if len(batch) >= batch_size:
+                count += await self._backfill_batch(mongodb_service, batch)
+                batch = []
+        if batch:
+            count += await self._backfill_batch(mongodb_service, batch)
+        logger.info(f"Backfilled popular topics from {count} tasks")
+        return count
+
+    async def _backfill_batch(self, mongodb_service, tasks: List[dict]) -> int:
+        """Tính điểm cho một lô task, đọc chủ đề của các kết quả trong một lần"""
+        result_topics = await mongodb_service.get_result_topics(
+            [result_id for task in tasks for result_id in task["result_ids"]]
+        )
+        count = 0
+        for task in tasks:
+            linked = {topic for result_id in task["result_ids"] for topic in result_topics.get(str(result_id), [])}
+            # Kết quả có thể dùng chung với task khác nên chỉ giữ các chủ đề của chính task
+            topics = [topic for topic in task.get("topics") or [] if topic in linked]
+            if not topics:
+                continue
+            finished_at = task.get("updated_at") or task.get("created_at")
+            if finished_at and finished_at.tzinfo is None:
+                # MongoDB trả về datetime UTC không kèm timezone
+                finished_at = finished_at.replace(tzinfo=UTC)
+            await self.record(topics, at=finished_at.timestamp() if finished_at else None)
+            count += 1
+        return count
@@ -0,0 +1,249 @@
+import aiohttp
+import asyncio
+import os
+import logging
+import xml.etree.ElementTree as ET
+from typing import Any, Awaitable, Callable, List, Optional
+from dotenv import load_dotenv
+from ..models.article import ArticleRecord
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Mã ngôn ngữ ISO 639-1 của hệ thống -> mã ngôn ngữ của PubMed
+PUBMED_LANGUAGES = {
+    "en": "eng",
+    "vi": "vie",
+    "fr": "fre",
+    "de": "ger",
+    "es": "spa",
+    "ja": "jpn",
+    "zh": "chi"
+}
+
+def _text(element: Optional[ET.Element]) -> str:
+    """Toàn bộ text của element (kể cả các thẻ định dạng bên trong như <i>, <sup>)"""
+    if element is None:
+        return ""
+    return " ".join("".join(element.itertext()).split())
+
+def parse_article(article: ET.Element) -> Optional[ArticleRecord]:
+    """Chuyển một phần tử <PubmedArticle> thành ArticleRecord
+
+    Returns:
+        ArticleRecord: Bài báo, None nếu thiếu tiêu đề hoặc abstract
+    """
+    citation = article.find("MedlineCitation")
+    if citation is None:
+        return None
+    pmid = _text(citation.find("PMID"))
+    info = citation.find("Article")
+    if info is None:
+        return None
+
+    title = _text(info.find("ArticleTitle"))
+    sections = []
+    for section in info.findall("Abstract/AbstractText"):
+        text = _text(section)
+        label = section.get("Label")
+        if text:
+            sections.append(f"{label}: {text}" if label else text)
+    if not title or not sections:
+        return None
+
+    doi = None
+    for article_id in article.findall("PubmedData/ArticleIdList/ArticleId"):
+        if article_id.get("IdType") == "doi":
+            doi = _text(article_id)
+    if not doi:
+        for location in info.findall("ELocationID"):
+            if location.get("EIdType") == "doi":
+                doi = _text(location)
+
+    pub_date = info.find("Journal/JournalIssue/PubDate")
+    published = None
+    if pub_date is not None:
+        published = _text(pub_date.find("MedlineDate")) or "-".join(
+            _text(pub_date.find(part)) for part in ("Year", "Month", "Day") if pub_date.find(part) is not None
+        ) or None
+
+    authors = []
+    for author in info.findall("AuthorList/Author"):
+        name = _text(author.find("CollectiveName")) or ", ".join(
+            part for part in (_text(author.find("LastName")), _text(author.find("ForeName"))) if part
+        )
+        if name:
+            authors.append(name)
+
+    return ArticleRecord(
+        source="pubmed",
+        title=title,
+        abstract="\n".join(sections),
+        doi=doi or None,
+        url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else None,
+        journal=_text(info.find("Journal/Title")) or None,
+        published=published,
+        authors=authors
+    )
+
+class PubMedClient:
+    """Client bất đồng bộ cho NCBI E-utilities: esearch lấy ID, efetch theo lô lớn và parse XML dạng stream"""
+
+    def __init__(self, api_url: str = None, api_key: str = None, timeout: float = None, pool_size: int = None,
+                 batch_size: int = None, chunk_size: int = 65536):
+        """Khởi tạo PubMed client
+
+        Args:
+            api_url: URL gốc của E-utilities (mặc định lấy từ PUBMED_API_URL)
+            api_key: NCBI API key (tùy chọn, cho phép 10 request/giây thay vì 3)
+            timeout: Thời gian chờ tối đa cho mỗi request (giây)
+            pool_size: Số kết nối tối đa trong pool
+            batch_size: Số ID tối đa trong một lần efetch
+            chunk_size: Kích thước mỗi phần dữ liệu đọc từ response (byte)
+        """
+        self.api_url = (api_url or os.getenv("PUBMED_API_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")).rstrip("/")
+        self.api_key = api_key or os.getenv("PUBMED_API_KEY")
+        self.timeout = timeout or float(os.getenv("PUBMED_TIMEOUT", 30))
+        self.pool_size = pool_size or int(os.getenv("PUBMED_POOL_SIZE", 10))
+        self.batch_size = batch_size or int(os.getenv("PUBMED_BATCH_SIZE", 200))
+        self.max_ids = int(os.getenv("PUBMED_MAX_IDS", 1000))
+        self.chunk_size = chunk_size
+        # NCBI yêu cầu tool và email để liên hệ khi có vấn đề
+        self.tool = os.getenv("PUBMED_TOOL", "tkpm-data-crawler")
+        self.email = os.getenv("PUBMED_EMAIL")
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Tạo session khi cần (phải chạy bên trong event loop)"""
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout)
+                    )
+        return self._session
+
+    def _common_params(self) -> dict:
+        params = {"db": "pubmed", "tool": self.tool}
+        if self.email:
+            params["email"] = self.email
+        if self.api_key:
+            params["api_key"] = self.api_key
+        return params
+
+    async def esearch(self, topic: str, language: str, retmax: int) -> List[str]:
+        """Tìm ID các bài báo theo chủ đề và ngôn ngữ
+
+        Raises:
+            asyncio.TimeoutError: Khi request vượt quá thời gian chờ
+            aiohttp.ClientResponseError: Khi API trả lỗi (429 khi vượt giới hạn tốc độ)
+        """
+        term = f"{topic}[All Fields]"
+        pubmed_language = PUBMED_LANGUAGES.get(language, language)
+        if pubmed_language:
+            term += f" AND {pubmed_language}[Language]"
+        params = {**self._common_params(), "term": term, "retmax": str(retmax), "retmode": "json"}
+        session = await self._get_session()
+        async with session.get(f"{self.api_url}/esearch.fcgi", params=params) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        return data.get("esearchresult", {}).get("idlist", [])
+
+    async def efetch(self, ids: List[str], limit: int = None) -> List[ArticleRecord]:
+        """Lấy chi tiết một lô bài báo, parse XML theo từng phần khi dữ liệu đang tải về
+
+        Mỗi <PubmedArticle> được giải phóng ngay sau khi parse nên bộ nhớ không tăng theo
+        kích thước response.
+
+        Args:
+            ids: Danh sách PMID (gửi bằng POST nên có thể rất dài)
+            limit: Dừng đọc khi đã có đủ số bài báo có abstract
+
+        Raises:
+            asyncio.TimeoutError: Khi request vượt quá thời gian chờ
+            aiohttp.ClientResponseError: Khi API trả lỗi
+            xml.etree.ElementTree.ParseError: Khi XML không hợp lệ
+        """
+        data = {**self._common_params(), "id": ",".join(ids), "retmode": "xml", "rettype": "abstract"}
+        records = []
+        session = await self._get_session()
+        async with session.post(f"{self.api_url}/efetch.fcgi", data=data) as response:
+            response.raise_for_status()
+            parser = ET.XMLPullParser(events=("start", "end"))
+            root = None
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if event == "start":
+                        if root is None:
+                            root = element
+                        continue
+                    if element.tag != "PubmedArticle":
+                        continue
+                    record = parse_article(element)
+                    if record is not None:
+                        records.append(record)
+                    # Bỏ các bài đã parse khỏi cây XML
+                    if root is not None:
+                        root.clear()
+                    if limit is not None and len(records) >= limit:
+                        return records
+            parser.close()
+        return records
+
+    async def search_ids(self, topic: str, language: str, limit: int,
+                         call: Callable[..., Awaitable[Any]] = None) -> List[str]:
+        """PMID của các bài báo liên quan nhất (lấy dư vì một số bài báo không có abstract)"""
+        call = call or (lambda func, *args: func(*args))
+        return await call(self.esearch, topic, language, min(limit * 3, self.max_ids))
+
+    async def fetch_records(self, ids: List[str], limit: int,
+                            call: Callable[..., Awaitable[Any]] = None) -> List[ArticleRecord]:
+        """Lấy các bài báo có abstract theo từng lô efetch cho tới khi đủ limit"""
+        call = call or (lambda func, *args: func(*args))
+        records: List[ArticleRecord] = []
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            records.extend(await call(self.efetch, batch, limit - len(records)))
+            if len(records) >= limit:
+                break
+        return records[:limit]
+
+    async def search(self, topic: str, language: str, limit: int,
+                     call: Callable[..., Awaitable[Any]] = None) -> List[ArticleRecord]:
+        """Tìm các bài báo có abstract theo chủ đề
+
+        Args:
+            topic: Chủ đề
+            language: Mã ngôn ngữ (en, vi, ...)
+            limit: Số bài báo cần lấy
+            call: Hàm bao mỗi request (ví dụ UpstreamGuard.call để giới hạn tốc độ)
+
+        Returns:
+            List[ArticleRecord]: Các bài báo theo thứ tự liên quan của PubMed
+        """
+        ids = await self.search_ids(topic, language, limit, call)
+        records = await self.fetch_records(ids, limit, call)
+        logger.info(f"Found {len(records)} PubMed articles for topic {topic} from {len(ids)} ids")
+        return records
+
+    async def close(self):
+        """Đóng HTTP session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed PubMed HTTP session")
+        self._session = None
+
+
+_client: Optional[PubMedClient] = None
+
+def get_pubmed_client() -> PubMedClient:
+    """Trả về PubMed client dùng chung cho toàn process"""
+    global _client
+    if _client is None:
+        _client = PubMedClient()
+    return _client
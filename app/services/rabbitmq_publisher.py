@@ -0,0 +1,94 @@
+import aio_pika
+import asyncio
+import json
+import os
+import time
+from typing import List
+from dotenv import load_dotenv
+from .metrics import metrics
+
+load_dotenv()
+
+# Các queue được khai báo một lần khi khởi động
+QUEUES = ("crawl_data_queue", "script_generate_queue")
+
+class RabbitMQPublisher:
+    """Publisher dùng pool channel ở chế độ publisher confirms, khai báo topology một lần
+
+    Channel không bị giữ riêng trong lúc chờ xác nhận: các lần publish được chia vòng tròn
+    giữa các channel và mỗi channel có tối đa max_outstanding message chưa được xác nhận.
+    """
+
+    def __init__(self, pool_size: int = None, max_retries: int = None, max_outstanding: int = None):
+        """Khởi tạo publisher
+
+        Args:
+            pool_size: Số channel dùng để publish (mặc định RABBITMQ_PUBLISH_CHANNELS)
+            max_retries: Số lần gửi lại khi broker nack message
+            max_outstanding: Số message chờ xác nhận tối đa trên mỗi channel
+                (mặc định RABBITMQ_MAX_OUTSTANDING_CONFIRMS)
+        """
+        self.pool_size = pool_size or int(os.getenv("RABBITMQ_PUBLISH_CHANNELS", 4))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("RABBITMQ_PUBLISH_RETRIES", 2))
+        self.max_outstanding = max_outstanding or int(os.getenv("RABBITMQ_MAX_OUTSTANDING_CONFIRMS", 64))
+        self._channels: List[aio_pika.abc.AbstractChannel] = []
+        self._outstanding: List[asyncio.Semaphore] = []
+        self._next = 0
+
+    async def start(self, connection: aio_pika.abc.AbstractConnection):
+        """Mở các channel publish và khai báo các queue"""
+        for _ in range(self.pool_size):
+            channel = await connection.channel(publisher_confirms=True)
+            self._channels.append(channel)
+            self._outstanding.append(asyncio.Semaphore(max(self.max_outstanding, 1)))
+
+        for queue_name in QUEUES:
+            await self._channels[0].declare_queue(queue_name, durable=True)
+        print(f"Publisher ready with {self.pool_size} confirm channels")
+
+    async def close(self):
+        """Đóng các channel publish"""
+        for channel in self._channels:
+            if not channel.is_closed:
+                await channel.close()
+        self._channels = []
+        self._outstanding = []
+
+    @staticmethod
+    def _build_message(data: dict) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=json.dumps(data).encode(),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        )
+
+    async def _publish_on(self, channel, routing_key: str, data: dict):
+        """Publish một message và chờ broker xác nhận, gửi lại nếu bị nack"""
+        attempt = 0
+        while True:
+            try:
+                start = time.perf_counter()
+                await channel.default_exchange.publish(
+                    self._build_message(data),
+                    routing_key=routing_key,
+                    mandatory=True
+                )
+                metrics.observe("publisher.confirm.latency", time.perf_counter() - start)
+                metrics.incr("publisher.confirmed")
+                return
+            except aio_pika.exceptions.DeliveryError as e:
+                metrics.incr("publisher.nacked")
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                print(f"Message to {routing_key} was not confirmed, retrying ({attempt}/{self.max_retries}): {str(e)}")
+
+    async def publish(self, routing_key: str, data: dict):
+        """Publish một message trên channel kế tiếp của pool và chờ broker xác nhận
+
+        Raises:
+            aio_pika.exceptions.DeliveryError: Khi broker không xác nhận message sau khi đã thử lại
+        """
+        index = self._next % len(self._channels)
+        self._next = index + 1
+        async with self._outstanding[index]:
+            await self._publish_on(self._channels[index], routing_key, data)
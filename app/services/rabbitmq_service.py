@@ -1,7 +1,11 @@
 import aio_pika
+import asyncio
 import json
 import os
+import time
 from dotenv import load_dotenv
+from .metrics import metrics
+from .rabbitmq_publisher import RabbitMQPublisher
 
 load_dotenv()
 
@@ -11,6 +15,13 @@ class RabbitMQService:
         self.channel = None
         self.queue = None
         self._is_connected = False
+        self.publisher = RabbitMQPublisher()
+        # Cấu hình consumer
+        self.prefetch_count = int(os.getenv("RABBITMQ_PREFETCH_COUNT", 10))
+        self.consumer_workers = int(os.getenv("CRAWL_CONSUMER_WORKERS", 4))
+        self.shutdown_timeout = float(os.getenv("CONSUMER_SHUTDOWN_TIMEOUT", 60))
+        self.worker_stats = {}
+        self._started_at = time.monotonic()
 
     async def ensure_connection(self):
         """Đảm bảo kết nối RabbitMQ đã được thiết lập"""
@@ -25,6 +36,8 @@ class RabbitMQService:
             )
             self.channel = await self.connection.channel()
             self.queue = await self.channel.declare_queue("crawl_data_queue", durable=True)
+            # Khai báo topology và mở pool channel publish một lần
+            await self.publisher.start(self.connection)
             self._is_connected = True
             print("Connected to RabbitMQ successfully")
         except Exception as e:
@@ -34,6 +47,7 @@ class RabbitMQService:
     async def close(self):
         """Đóng kết nối RabbitMQ"""
         if self.connection:
+            await self.publisher.close()
             await self.connection.close()
             self._is_connected = False
             self.connection = None
@@ -48,42 +62,112 @@ class RabbitMQService:
             "task_id": task_id,
             "data": data
         }
-        await self.channel.default_exchange.publish(
-            aio_pika.Message(
-                body=json.dumps(message).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-            ),
-            routing_key="crawl_data_queue"
-        )
+        await self.publisher.publish("crawl_data_queue", message)
 
-    async def consume_crawl_tasks(self, callback):
-        """Tiêu thụ các task crawl từ queue"""
+    async def consume_crawl_tasks(self, callback, prefetch_count: int = None, workers: int = None):
+        """Tiêu thụ các task crawl từ queue với nhiều worker chạy đồng thời
+        
+        Mỗi message chỉ được ack sau khi callback xử lý xong. Khi bị hủy, ngừng nhận
+        message mới, trả lại các message chưa xử lý và chờ các message đang xử lý hoàn thành.
+        
+        Args:
+            callback: Hàm xử lý dữ liệu task
+            prefetch_count: Số message tối đa chưa ack (mặc định RABBITMQ_PREFETCH_COUNT)
+            workers: Số worker coroutine (mặc định CRAWL_CONSUMER_WORKERS)
+        """
         await self.ensure_connection()
+        prefetch_count = prefetch_count or self.prefetch_count
+        workers = workers or self.consumer_workers
+        
+        await self.channel.set_qos(prefetch_count=prefetch_count)
+        pending = asyncio.Queue()
+        consumer_tag = await self.queue.consume(pending.put)
+        worker_tasks = [
+            asyncio.create_task(self._consume_worker(worker_id, pending, callback))
+            for worker_id in range(workers)
+        ]
+        print(f"Consuming crawl_data_queue with {workers} workers, prefetch_count={prefetch_count}")
         
-        async with self.queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                async with message.process():
+        try:
+            await asyncio.wait(worker_tasks)
+        except asyncio.CancelledError:
+            print("Stopping consumer, draining in-flight tasks...")
+            await self._drain(consumer_tag, pending, worker_tasks)
+            raise
+
+    async def _consume_worker(self, worker_id: int, pending: asyncio.Queue, callback):
+        """Worker lấy message từ hàng đợi nội bộ và xử lý tuần tự"""
+        stats = self.worker_stats.setdefault(worker_id, {"processed": 0, "failed": 0, "errors": 0, "busy_seconds": 0.0})
+        while True:
+            message = await pending.get()
+            if message is None:
+                return
+            start = time.perf_counter()
+            try:
+                # requeue=True: message đang xử lý khi worker bị hủy (shutdown quá hạn) được trả lại queue;
+                # lỗi của callback được bắt bên trong nên message lỗi vẫn được ack như trước
+                async with message.process(requeue=True):
                     try:
                         data = json.loads(message.body.decode())
                         await callback(data)
+                        stats["processed"] += 1
+                        metrics.incr("consumer.processed")
                     except Exception as e:
+                        stats["failed"] += 1
+                        metrics.incr("consumer.failed")
                         print(f"Error processing message: {str(e)}")
+                    finally:
+                        stats["busy_seconds"] += time.perf_counter() - start
+            except asyncio.CancelledError:
+                # Chỉ shutdown mới hủy worker
+                raise
+            except Exception as e:
+                # Lỗi của chính message.process() (ack/nack trên channel đã đóng, ...): worker vẫn chạy tiếp
+                # để không mất dần số worker; message chưa ack được broker giao lại khi channel mở lại
+                stats["errors"] += 1
+                metrics.incr("consumer.worker_errors")
+                print(f"Error acknowledging message in worker {worker_id}: {str(e)}")
+
+    async def _drain(self, consumer_tag: str, pending: asyncio.Queue, worker_tasks: list):
+        """Dừng nhận message mới và chờ các worker xử lý xong message hiện tại"""
+        try:
+            await self.queue.cancel(consumer_tag)
+        except Exception as e:
+            print(f"Error cancelling consumer: {str(e)}")
+        
+        # Trả lại queue các message đã prefetch nhưng chưa xử lý
+        while not pending.empty():
+            message = pending.get_nowait()
+            if message is not None:
+                await message.nack(requeue=True)
+        for _ in worker_tasks:
+            pending.put_nowait(None)
+        
+        done, still_running = await asyncio.wait(worker_tasks, timeout=self.shutdown_timeout)
+        for task in still_running:
+            # Worker bị hủy trong message.process(requeue=True) nên message đang xử lý được reject kèm requeue
+            task.cancel()
+        if still_running:
+            await asyncio.wait(still_running)
+        print(f"Consumer stopped ({len(done)} workers drained, {len(still_running)} cancelled)")
+
+    def consumer_stats(self) -> dict:
+        """Thống kê throughput của từng worker"""
+        uptime = max(time.monotonic() - self._started_at, 1e-9)
+        return {
+            str(worker_id): {
+                **stats,
+                "throughput_per_min": round(stats["processed"] / uptime * 60, 3),
+                "utilisation": round(stats["busy_seconds"] / uptime, 3)
+            }
+            for worker_id, stats in self.worker_stats.items()
+        }
 
     async def publish_generate_task(self, data: dict):
-        """Gửi task generate vào queue
+        """Gửi task generate vào queue (chờ broker xác nhận)
         
         Args:
             data: Dữ liệu cần gửi lên script_generate_queue
         """
         await self.ensure_connection()
-        
-        # Khai báo queue mới nếu chưa tồn tại
-        generate_queue = await self.channel.declare_queue("script_generate_queue", durable=True)
-        
-        await self.channel.default_exchange.publish(
-            aio_pika.Message(
-                body=json.dumps(data).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-            ),
-            routing_key="script_generate_queue"
-        ) 
\ No newline at end of file
+        await self.publisher.publish("script_generate_queue", data)
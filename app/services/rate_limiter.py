@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Giới hạn mặc định (request/giây) cho từng upstream, ghi đè bằng RATE_LIMIT_<NAME>
+DEFAULT_RATES = {
+    "wikipedia": 50.0,
+    "nature": 5.0,
+    "pubmed": 3.0,
+    "gemini": 10.0
+}
+
+# Token bucket + trạng thái circuit breaker trong một lần gọi Redis
+# KEYS: bucket, rate, pause, open, half_open, probe
+# ARGV: base_rate, burst, ttl, probe_ttl
+# Trả về {wait, rate, state}: wait < 0 nghĩa là circuit đang mở
+_ACQUIRE_SCRIPT = """
+local base_rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local rate = tonumber(redis.call('GET', KEYS[2])) or base_rate
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    return {'-1', tostring(rate), 'open'}
+end
+local pause = redis.call('PTTL', KEYS[3])
+if pause > 0 then
+    return {tostring(pause / 1000), tostring(rate), 'closed'}
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if wait > 0 then
+    return {tostring(wait), tostring(rate), 'closed'}
+end
+-- Half-open: chỉ một request (probe) được đi qua cho đến khi có kết quả
+if redis.call('EXISTS', KEYS[5]) == 1 then
+    if not redis.call('SET', KEYS[6], '1', 'NX', 'EX', ARGV[4]) then
+        return {'-1', tostring(rate), 'open'}
+    end
+    return {'0', tostring(rate), 'probe'}
+end
+return {'0', tostring(rate), 'closed'}
+"""
+
+# Điều chỉnh tốc độ hiệu dụng: rate = clamp(rate * factor + step, min_rate, base_rate)
+# KEYS: rate; ARGV: base_rate, factor, step, min_rate, ttl
+_ADJUST_SCRIPT = """
+local base_rate = tonumber(ARGV[1])
+local rate = tonumber(redis.call('GET', KEYS[1])) or base_rate
+rate = math.max(tonumber(ARGV[4]), math.min(base_rate, rate * tonumber(ARGV[2]) + tonumber(ARGV[3])))
+redis.call('SET', KEYS[1], tostring(rate), 'EX', ARGV[5])
+return tostring(rate)
+"""
+
+class CircuitOpenError(Exception):
+    """Upstream đang bị ngắt do lỗi liên tục, request bị từ chối ngay"""
+
+class UpstreamGuard:
+    """Token bucket thích ứng và circuit breaker cho một upstream
+
+    Trạng thái được lưu trong Redis để dùng chung giữa các worker process;
+    khi Redis không khả dụng thì dùng trạng thái trong process.
+    """
+
+    def __init__(self, name: str, redis_service=None, rate: float = None, burst: float = None):
+        """Khởi tạo guard
+
+        Args:
+            name: Tên upstream (wikipedia, nature, pubmed, gemini)
+            redis_service: Redis service dùng để chia sẻ trạng thái (None để chỉ dùng trong process)
+            rate: Số request/giây tối đa
+            burst: Số request tối đa được gửi dồn
+        """
+        self.name = name
+        self.redis_service = redis_service
+        env_name = name.upper()
+        self.base_rate = rate or float(os.getenv(f"RATE_LIMIT_{env_name}", DEFAULT_RATES.get(name, 10.0)))
+        self.burst = burst or float(os.getenv(f"RATE_BURST_{env_name}", max(self.base_rate, 1.0)))
+        self.min_rate = max(self.base_rate * 0.05, 0.1)
+        self.failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+        self.failure_window = int(os.getenv("CIRCUIT_FAILURE_WINDOW", 30))
+        self.open_seconds = int(os.getenv("CIRCUIT_OPEN_SECONDS", 30))
+        self.max_wait = float(os.getenv("RATE_LIMIT_MAX_WAIT", 30))
+
+        prefix = f"upstream:{name}"
+        self._keys = [f"{prefix}:bucket", f"{prefix}:rate", f"{prefix}:pause",
+                      f"{prefix}:open", f"{prefix}:half_open", f"{prefix}:probe"]
+        self._failures_key = f"{prefix}:failures"
+        self._acquire_script = None
+        self._adjust_script = None
+        self._rate = self.base_rate
+
+        # Trạng thái trong process, dùng khi không có Redis
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._pause_until = 0.0
+        self._open_until = 0.0
+        self._half_open = False
+        self._probing = False
+        self._failures = []
+
+    def _redis(self):
+        if self.redis_service is None or not self.redis_service.healthy:
+            return None
+        return self.redis_service.redis_client
+
+    async def acquire(self) -> str:
+        """Chờ đến lượt gửi request
+
+        Returns:
+            str: Trạng thái circuit ("closed" hoặc "probe")
+
+        Raises:
+            CircuitOpenError: Khi circuit đang mở hoặc đang chờ kết quả probe
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait, state = await self._try_acquire()
+            if wait < 0:
+                metrics.incr(f"upstream.{self.name}.rejected")
+                raise CircuitOpenError(f"Circuit for {self.name} is open")
+            if wait == 0:
+                return state
+            if time.monotonic() + wait > deadline:
+                metrics.incr(f"upstream.{self.name}.rejected")
+                raise CircuitOpenError(f"Rate limit wait for {self.name} exceeds {self.max_wait}s")
+            metrics.incr(f"upstream.{self.name}.throttled")
+            await asyncio.sleep(wait)
+
+    async def _try_acquire(self) -> Tuple[float, str]:
+        client = self._redis()
+        if client is not None:
+            try:
+                if self._acquire_script is None:
+                    self._acquire_script = client.register_script(_ACQUIRE_SCRIPT)
+                wait, rate, state = await self._acquire_script(
+                    keys=self._keys,
+                    args=[self.base_rate, self.burst, 3600, max(self.open_seconds, 1)]
+                )
+                self._rate = float(rate)
+                return float(wait), state
+            except Exception as e:
+                logger.warning(f"Rate limiter for {self.name} falling back to local state: {str(e)}")
+        return self._try_acquire_local()
+
+    def _try_acquire_local(self) -> Tuple[float, str]:
+        now = time.monotonic()
+        if now < self._open_until:
+            return -1, "open"
+        if now < self._pause_until:
+            return self._pause_until - now, "closed"
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+        if self._tokens < 1:
+            return (1 - self._tokens) / self._rate, "closed"
+        self._tokens -= 1
+        if self._half_open:
+            if self._probing:
+                return -1, "open"
+            self._probing = True
+            return 0, "probe"
+        return 0, "closed"
+
+    async def record_success(self, state: str = "closed"):
+        """Ghi nhận request thành công: đóng circuit nếu là probe, tăng dần tốc độ nếu đang bị giảm"""
+        client = self._redis()
+        if state == "probe":
+            logger.info(f"Circuit for {self.name} closed")
+            metrics.incr(f"upstream.{self.name}.circuit_closed")
+            self._half_open = False
+            self._probing = False
+            if client is not None:
+                try:
+                    await client.delete(self._keys[4], self._keys[5], self._failures_key)
+                except Exception as e:
+                    logger.warning(f"Error closing circuit for {self.name}: {str(e)}")
+        if self._rate < self.base_rate:
+            await self._adjust_rate(1.0, self.base_rate * 0.05)
+
+    async def record_failure(self, error: Exception, state: str = "closed"):
+        """Ghi nhận lỗi: giảm tốc độ khi bị 429/5xx, mở circuit khi lỗi liên tục
+
+        Lỗi phía client (ví dụ 404) không được tính.
+        """
+        status = getattr(error, "status", None) or getattr(error, "code", None)
+        status = status if isinstance(status, int) else None
+        if status is not None and status < 500 and status != 429:
+            if state == "probe":
+                await self.record_success(state)
+            return
+
+        metrics.incr(f"upstream.{self.name}.failures")
+        if status is not None:
+            # Giảm tốc độ theo cấp số nhân và tôn trọng Retry-After
+            await self._adjust_rate(0.5, 0)
+            retry_after = self._retry_after(error)
+            if retry_after:
+                await self._pause(retry_after)
+
+        if state == "probe":
+            await self._open_circuit()
+            return
+
+        client = self._redis()
+        if client is not None:
+            try:
+                failures = await client.incr(self._failures_key)
+                await client.expire(self._failures_key, self.failure_window)
+            except Exception as e:
+                logger.warning(f"Error recording failure for {self.name}: {str(e)}")
+                failures = self._record_local_failure()
+        else:
+            failures = self._record_local_failure()
+        if failures >= self.failure_threshold:
+            await self._open_circuit()
+
+    def _record_local_failure(self) -> int:
+        now = time.monotonic()
+        self._failures = [ts for ts in self._failures if now - ts < self.failure_window] + [now]
+        return len(self._failures)
+
+    async def _open_circuit(self):
+        logger.warning(f"Circuit for {self.name} opened for {self.open_seconds}s")
+        metrics.incr(f"upstream.{self.name}.circuit_opened")
+        self._open_until = time.monotonic() + self.open_seconds
+        self._half_open = True
+        self._probing = False
+        self._failures = []
+        client = self._redis()
+        if client is not None:
+            try:
+                await client.set(self._keys[3], "1", ex=self.open_seconds)
+                await client.set(self._keys[4], "1", ex=self.open_seconds * 10)
+                await client.delete(self._keys[5], self._failures_key)
+            except Exception as e:
+                logger.warning(f"Error opening circuit for {self.name}: {str(e)}")
+
+    async def _pause(self, seconds: float):
+        self._pause_until = time.monotonic() + seconds
+        client = self._redis()
+        if client is not None:
+            try:
+                await client.set(self._keys[2], "1", px=int(seconds * 1000))
+            except Exception as e:
+                logger.warning(f"Error pausing {self.name}: {str(e)}")
+
+    async def _adjust_rate(self, factor: float, step: float):
+        client = self._redis()
+        if client is not None:
+            try:
+                if self._adjust_script is None:
+                    self._adjust_script = client.register_script(_ADJUST_SCRIPT)
+                self._rate = float(await self._adjust_script(
+                    keys=[self._keys[1]],
+                    args=[self.base_rate, factor, step, self.min_rate, 3600]
+                ))
+            except Exception as e:
+                logger.warning(f"Error adjusting rate for {self.name}: {str(e)}")
+        else:
+            self._rate = max(self.min_rate, min(self.base_rate, self._rate * factor + step))
+        metrics.set_gauge(f"upstream.{self.name}.rate", self._rate)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        headers = getattr(error, "headers", None)
+        if not headers:
+            return None
+        try:
+            return float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    async def call(self, func, *args, **kwargs):
+        """Gọi upstream qua limiter và circuit breaker
+
+        Raises:
+            CircuitOpenError: Khi upstream đang bị ngắt
+        """
+        state = await self.acquire()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            if state == "probe":
+                self._probing = False
+            raise
+        except Exception as e:
+            await self.record_failure(e, state)
+            raise
+        await self.record_success(state)
+        return result
+
+
+_guards: Dict[str, UpstreamGuard] = {}
+_redis_service = None
+
+def configure_upstream_guards(redis_service):
+    """Dùng Redis service để chia sẻ trạng thái limiter giữa các process"""
+    global _redis_service
+    _redis_service = redis_service
+    for guard in _guards.values():
+        guard.redis_service = redis_service
+
+def get_upstream_guard(name: str) -> UpstreamGuard:
+    """Trả về guard dùng chung trong process cho một upstream"""
+    if name not in _guards:
+        _guards[name] = UpstreamGuard(name, _redis_service)
+    return _guards[name]
@@ -1,53 +1,124 @@
 import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-from bson import Binary
 from datetime import datetime, UTC
 import os
 from dotenv import load_dotenv
 import json
 import logging
+from typing import List, Optional
 from app.services.mongodb_service import MongoDBService
+from app.services.metrics import metrics
+from app.models.cache_entry import TopicCacheEntry, topic_cache_key
+from app.services.compression import get_text_codec
+from app.services.popular_topics import PopularTopicsCounter
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+class CountingConnectionPool(redis.ConnectionPool):
+    """Connection pool tự đếm số kết nối đã tạo và đang được dùng (không đọc thuộc tính private của redis-py)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_connections = 0
+        self._checked_out = set()
+
+    @property
+    def in_use_connections(self) -> int:
+        return len(self._checked_out)
+
+    def make_connection(self):
+        connection = super().make_connection()
+        self.created_connections += 1
+        return connection
+
+    async def get_connection(self, *args, **kwargs):
+        connection = await super().get_connection(*args, **kwargs)
+        self._checked_out.add(connection)
+        return connection
+
+    async def release(self, connection):
+        # get_connection của redis-py tự trả kết nối khi không kết nối được, trước khi được đếm
+        self._checked_out.discard(connection)
+        await super().release(connection)
+
+    def reset(self):
+        super().reset()
+        self.created_connections = 0
+        self._checked_out = set()
+
+def create_redis_pool(max_connections: int = None) -> CountingConnectionPool:
+    """Tạo Redis connection pool từ biến môi trường
+    
+    Args:
+        max_connections: Số kết nối tối đa (mặc định lấy từ REDIS_MAX_CONNECTIONS)
+    """
+    # Lấy thông tin kết nối từ biến môi trường
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        raise ValueError("REDIS_URL environment variable is not set")
+
+    return CountingConnectionPool.from_url(
+        redis_url,
+        max_connections=max_connections or int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+        decode_responses=True,
+        socket_timeout=5,
+        socket_connect_timeout=5,
+        retry_on_timeout=True
+    )
+
 class RedisService:
-    def __init__(self):
-        """Khởi tạo Redis client"""
+    def __init__(self, mongodb_service: MongoDBService = None, connection_pool: redis.ConnectionPool = None):
+        """Khởi tạo Redis client
+        
+        Args:
+            mongodb_service: MongoDB service dùng chung (mặc định tạo mới)
+            connection_pool: Redis connection pool dùng chung (mặc định tạo pool riêng khi connect)
+        """
         self.redis_client = None
+        self.connection_pool = connection_pool
+        self._owns_pool = connection_pool is None
+        self.mongodb_service = mongodb_service or MongoDBService()
+        self.results_collection = self.mongodb_service.results_collection
         self._update_task = None
         self._is_running = False
         self._max_retries = 3
         self._retry_delay = 5  # giây
-
-        self.mongo_client = AsyncIOMotorClient(os.getenv("MONGODB_URI"), uuidRepresentation='standard')
-        self.db = self.mongo_client.data_management
-        self.tasks_collection = self.db.tasks
-        self.results_collection = self.db.results
+        # Theo dõi sức khỏe kết nối: đánh dấu khi gặp lỗi kết nối, heartbeat chạy nền
+        self._healthy = False
+        self._heartbeat_task = None
+        self._reconnect_task = None
+        self.heartbeat_interval = float(os.getenv("REDIS_HEARTBEAT_INTERVAL", 15))
+        self._max_reconnect_delay = 30  # giây
+        # TTL của nội dung chủ đề được cache khi crawl (giây)
+        self.topic_ttl = int(os.getenv("TOPIC_CACHE_TTL", 3600))
+        # Làm mới cache của top-K chủ đề phổ biến; TTL dài hơn chu kỳ làm mới để entry không hết hạn giữa hai lần
+        self.refresh_interval = int(os.getenv("TOPIC_REFRESH_INTERVAL", 1800))
+        self.refresh_limit = int(os.getenv("TOPIC_REFRESH_LIMIT", 20))
+        self.refresh_ttl = max(self.topic_ttl, self.refresh_interval * 2)
+        # Codec nén nội dung chủ đề trong cache (bật bằng TEXT_COMPRESSION=zlib)
+        self.codec = get_text_codec()
+        # Điểm phổ biến của chủ đề, cập nhật khi task hoàn thành
+        self.popular_topics = PopularTopicsCounter(self)
 
     async def connect(self):
         """Kết nối đến Redis server với retry"""
         retry_count = 0
         while retry_count < self._max_retries:
             try:
-                # Lấy thông tin kết nối từ biến môi trường
-                redis_url = os.getenv("REDIS_URL")
-                if not redis_url:
-                    raise ValueError("REDIS_URL environment variable is not set")
-
-                # Tạo kết nối Redis
-                self.redis_client = redis.from_url(
-                    redis_url,
-                    decode_responses=True,
-                    socket_timeout=5,
-                    socket_connect_timeout=5,
-                    retry_on_timeout=True
-                )
+                if self.connection_pool is None:
+                    self.connection_pool = create_redis_pool()
+
+                # Tạo client trên connection pool
+                self.redis_client = redis.Redis(connection_pool=self.connection_pool)
 
                 # Kiểm tra kết nối
                 await self.redis_client.ping()
+                self._healthy = True
+                if self._heartbeat_task is None or self._heartbeat_task.done():
+                    self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
                 logger.info("Successfully connected to Redis")
                 return
 
@@ -72,56 +143,95 @@ class RedisService:
             except asyncio.CancelledError:
                 pass
 
+        for task in (self._heartbeat_task, self._reconnect_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._healthy = False
+
         if self.redis_client:
             await self.redis_client.close()
+            # Pool dùng chung do container đóng
+            if self._owns_pool and self.connection_pool:
+                await self.connection_pool.disconnect()
             logger.info("Disconnected from Redis")
 
+    @property
+    def healthy(self) -> bool:
+        """Redis đã kết nối và không ghi nhận lỗi kết nối"""
+        return self.redis_client is not None and self._healthy
+
     async def _ensure_connection(self):
-        """Đảm bảo kết nối Redis đang hoạt động"""
+        """Đảm bảo kết nối Redis đã được thiết lập
+        
+        Không gửi PING: sức khỏe kết nối được theo dõi thụ động qua lỗi của các lệnh
+        và heartbeat chạy nền. Khi Redis đang lỗi, trả lỗi ngay thay vì chờ socket timeout.
+        """
         if not self.redis_client:
             await self.connect()
-        try:
-            await self.redis_client.ping()
-        except Exception:
-            logger.warning("Redis connection lost, attempting to reconnect...")
-            await self.connect()
+        elif not self._healthy:
+            metrics.incr("redis.fast_fail")
+            raise RedisConnectionError("Redis is unhealthy, waiting for reconnect")
+
+    def _handle_error(self, error: Exception):
+        """Đánh dấu kết nối lỗi và bắt đầu reconnect nếu là lỗi kết nối"""
+        if not isinstance(error, (RedisConnectionError, RedisTimeoutError)):
+            return
+        if self._healthy:
+            logger.warning(f"Redis connection lost: {str(error)}")
+            metrics.incr("redis.connection_lost")
+        self._healthy = False
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        """Thử kết nối lại với backoff tăng dần cho đến khi thành công"""
+        delay = 1
+        while not self._healthy:
+            await asyncio.sleep(delay)
+            try:
+                await self.redis_client.ping()
+                self._healthy = True
+                metrics.incr("redis.reconnected")
+                logger.info("Reconnected to Redis")
+            except Exception as e:
+                logger.warning(f"Redis reconnect failed, retrying in {delay}s: {str(e)}")
+                delay = min(delay * 2, self._max_reconnect_delay)
+
+    async def _heartbeat_loop(self):
+        """Gửi PING định kỳ ở nền để phát hiện mất kết nối khi không có request"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not self._healthy:
+                continue
+            try:
+                with metrics.timer("redis.heartbeat.latency"):
+                    await self.redis_client.ping()
+            except Exception as e:
+                self._handle_error(e)
 
-    async def update_popular_topics_for_redis(self, topics: list):
-        """Cập nhật danh sách chủ đề phổ biến vào Redis"""
+    async def record_popular_topics(self, topics: list):
+        """Cộng điểm phổ biến cho các chủ đề của một task vừa hoàn thành"""
         try:
             await self._ensure_connection()
-            await self.redis_client.set(
-                "popular_topics",
-                json.dumps(topics)
-            )
-            logger.info(f"Updated list of {len(topics)} popular topics in Redis")
+            await self.popular_topics.record(topics)
         except Exception as e:
-            logger.error(f"Error updating popular topics: {str(e)}")
-            raise
+            logger.error(f"Error recording popular topics: {str(e)}")
+            self._handle_error(e)
 
-    async def get_popular_topics_from_redis(self) -> list:
+    async def get_popular_topics_from_redis(self, limit: int = 5) -> list:
         """Lấy danh sách chủ đề phổ biến từ Redis"""
         try:
             await self._ensure_connection()
-            topics_json = await self.redis_client.get("popular_topics")
-            if topics_json:
-                return json.loads(topics_json)
-            return []
+            return await self.popular_topics.top(limit)
         except Exception as e:
             logger.error(f"Error getting popular topics: {str(e)}")
+            self._handle_error(e)
             return []
 
-    async def update_popular_topics_from_mongodb_to_redis(self):
-        """Cập nhật danh sách chủ đề phổ biến từ MongoDB"""
-        try:
-            mongodb_service = MongoDBService()
-            popular_topics = await mongodb_service.get_popular_topics()
-            print(popular_topics)
-            await self.update_popular_topics_for_redis(popular_topics)
-            logger.info(f"Updated Redis with {len(popular_topics)} topics from MongoDB")
-        except Exception as e:
-            logger.error(f"Error updating from MongoDB: {str(e)}")
-
     async def start_update_loop(self):
         """Bắt đầu vòng lặp cập nhật Redis tự động"""
         if self._is_running:
@@ -131,68 +241,165 @@ class RedisService:
         self._update_task = asyncio.create_task(self._update_loop())
 
     async def _update_loop(self):
-        """Vòng lặp cập nhật Redis mỗi 30 phút"""
+        """Vòng lặp cập nhật Redis theo chu kỳ TOPIC_REFRESH_INTERVAL (mặc định 30 phút)"""
         while self._is_running:
             try:
-                await self.update_popular_topics_from_mongodb_to_redis()
                 await self.update_topic_data()
                 logger.info(f"Redis update completed at {datetime.now(UTC)}")
             except Exception as e:
                 logger.error(f"Error in update loop: {str(e)}")
             
-            # Đợi 30 phút trước khi cập nhật lại
-            await asyncio.sleep(1800)  # 1800 giây = 30 phút
+            # Đợi trước khi cập nhật lại (mặc định 30 phút)
+            await asyncio.sleep(self.refresh_interval)
 
     async def update_topic_data(self):
-        """Cập nhật dữ liệu đã crawl cho từng chủ đề phổ biến"""
-        try:
-            # Lấy danh sách chủ đề phổ biến từ Redis
-            popular_topics = await self.get_popular_topics_from_redis()
-            print(popular_topics)
-            
-            for topic in popular_topics:
-                try:
-                    # Lấy 1 kết quả mới nhất cho mỗi chủ đề từ mongodb dựa vào bảng results
+        """Làm mới cache nội dung của các chủ đề phổ biến
+        
+        Kết quả mới nhất của mọi bộ (chủ đề, ngôn ngữ, nguồn) được chọn bằng một aggregation
+        (chỉ trên các trường nhỏ), nội dung được đọc bằng một truy vấn $in và ghi vào Redis
+        bằng một pipeline.
+        """
+        with metrics.timer("redis.refresh.duration"):
+            try:
+                popular_topics = await self.get_popular_topics_from_redis(self.refresh_limit)
+                if not popular_topics:
+                    return
+
+                pipeline = [
+                    # Dùng index (topics, language, source, created_at); một kết quả có thể thuộc nhiều chủ đề
+                    {"$match": {"topics": {"$in": popular_topics}}},
+                    # Chỉ sắp xếp các trường nhỏ, nội dung bài viết được đọc riêng sau khi chọn xong
+                    {"$project": {"topics": 1, "language": 1, "source": 1, "created_at": 1}},
+                    {"$unwind": "$topics"},
+                    {"$match": {"topics": {"$in": popular_topics}}},
+                    {"$sort": {"topics": 1, "language": 1, "source": 1, "created_at": -1}},
+                    {"$group": {
+                        "_id": {"topic": "$topics", "language": "$language", "source": "$source"},
+                        "result_id": {"$first": "$_id"}
+                    }}
+                ]
+                groups = await self.results_collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+                # Nội dung của các kết quả được chọn, đọc trong một lần
+                documents = {}
+                if groups:
                     cursor = self.results_collection.find(
-                        {"topic": topic}
-                    ).sort("created_at", -1).limit(1)
-                    
-                    results = []
+                        {"_id": {"$in": list({group["result_id"] for group in groups})}},
+                        {"source": 1, "language": 1, "text": 1, "text_z": 1, "compression": 1, "created_at": 1,
+                         "validated_at": 1, "validators": 1, "warmed": 1}
+                    )
                     async for doc in cursor:
-                        results.append({
-                            "resultId": str(doc["_id"]),
-                            "source": doc["source"],
-                            "language": doc["language"],
-                            "text": doc["text"],
-                            "created_at": doc["created_at"].isoformat()
-                        })
-                    
-                    if results:
-                        # Lưu vào Redis với key là topic và language
+                        documents[doc["_id"]] = doc
+
+                entries = []
+                for group in groups:
+                    doc = documents.get(group["result_id"])
+                    if doc is None:
+                        # Kết quả vừa bị gộp hoặc xóa giữa hai truy vấn
+                        continue
+                    try:
+                        entries.append(TopicCacheEntry.create(
+                            result_id=str(doc["_id"]),
+                            topic=group["_id"]["topic"],
+                            source=doc["source"],
+                            language=doc["language"],
+                            text=self.codec.decode_document(doc),
+                            # Giữ thời điểm xác nhận của MongoDB để nội dung cũ vẫn được kiểm tra lại
+                            validated_at=doc.get("validated_at") or doc.get("created_at"),
+                            validators=doc.get("validators"),
+                            warmed=bool(doc.get("warmed"))
+                        ))
+                    except Exception as e:
+                        logger.error(f"Error processing result {doc['_id']} for topic {group['_id']['topic']}: {str(e)}")
+
+                await self.set_topic_data_many(entries, ttl=self.refresh_ttl)
+                metrics.set_gauge("redis.refresh.topics", len(popular_topics))
+                metrics.set_gauge("redis.refresh.entries", len(entries))
+                missing = set(popular_topics) - {entry.topic for entry in entries}
+                if missing:
+                    logger.warning(f"No results found for topics: {sorted(missing)}")
+                logger.info(f"Refreshed {len(entries)} entries for {len(popular_topics)} popular topics")
+
+            except Exception as e:
+                metrics.incr("redis.refresh.errors")
+                logger.error(f"Error updating topic data: {str(e)}")
+
+    async def get_topic_data(self, topic: str, language: str, source: str = "wikipedia") -> Optional[TopicCacheEntry]:
+        """Lấy dữ liệu đã crawl cho một chủ đề cụ thể
         
-                        await self.redis_client.set(
-                            f"topic: {topic}, language: {results[0]['language']}", 
-                            json.dumps(results[0])
-                        )
-                        logger.info(f"Updated data for topic: {topic} in language: {results[0]['language']}")
-                    else:
-                        logger.warning(f"No results found for topic: {topic}")
-                        
-                except Exception as e:
-                    logger.error(f"Error processing topic {topic}: {str(e)}")
-                    continue
-                    
+        Returns:
+            TopicCacheEntry: Entry trong cache, None nếu không có hoặc không hợp lệ
+        """
+        try:
+            await self._ensure_connection()
+            data = await self.redis_client.get(topic_cache_key(topic, language, source))
+            if not data:
+                return None
+            entry = TopicCacheEntry.decode(data, self.codec)
+            if entry is None:
+                metrics.incr("cache.redis.invalid_entry")
+                logger.warning(f"Invalid cache entry for topic: {topic} in language: {language}")
+            return entry
         except Exception as e:
-            logger.error(f"Error updating topic data: {str(e)}")
+            logger.error(f"Error getting topic data: {str(e)}")
+            self._handle_error(e)
+            return None
 
-    async def get_topic_data(self, topic: str, language: str):
-        """Lấy dữ liệu đã crawl cho một chủ đề cụ thể"""
+    async def set_topic_data(self, entry: TopicCacheEntry, ttl: Optional[int] = None):
+        """Lưu nội dung chủ đề vào Redis
+        
+        Args:
+            entry: Entry cần lưu
+            ttl: Thời gian sống (giây), None nếu không hết hạn
+        """
         try:
             await self._ensure_connection()
-            data = await self.redis_client.get(f"topic: {topic}, language: {language}")
-            if data:
-                return json.loads(data)
-            return []
+            await self.redis_client.set(topic_cache_key(entry.topic, entry.language, entry.source), entry.encode(self.codec), ex=ttl)
         except Exception as e:
-            logger.error(f"Error getting topic data: {str(e)}")
-            return [] 
\ No newline at end of file
+            logger.error(f"Error setting topic data: {str(e)}")
+            self._handle_error(e)
+
+    async def set_topic_data_many(self, entries: List[TopicCacheEntry], ttl: Optional[int] = None):
+        """Lưu nhiều entry vào Redis trong một pipeline (một round-trip)
+        
+        Args:
+            entries: Các entry cần lưu
+            ttl: Thời gian sống (giây), None nếu không hết hạn
+        """
+        if not entries:
+            return
+        await self._ensure_connection()
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for entry in entries:
+                    pipe.set(topic_cache_key(entry.topic, entry.language, entry.source), entry.encode(self.codec), ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._handle_error(e)
+            raise
+
+    async def get_json(self, key: str):
+        """Đọc giá trị JSON theo key, None nếu không có hoặc lỗi"""
+        try:
+            await self._ensure_connection()
+            data = await self.redis_client.get(key)
+            return json.loads(data) if data else None
+        except Exception as e:
+            logger.error(f"Error getting key {key}: {str(e)}")
+            self._handle_error(e)
+            return None
+
+    async def set_json(self, key: str, value, ttl: Optional[int] = None):
+        """Ghi giá trị JSON theo key
+        
+        Args:
+            key: Key Redis
+            value: Giá trị có thể chuyển sang JSON
+            ttl: Thời gian sống (giây), None nếu không hết hạn
+        """
+        try:
+            await self._ensure_connection()
+            await self.redis_client.set(key, json.dumps(value, ensure_ascii=False), ex=ttl)
+        except Exception as e:
+            logger.error(f"Error setting key {key}: {str(e)}")
+            self._handle_error(e)
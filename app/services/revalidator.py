@@ -0,0 +1,117 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, UTC
+from typing import Dict, Optional
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class Revalidator:
+    """Kiểm tra lại nội dung đã cache với upstream ở nền (stale-while-revalidate)
+
+    Người dùng nhận ngay nội dung trong cache; khi nội dung đã quá soft TTL của nguồn,
+    một lần kiểm tra lại được xếp hàng. Nguồn dùng request có điều kiện (revision id,
+    ETag, ...) nên trang không đổi chỉ tốn một request nhỏ và chỉ cập nhật validated_at.
+    """
+
+    def __init__(self, crawler, concurrency: int = None, max_pending: int = None, lock_ttl: int = None):
+        """Khởi tạo revalidator
+
+        Args:
+            crawler: Crawler dùng để lấy nguồn, lưu kết quả và ghi cache
+            concurrency: Số lần kiểm tra lại chạy đồng thời tối đa
+            max_pending: Số lần kiểm tra lại đang chờ tối đa, vượt quá thì bỏ qua
+            lock_ttl: Thời gian (giây) một (nguồn, chủ đề, ngôn ngữ) không được kiểm tra lại
+                lần nữa, dùng chung giữa các worker qua Redis
+        """
+        self.crawler = crawler
+        self.concurrency = concurrency or int(os.getenv("REVALIDATE_CONCURRENCY", 4))
+        self.max_pending = max_pending or int(os.getenv("REVALIDATE_MAX_PENDING", 100))
+        self.lock_ttl = lock_ttl or int(os.getenv("REVALIDATE_LOCK_TTL", 300))
+        self._semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(source: str, topic: str, language: str) -> str:
+        return f"{source}:{language}:{topic}"
+
+    def schedule(self, source: str, topic: str, language: str, content: str, result_id: str,
+                 validators: Optional[dict] = None) -> bool:
+        """Xếp hàng kiểm tra lại một nội dung đã cũ
+
+        Returns:
+            bool: True nếu đã xếp hàng, False nếu đang được kiểm tra hoặc hàng đợi đã đầy
+        """
+        key = self._key(source, topic, language)
+        if key in self._tasks:
+            return False
+        if len(self._tasks) >= self.max_pending:
+            metrics.incr("freshness.revalidate.dropped")
+            return False
+        task = asyncio.create_task(self._run(key, source, topic, language, content, result_id, validators))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        metrics.incr("freshness.revalidate.scheduled")
+        return True
+
+    async def revalidate(self, source: str, topic: str, language: str, content: str, result_id: str,
+                         validators: Optional[dict] = None):
+        """Kiểm tra lại ngay một nội dung đã cũ và chờ tới khi xong (không qua hàng đợi)"""
+        await self._run(self._key(source, topic, language), source, topic, language, content, result_id, validators)
+
+    async def _acquire(self, key: str) -> bool:
+        """Giữ quyền kiểm tra lại trong lock_ttl giây (không có Redis thì chỉ gộp trong process)"""
+        redis_service = self.crawler.redis_service
+        if redis_service is None or not redis_service.healthy:
+            return True
+        try:
+            return bool(await redis_service.redis_client.set(f"revalidate:{key}", "1", nx=True, ex=self.lock_ttl))
+        except Exception as e:
+            logger.error(f"Error acquiring revalidation lock for {key}: {str(e)}")
+            return False
+
+    async def _run(self, key: str, source: str, topic: str, language: str, content: str, result_id: str,
+                   validators: Optional[dict]):
+        try:
+            if not await self._acquire(key):
+                # Worker khác vừa (hoặc đang) kiểm tra lại
+                metrics.incr("freshness.revalidate.skipped")
+                return
+            plugin = self.crawler.sources.get(source)
+            if plugin is None:
+                return
+            async with self._semaphore:
+                with metrics.timer("freshness.revalidate.latency"):
+                    result = await asyncio.wait_for(plugin.recheck(topic, language, validators), timeout=plugin.timeout)
+
+            if result is None:
+                # Không đổi: chỉ cập nhật thời điểm xác nhận trong MongoDB và Redis
+                metrics.incr("freshness.revalidate.not_modified")
+                await self.crawler.mongodb_service.touch_result(result_id, validators)
+                await self.crawler._populate_cache(topic, language, source, content, result_id,
+                                                   validated_at=datetime.now(UTC), validators=validators)
+                logger.info(f"Content of {topic} ({source}, {language}) is unchanged")
+                return
+
+            new_content, extra = result
+            if not new_content:
+                # Upstream lỗi hoặc không còn nội dung: giữ nội dung cũ, lần sau sẽ thử lại
+                metrics.incr("freshness.revalidate.failed")
+                return
+            new_id = await self.crawler._store_result(None, topic, source, language, new_content, extra=extra)
+            metrics.incr("freshness.revalidate.modified")
+            logger.info(f"Refreshed content of {topic} ({source}, {language}): {result_id} -> {new_id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.incr("freshness.revalidate.failed")
+            logger.error(f"Error revalidating {topic} ({source}, {language}): {str(e)}")
+
+    async def close(self):
+        """Hủy các lần kiểm tra lại đang chạy"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
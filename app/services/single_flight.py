@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Trả lease nếu còn đúng chủ và lưu kết quả trong thời gian ngắn cho các worker đang chờ
+# KEYS: lease, done; ARGV: token, payload, done_ttl_ms
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[3])
+return 1
+"""
+
+# Token dùng khi không có Redis: chạy như leader, chỉ gộp các lời gọi trong process
+_LOCAL_TOKEN = "local"
+
+class SingleFlight:
+    """Gộp các lời gọi giống nhau giữa các process bằng lease trong Redis
+
+    Chỉ một worker (leader) giữ lease và thực hiện công việc; các worker khác kiểm tra định kỳ
+    (giãn dần) key kết quả mà leader lưu. Trong cùng process, các lời gọi trùng key dùng chung
+    một future nên mỗi process chỉ có một lời gọi chờ cho mỗi key.
+    """
+
+    def __init__(self, redis_service, name: str, lease_ttl: float = None, done_ttl: float = None,
+                 poll_interval: float = None, max_poll_interval: float = None):
+        """Khởi tạo single-flight
+
+        Args:
+            redis_service: Redis service (None để chỉ gộp trong process)
+            name: Tên nhóm key (dùng trong key Redis và metrics)
+            lease_ttl: Thời gian giữ lease tối đa mặc định (giây), cũng là thời gian chờ tối đa của follower
+            done_ttl: Thời gian giữ kết quả sau khi leader xong (giây)
+            poll_interval: Khoảng chờ đầu tiên giữa hai lần follower kiểm tra kết quả (giây)
+            max_poll_interval: Khoảng chờ tối đa giữa hai lần kiểm tra (giây)
+        """
+        self.redis_service = redis_service
+        self.name = name
+        self.lease_ttl = lease_ttl or float(os.getenv("SINGLE_FLIGHT_LEASE_TTL", 30))
+        self.done_ttl = done_ttl or float(os.getenv("SINGLE_FLIGHT_DONE_TTL", 10))
+        self.poll_interval = poll_interval or float(os.getenv("SINGLE_FLIGHT_POLL_INTERVAL", 0.05))
+        self.max_poll_interval = max_poll_interval or float(os.getenv("SINGLE_FLIGHT_MAX_POLL_INTERVAL", 1))
+        self._release_script = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _keys(self, key: str) -> Tuple[str, str]:
+        prefix = f"singleflight:{self.name}:{key}"
+        return f"{prefix}:lease", f"{prefix}:done"
+
+    def _redis(self):
+        if self.redis_service is None or not self.redis_service.healthy:
+            return None
+        return self.redis_service.redis_client
+
+    async def run(self, key: str,
+                  leader: Callable[[], Awaitable[Tuple[Any, Optional[str]]]],
+                  follower: Callable[[str], Awaitable[Any]], lease_ttl: Optional[float] = None) -> Any:
+        """Thực hiện công việc một lần cho mỗi key
+
+        Args:
+            key: Key của công việc
+            leader: Coroutine thực hiện công việc, trả về (kết quả, payload gửi cho follower)
+            follower: Coroutine dựng lại kết quả từ payload; trả về None để tự thực hiện công việc
+            lease_ttl: Thời gian giữ lease (giây), phải dài hơn thời gian tối đa của leader để follower
+                không tự thực hiện trong lúc leader vẫn đang chạy (mặc định SINGLE_FLIGHT_LEASE_TTL)
+
+        Returns:
+            Kết quả của leader hoặc của follower
+        """
+        if key in self._in_flight:
+            metrics.incr(f"singleflight.{self.name}.local")
+            result = await asyncio.shield(self._in_flight[key])
+            if result is not None:
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await self._run_distributed(key, leader, follower, lease_ttl or self.lease_ttl)
+            future.set_result(result)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+        return result
+
+    async def _run_distributed(self, key: str, leader, follower, lease_ttl: float) -> Any:
+        token, payload = await self._acquire(key, lease_ttl)
+        if token is None:
+            # Worker khác đang làm (hoặc vừa làm xong): chờ và dùng lại kết quả
+            if payload is None:
+                metrics.incr(f"singleflight.{self.name}.wait")
+                payload = await self._wait(key, lease_ttl)
+            if payload and payload.get("ok"):
+                result = await follower(payload.get("value"))
+                if result is not None:
+                    metrics.incr(f"singleflight.{self.name}.follower")
+                    return result
+            # Leader lỗi, hết thời gian chờ hoặc không đọc được kết quả: tự thực hiện
+            metrics.incr(f"singleflight.{self.name}.fallback")
+            token = _LOCAL_TOKEN
+
+        metrics.incr(f"singleflight.{self.name}.leader")
+        released = False
+        try:
+            result, value = await leader()
+            await self._release(key, token, {"ok": True, "value": value})
+            released = True
+            return result
+        finally:
+            if not released:
+                await self._release(key, token, {"ok": False})
+
+    async def _acquire(self, key: str, lease_ttl: float) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Thử lấy lease
+
+        Returns:
+            tuple: (token, None) nếu lấy được lease; (None, payload) nếu kết quả vừa có sẵn;
+                (None, None) nếu worker khác đang giữ lease
+        """
+        client = self._redis()
+        if client is None:
+            return _LOCAL_TOKEN, None
+        lease_key, done_key = self._keys(key)
+        try:
+            done = await client.get(done_key)
+            if done:
+                return None, json.loads(done)
+            token = uuid.uuid4().hex
+            if await client.set(lease_key, token, nx=True, px=int(lease_ttl * 1000)):
+                return token, None
+            return None, None
+        except Exception as e:
+            logger.warning(f"Single-flight {self.name} falling back to local mode: {str(e)}")
+            return _LOCAL_TOKEN, None
+
+    async def _release(self, key: str, token: str, payload: Dict[str, Any]):
+        """Trả lease và lưu kết quả cho các worker đang chờ"""
+        client = self._redis()
+        if client is None or token == _LOCAL_TOKEN:
+            return
+        lease_key, done_key = self._keys(key)
+        try:
+            if self._release_script is None:
+                self._release_script = client.register_script(_RELEASE_SCRIPT)
+            # Chỉ lưu kết quả thành công để worker đến sau dùng lại; lỗi thì chỉ báo
+            done_ttl = int(self.done_ttl * 1000) if payload.get("ok") else 1
+            await self._release_script(
+                keys=[lease_key, done_key],
+                args=[token, json.dumps(payload), done_ttl]
+            )
+        except Exception as e:
+            logger.warning(f"Error releasing single-flight lease {key}: {str(e)}")
+
+    async def _wait(self, key: str, lease_ttl: float) -> Optional[Dict[str, Any]]:
+        """Chờ leader lưu kết quả, hoặc đến khi lease hết hạn
+
+        Kiểm tra key kết quả và lease bằng một lệnh MGET với khoảng chờ tăng dần, mỗi lần
+        chỉ mượn kết nối trong pool trong thời gian của một lệnh (không giữ kết nối pub/sub).
+
+        Returns:
+            dict: Payload của leader, None nếu hết thời gian chờ hoặc leader biến mất
+        """
+        client = self._redis()
+        if client is None:
+            return None
+        lease_key, done_key = self._keys(key)
+        deadline = time.monotonic() + lease_ttl
+        delay = self.poll_interval
+        try:
+            while True:
+                data, lease = await client.mget(done_key, lease_key)
+                if data is not None:
+                    return json.loads(data)
+                if lease is None:
+                    # Leader đã xong mà kết quả đã hết hạn, hoặc đã chết mà không báo
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, self.max_poll_interval)
+        except Exception as e:
+            logger.warning(f"Error waiting for single-flight {key}: {str(e)}")
+            return None
@@ -0,0 +1,236 @@
+import os
+import asyncio
+import logging
+import importlib
+from abc import ABC, abstractmethod
+from datetime import datetime, UTC
+from importlib.metadata import entry_points
+from typing import Any, Callable, Dict, List, Optional, Union
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Nhóm entry point để package bên ngoài đăng ký nguồn mới, ví dụ trong pyproject.toml:
+# [project.entry-points."tkpm.crawl_sources"]
+# arxiv = "my_package.arxiv:ArxivSource"
+ENTRY_POINT_GROUP = "tkpm.crawl_sources"
+
+# Các nguồn có sẵn, chỉ được import khi được dùng lần đầu
+BUILTIN_SOURCES = {
+    "wikipedia": f"{__package__}.sources.wikipedia:WikipediaSource",
+    "nature": f"{__package__}.sources.nature:NatureSource",
+    "pubmed": f"{__package__}.sources.pubmed:PubMedSource"
+}
+
+class CrawlSource(ABC):
+    """Plugin của một nguồn dữ liệu
+
+    Lớp con khai báo tên, các giới hạn mặc định và bắt buộc cài đặt fetch() (thiếu thì không
+    khởi tạo được và registry bỏ qua nguồn). Việc tra cache, lưu kết quả
+    và gắn kết quả vào task do Crawler đảm nhận.
+    """
+    name: str = ""
+    # Số lần crawl đồng thời tối đa tới nguồn (dùng chung giữa các task của process),
+    # None để dùng CRAWL_SOURCE_CONCURRENCY
+    default_concurrency: Optional[int] = None
+    # Thời hạn cho một lần crawl (gồm cả thời gian chờ lượt và tra cache), quá hạn thì bỏ qua nguồn
+    default_timeout: float = 30.0
+    # Thời gian sống của nội dung trong Redis (giây), None để dùng TOPIC_CACHE_TTL
+    default_cache_ttl: Optional[int] = None
+    # Nội dung cũ hơn soft TTL vẫn được trả ngay nhưng được kiểm tra lại với upstream ở nền,
+    # None để dùng TOPIC_CACHE_TTL; có thể khai báo riêng theo ngôn ngữ
+    default_soft_ttl: Optional[int] = None
+    soft_ttl_by_language: Dict[str, int] = {}
+    # Các trường bổ sung được lưu cùng kết quả (ngoài text), ví dụ ("records",)
+    result_fields: tuple = ()
+
+    def __init__(self):
+        env_name = self.name.upper()
+        self.concurrency = int(os.getenv(
+            f"CRAWL_CONCURRENCY_{env_name}", self.default_concurrency or os.getenv("CRAWL_SOURCE_CONCURRENCY", 4)
+        ))
+        self.timeout = float(os.getenv(f"CRAWL_TIMEOUT_{env_name}", self.default_timeout))
+        self.cache_ttl = int(os.getenv(
+            f"CACHE_TTL_{env_name}", self.default_cache_ttl or os.getenv("TOPIC_CACHE_TTL", 3600)
+        ))
+        self.semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        self._soft_ttls: Dict[str, int] = {}
+
+    def soft_ttl(self, language: str) -> int:
+        """Soft TTL (giây) của nội dung theo ngôn ngữ
+
+        Thứ tự ưu tiên: FRESHNESS_SOFT_TTL_<NAME>_<LANG> > soft_ttl_by_language >
+        FRESHNESS_SOFT_TTL_<NAME> > default_soft_ttl > TOPIC_CACHE_TTL.
+        """
+        if language not in self._soft_ttls:
+            env_name = self.name.upper()
+            default = self.soft_ttl_by_language.get(language) or os.getenv(f"FRESHNESS_SOFT_TTL_{env_name}") \
+                or self.default_soft_ttl or os.getenv("TOPIC_CACHE_TTL", 3600)
+            self._soft_ttls[language] = int(os.getenv(f"FRESHNESS_SOFT_TTL_{env_name}_{language.upper()}", default))
+        return self._soft_ttls[language]
+
+    def is_stale(self, validated_at: Optional[datetime], language: str) -> bool:
+        """Nội dung đã quá soft TTL kể từ lần xác nhận cuối (không rõ thời điểm thì coi là cũ)"""
+        if validated_at is None:
+            return True
+        if validated_at.tzinfo is None:
+            # MongoDB trả datetime không kèm timezone (UTC)
+            validated_at = validated_at.replace(tzinfo=UTC)
+        return (datetime.now(UTC) - validated_at).total_seconds() > self.soft_ttl(language)
+
+    @abstractmethod
+    async def fetch(self, topic: str, language: str) -> tuple:
+        """Lấy nội dung mới từ upstream
+
+        Returns:
+            tuple: (content, extra) nếu thành công, ("", None) nếu không có nội dung
+        """
+
+    async def revalidate(self, topic: str, language: str, validators: Dict[str, Any]) -> Optional[tuple]:
+        """Kiểm tra lại nội dung đã cache với upstream
+
+        Lớp con dùng validators (revision id, ETag, ...) để gửi request có điều kiện; mặc định
+        lấy lại toàn bộ nội dung.
+
+        Returns:
+            tuple: (content, extra) khi nội dung đã thay đổi, None khi không đổi
+        """
+        return await self.fetch(topic, language)
+
+    def _shape(self, result: tuple) -> tuple:
+        """Chỉ giữ các trường bổ sung mà nguồn đã khai báo (cùng validators)"""
+        content, extra = result
+        if extra:
+            extra = {field: extra[field] for field in (*self.result_fields, "validators") if field in extra} or None
+        return content, extra
+
+    async def crawl(self, topic: str, language: str) -> tuple:
+        """Gọi fetch() và chuẩn hóa kết quả"""
+        return self._shape(await self.fetch(topic, language))
+
+    async def recheck(self, topic: str, language: str, validators: Dict[str, Any]) -> Optional[tuple]:
+        """Gọi revalidate() và chuẩn hóa kết quả"""
+        result = await self.revalidate(topic, language, validators or {})
+        return None if result is None else self._shape(result)
+
+    async def close(self):
+        """Giải phóng tài nguyên của nguồn (HTTP session, ...)"""
+        pass
+
+    def describe(self) -> Dict[str, Any]:
+        """Cấu hình hiện tại của nguồn"""
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "timeout": self.timeout,
+            "cache_ttl": self.cache_ttl,
+            "result_fields": list(self.result_fields)
+        }
+
+SourceTarget = Union[str, Callable[[], CrawlSource]]
+
+def _load_target(target: Any) -> Callable[[], CrawlSource]:
+    """Import lớp/factory của nguồn từ chuỗi "module:attr" hoặc entry point"""
+    if hasattr(target, "load"):
+        return target.load()
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(":")
+        return getattr(importlib.import_module(module_name), attr)
+    return target
+
+class SourceRegistry:
+    """Danh sách các nguồn dữ liệu, nguồn chỉ được import và khởi tạo khi được dùng lần đầu
+
+    Thứ tự ưu tiên khi trùng tên: CRAWL_SOURCE_PLUGINS > entry point > nguồn có sẵn.
+    """
+
+    def __init__(self, targets: Optional[Dict[str, SourceTarget]] = None):
+        """Khởi tạo registry
+
+        Args:
+            targets: Nguồn thay thế cho danh sách mặc định (tên -> "module:attr" hoặc factory)
+        """
+        if targets is None:
+            targets = dict(BUILTIN_SOURCES)
+            targets.update(self._entry_point_targets())
+            targets.update(self._env_targets())
+        self._targets: Dict[str, Any] = dict(targets)
+        self._sources: Dict[str, CrawlSource] = {}
+        self._failed = set()
+
+    @staticmethod
+    def _entry_point_targets() -> Dict[str, Any]:
+        """Các nguồn do package khác đăng ký qua entry point (chưa import)"""
+        try:
+            return {entry.name: entry for entry in entry_points(group=ENTRY_POINT_GROUP)}
+        except Exception as e:
+            logger.error(f"Error reading source entry points: {str(e)}")
+            return {}
+
+    @staticmethod
+    def _env_targets() -> Dict[str, str]:
+        """Các nguồn khai báo trong CRAWL_SOURCE_PLUGINS, dạng "tên=module:attr,..." """
+        targets = {}
+        for item in os.getenv("CRAWL_SOURCE_PLUGINS", "").split(","):
+            name, _, target = item.strip().partition("=")
+            if name and target:
+                targets[name.strip()] = target.strip()
+        return targets
+
+    def register(self, name: str, target: SourceTarget):
+        """Đăng ký (hoặc thay thế) một nguồn"""
+        self._targets[name] = target
+        self._sources.pop(name, None)
+        self._failed.discard(name)
+
+    def names(self) -> List[str]:
+        """Tên các nguồn đã đăng ký"""
+        return list(self._targets)
+
+    def get(self, name: str) -> Optional[CrawlSource]:
+        """Lấy nguồn theo tên, import và khởi tạo ở lần dùng đầu tiên
+
+        Returns:
+            CrawlSource: Nguồn, None nếu chưa đăng ký hoặc không tải được
+        """
+        source = self._sources.get(name)
+        if source is not None:
+            return source
+        if name not in self._targets or name in self._failed:
+            return None
+        try:
+            source = _load_target(self._targets[name])()
+            if not isinstance(source, CrawlSource):
+                raise TypeError(f"{type(source).__name__} is not a CrawlSource")
+            self._sources[name] = source
+            logger.info(f"Loaded crawl source {name}: {source.describe()}")
+            return source
+        except Exception as e:
+            # Không thử lại ở mỗi request, nguồn lỗi bị bỏ qua cho tới khi đăng ký lại
+            self._failed.add(name)
+            logger.error(f"Error loading crawl source {name}: {str(e)}")
+            return None
+
+    def loaded(self) -> List[CrawlSource]:
+        """Các nguồn đã được khởi tạo"""
+        return list(self._sources.values())
+
+    async def close(self):
+        """Đóng các nguồn đã được khởi tạo"""
+        for source in self.loaded():
+            try:
+                await source.close()
+            except Exception as e:
+                logger.error(f"Error closing crawl source {source.name}: {str(e)}")
+
+
+_registry: Optional[SourceRegistry] = None
+
+def get_source_registry() -> SourceRegistry:
+    """Trả về registry dùng chung cho toàn process"""
+    global _registry
+    if _registry is None:
+        _registry = SourceRegistry()
+    return _registry
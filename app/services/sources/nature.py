@@ -0,0 +1,91 @@
+import os
+import asyncio
+import logging
+import aiohttp
+from typing import Optional
+from ..source_registry import CrawlSource
+from ..metrics import metrics
+from ..rate_limiter import get_upstream_guard, CircuitOpenError
+from ...models.article import records_to_text, fingerprint
+from ..nature_client import NatureClient, get_nature_client
+
+logger = logging.getLogger(__name__)
+
+class NatureSource(CrawlSource):
+    """Các bài báo có tiêu đề chứa chủ đề từ Springer Nature Meta API"""
+    name = "nature"
+    default_concurrency = 4
+    default_timeout = 30.0
+    # Bài báo khoa học ít thay đổi: kiểm tra lại sau 1 ngày, Redis giữ nội dung 30 ngày
+    default_soft_ttl = 86400
+    default_cache_ttl = 30 * 86400
+    result_fields = ("records",)
+
+    def __init__(self, client: Optional[NatureClient] = None):
+        super().__init__()
+        self.client = client or get_nature_client()
+        # Số bài báo tối đa lấy cho mỗi chủ đề
+        self.max_results = int(os.getenv("NATURE_MAX_RESULTS", 3))
+
+    @staticmethod
+    def page_validators(page: tuple) -> dict:
+        """Validators của trang đầu: ETag/Last-Modified (nếu API trả về) và dấu vân tay các DOI"""
+        raw_records, _, headers = page
+        keys = [str(raw.get("doi") or raw.get("title") or "") for raw in raw_records]
+        return {**headers, "first_page": fingerprint(keys)}
+
+    async def fetch(self, topic: str, language: str, first_page: Optional[tuple] = None) -> tuple:
+        """Crawl các bài báo có tiêu đề chứa chủ đề từ Springer Nature
+        
+        Args:
+            topic: Chủ đề cần crawl
+            language: Ngôn ngữ
+            first_page: Trang đầu đã lấy khi kiểm tra lại (không cần tải lại)
+            
+        Returns:
+            tuple: (content, {"records": [...], "validators": {...}}) nếu crawl thành công, ("", None) nếu thất bại
+        """
+        try:
+            pages = [first_page] if first_page is not None else []
+            # Các trang kết quả được tải song song, mỗi request đi qua limiter của Nature
+            with metrics.timer("upstream.nature.latency"):
+                records = await self.client.search(topic, self.max_results, call=get_upstream_guard("nature").call,
+                                                   first_page=first_page, on_first_page=pages.append)
+            metrics.incr("upstream.nature.fetch")
+            
+            if not records:
+                logger.warning(f"No Nature articles found for topic: {topic}")
+                return "", None
+            extra = {"records": [record.metadata() for record in records]}
+            if pages:
+                extra["validators"] = self.page_validators(pages[0])
+            return records_to_text(records), extra
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout crawling Nature for topic: {topic}")
+            return "", None
+        except CircuitOpenError as e:
+            logger.warning(f"Skipping Nature for topic {topic}: {str(e)}")
+            return "", None
+        except aiohttp.ClientResponseError as e:
+            if e.status == 401:
+                logger.error("Unauthorized: Please check NATURE_API_KEY")
+            else:
+                logger.error(f"Error crawling Nature: {str(e)}")
+            return "", None
+        except Exception as e:
+            logger.error(f"Error crawling Nature: {str(e)}")
+            return "", None
+
+    async def revalidate(self, topic: str, language: str, validators: dict) -> Optional[tuple]:
+        """Gửi request có điều kiện cho trang đầu; chỉ crawl lại khi trang đầu đã thay đổi
+        
+        Returns:
+            tuple: (content, extra) khi kết quả đã thay đổi, None khi không đổi
+        """
+        page = await get_upstream_guard("nature").call(self.client.fetch_page, topic, 1, validators)
+        if page is None or (validators.get("first_page") and self.page_validators(page)["first_page"] == validators["first_page"]):
+            return None
+        return await self.fetch(topic, language, first_page=page)
+
+    async def close(self):
+        await self.client.close()
@@ -0,0 +1,85 @@
+import os
+import asyncio
+import logging
+import aiohttp
+from typing import List, Optional
+from ..source_registry import CrawlSource
+from ..metrics import metrics
+from ..rate_limiter import get_upstream_guard, CircuitOpenError
+from ...models.article import records_to_text, fingerprint
+from ..pubmed_client import PubMedClient, get_pubmed_client
+
+logger = logging.getLogger(__name__)
+
+class PubMedSource(CrawlSource):
+    """Các bài báo có abstract từ PubMed (NCBI E-utilities)"""
+    name = "pubmed"
+    default_concurrency = 2
+    default_timeout = 45.0
+    # Bài báo khoa học ít thay đổi: kiểm tra lại sau 1 ngày, Redis giữ nội dung 30 ngày
+    default_soft_ttl = 86400
+    default_cache_ttl = 30 * 86400
+    result_fields = ("records",)
+
+    def __init__(self, client: Optional[PubMedClient] = None):
+        super().__init__()
+        self.client = client or get_pubmed_client()
+        # Số bài báo tối đa lấy cho mỗi chủ đề
+        self.max_results = int(os.getenv("PUBMED_MAX_RESULTS", 3))
+
+    async def fetch(self, topic: str, language: str, ids: Optional[List[str]] = None) -> tuple:
+        """Crawl các bài báo có abstract từ PubMed
+        
+        Args:
+            topic: Chủ đề cần crawl
+            language: Ngôn ngữ
+            ids: PMID đã tìm được (bỏ qua bước esearch)
+            
+        Returns:
+            tuple: (content, {"records": [...], "validators": {...}}) nếu crawl thành công, ("", None) nếu thất bại
+        """
+        try:
+            # esearch và các lô efetch đều đi qua limiter dùng chung của PubMed (3 request/giây theo NCBI)
+            call = get_upstream_guard("pubmed").call
+            with metrics.timer("upstream.pubmed.latency"):
+                if ids is None:
+                    ids = await self.client.search_ids(topic, language, self.max_results, call)
+                records = await self.client.fetch_records(ids, self.max_results, call)
+            metrics.incr("upstream.pubmed.fetch")
+            
+            if not records:
+                logger.warning(f"No PubMed articles found for topic: {topic}")
+                return "", None
+            return records_to_text(records), {
+                "records": [record.metadata() for record in records],
+                "validators": {"ids": fingerprint(ids)}
+            }
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout crawling PubMed for topic: {topic}")
+            return "", None
+        except CircuitOpenError as e:
+            logger.warning(f"Skipping PubMed for topic {topic}: {str(e)}")
+            return "", None
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                logger.error("Rate limited by NCBI: Please check RATE_LIMIT_PUBMED or PUBMED_API_KEY")
+            else:
+                logger.error(f"Error crawling PubMed: {str(e)}")
+            return "", None
+        except Exception as e:
+            logger.error(f"Error crawling PubMed: {str(e)}")
+            return "", None
+
+    async def revalidate(self, topic: str, language: str, validators: dict) -> Optional[tuple]:
+        """Chỉ gọi efetch khi danh sách PMID của esearch đã thay đổi
+        
+        Returns:
+            tuple: (content, extra) khi kết quả đã thay đổi, None khi không đổi
+        """
+        ids = await self.client.search_ids(topic, language, self.max_results, get_upstream_guard("pubmed").call)
+        if validators.get("ids") == fingerprint(ids):
+            return None
+        return await self.fetch(topic, language, ids)
+
+    async def close(self):
+        await self.client.close()
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Optional
+from ..source_registry import CrawlSource
+from ..metrics import metrics
+from ..rate_limiter import get_upstream_guard, CircuitOpenError
+from ..wikipedia_client import WikipediaClient, get_wikipedia_client
+
+logger = logging.getLogger(__name__)
+
+class WikipediaSource(CrawlSource):
+    """Nội dung bài viết Wikipedia qua MediaWiki API"""
+    name = "wikipedia"
+    default_timeout = 20.0
+    # Redis giữ nội dung lâu, nội dung quá soft TTL (TOPIC_CACHE_TTL) được kiểm tra lại bằng revision id
+    default_cache_ttl = 7 * 86400
+
+    def __init__(self, client: Optional[WikipediaClient] = None):
+        super().__init__()
+        # Client dùng chung HTTP session có pool, không chặn event loop và có thể hủy được
+        self.client = client or get_wikipedia_client()
+
+    async def fetch(self, topic: str, language: str) -> tuple:
+        """Crawl dữ liệu từ Wikipedia
+        
+        Args:
+            topic: Chủ đề cần crawl
+            language: Ngôn ngữ
+            
+        Returns:
+            tuple: (content, {"validators": {"revision_id": ...}}) nếu crawl thành công, ("", None) nếu thất bại
+        """
+        try:
+            # Lấy nội dung trang qua MediaWiki API (bất đồng bộ, có timeout)
+            with metrics.timer("cache.upstream.latency"):
+                page = await get_upstream_guard("wikipedia").call(self.client.fetch_page, topic, language)
+            metrics.incr("cache.upstream.fetch")
+            
+            if page:
+                return page["extract"], {"validators": {"revision_id": page["revision_id"]}}
+            else:
+                logger.warning(f"Wikipedia page not found for topic: {topic}")
+                return "", None
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout crawling Wikipedia for topic: {topic}")
+            return "", None
+        except CircuitOpenError as e:
+            # Upstream đang lỗi: không gửi request, chỉ dùng nội dung trong cache
+            logger.warning(f"Skipping Wikipedia for topic {topic}: {str(e)}")
+            return "", None
+        except Exception as e:
+            logger.error(f"Error crawling Wikipedia: {str(e)}")
+            return "", None
+
+    async def revalidate(self, topic: str, language: str, validators: dict) -> Optional[tuple]:
+        """Chỉ tải lại nội dung khi revision id của trang đã thay đổi
+        
+        Returns:
+            tuple: (content, extra) khi trang đã thay đổi, None khi không đổi
+        """
+        revision_id = validators.get("revision_id")
+        if revision_id is not None:
+            # Truy vấn prop=info chỉ trả vài trăm byte thay vì toàn bộ nội dung trang
+            current = await get_upstream_guard("wikipedia").call(self.client.fetch_revision_id, topic, language)
+            if current == revision_id:
+                return None
+        return await self.fetch(topic, language)
+
+    async def close(self):
+        await self.client.close()
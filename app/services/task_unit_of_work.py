@@ -0,0 +1,110 @@
+import logging
+from datetime import datetime, UTC
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from bson import ObjectId
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class TaskUnitOfWork:
+    """Gom các thao tác ghi MongoDB của một task và ghi một lần ở cuối mỗi giai đoạn
+
+    Kết quả mới được gom lại thành một insert_many; result_ids, trạng thái và
+    timestamp của task được gộp vào một update duy nhất.
+    """
+
+    def __init__(self, mongodb_service, task_id: str):
+        """Khởi tạo unit of work
+
+        Args:
+            mongodb_service: MongoDB service
+            task_id: ID của task
+        """
+        self.mongodb_service = mongodb_service
+        self.task_id = task_id
+        self.op_count = 0
+        self._results: List[Dict[str, Any]] = []
+        self._result_ids: List[str] = []
+        self._fields: Dict[str, Any] = {}
+        self._after_flush: List[Callable[[], Awaitable[None]]] = []
+
+    def add_result(self, topic: str, source: str, language: str, text: str, extra: Optional[dict] = None) -> str:
+        """Thêm kết quả mới (chưa ghi) và gắn vào task
+
+        Args:
+            extra: Các trường bổ sung của kết quả
+
+        Returns:
+            str: ID của kết quả, có hiệu lực sau khi flush
+        """
+        document = self.mongodb_service.build_result_document(self.task_id, topic, source, language, text, extra)
+        self._results.append(document)
+        result_id = str(document["_id"])
+        self.link_result(result_id)
+        return result_id
+
+    def link_result(self, result_id: str):
+        """Gắn một kết quả đã có vào task"""
+        if result_id not in self._result_ids:
+            self._result_ids.append(result_id)
+
+    def set_status(self, status: str, error: Optional[str] = None):
+        """Cập nhật trạng thái task"""
+        self._fields["status"] = status
+        if error:
+            self._fields["error"] = error
+
+    def set_fields(self, **fields):
+        """Cập nhật các trường khác của task"""
+        self._fields.update(fields)
+
+    def after_flush(self, callback: Callable[[], Awaitable[None]]):
+        """Đăng ký coroutine chạy sau khi dữ liệu đã được ghi (ví dụ ghi cache)"""
+        self._after_flush.append(callback)
+
+    async def flush(self):
+        """Ghi toàn bộ thay đổi đang chờ: một insert_many cho kết quả và một update cho task"""
+        results, self._results = self._results, []
+        result_ids, self._result_ids = self._result_ids, []
+        fields, self._fields = self._fields, {}
+        callbacks, self._after_flush = self._after_flush, []
+
+        if results:
+            # Nội dung đã được lưu trước đó thì dùng lại kết quả cũ (ID đã cấp trở thành alias)
+            try:
+                stored = await self.mongodb_service.store_result_documents(results)
+                logger.info(f"Stored {len(results)} results for task {self.task_id}")
+            except Exception as e:
+                logger.error(f"Error inserting results for task {self.task_id}: {str(e)}")
+                stored = {}
+                callbacks = []
+            staged = {str(document["_id"]) for document in results}
+            result_ids = list(dict.fromkeys(
+                stored.get(result_id) if result_id in staged else result_id
+                for result_id in result_ids
+                if result_id not in staged or result_id in stored
+            ))
+            self.op_count += 1
+
+        if fields or result_ids:
+            update = {"$set": {**fields, "updated_at": datetime.now(UTC)}}
+            if result_ids:
+                update["$addToSet"] = {"result_ids": {"$each": result_ids}}
+            try:
+                await self.mongodb_service.tasks_collection.update_one({"_id": ObjectId(self.task_id)}, update)
+                logger.info(f"Updated task {self.task_id} ({len(result_ids)} results, fields: {list(fields)})")
+            except Exception as e:
+                logger.error(f"Error updating task {self.task_id}: {str(e)}")
+            self.op_count += 1
+
+        for callback in callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Error running post-flush callback for task {self.task_id}: {str(e)}")
+
+    def record_metrics(self):
+        """Ghi nhận số thao tác MongoDB của task"""
+        metrics.incr("mongodb.task_ops", self.op_count)
+        metrics.incr("mongodb.tasks")
+        logger.info(f"Task {self.task_id} used {self.op_count} MongoDB write operations")
@@ -0,0 +1,165 @@
+import aiohttp
+import asyncio
+import os
+import logging
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+class WikipediaClient:
+    """Client bất đồng bộ cho MediaWiki API, dùng chung một HTTP session có connection pool"""
+
+    def __init__(self, timeout: float = None, pool_size: int = None):
+        """Khởi tạo Wikipedia client
+
+        Args:
+            timeout: Thời gian chờ tối đa cho mỗi request (giây)
+            pool_size: Số kết nối tối đa trong pool
+        """
+        self.timeout = timeout or float(os.getenv("WIKIPEDIA_TIMEOUT", 10))
+        self.pool_size = pool_size or int(os.getenv("WIKIPEDIA_POOL_SIZE", 20))
+        # User agent format: <project-name>/<version> (<contact-url>; <email>)
+        self.user_agent = os.getenv("WIKIPEDIA_API_USER_AGENT", "TKPM-Data-Crawler/1.0")
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Tạo session khi cần (phải chạy bên trong event loop)"""
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        headers={"User-Agent": self.user_agent},
+                        timeout=aiohttp.ClientTimeout(total=self.timeout)
+                    )
+        return self._session
+
+    @staticmethod
+    def api_url(language: str) -> str:
+        """URL của MediaWiki API theo ngôn ngữ"""
+        return f"https://{language}.wikipedia.org/w/api.php"
+
+    async def _query(self, topic: str, language: str, prop: str, timeout: float = None, **extra) -> Optional[dict]:
+        """Gửi truy vấn action=query cho một trang
+
+        Returns:
+            dict: Thông tin trang, None nếu trang không tồn tại
+        """
+        session = await self._get_session()
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "prop": prop,
+            "redirects": "1",
+            "titles": topic,
+            **extra
+        }
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        async with session.get(self.api_url(language), params=params, timeout=request_timeout) as response:
+            response.raise_for_status()
+            data = await response.json()
+
+        pages = data.get("query", {}).get("pages", [])
+        if not pages:
+            return None
+        page = pages[0]
+        if page.get("missing") or page.get("invalid"):
+            return None
+        return page
+
+    async def fetch_page(self, topic: str, language: str, timeout: float = None) -> Optional[dict]:
+        """Lấy nội dung dạng text và revision id hiện tại của một trang Wikipedia
+
+        Args:
+            topic: Tiêu đề trang
+            language: Mã ngôn ngữ (vi, en, ...)
+            timeout: Ghi đè thời gian chờ mặc định (giây)
+
+        Returns:
+            dict: {"extract": ..., "revision_id": ...}, None nếu trang không tồn tại
+
+        Raises:
+            asyncio.TimeoutError: Khi request vượt quá thời gian chờ
+            aiohttp.ClientError: Khi request thất bại
+        """
+        page = await self._query(topic, language, "extracts|info", timeout,
+                                 explaintext="1", exsectionformat="plain")
+        if page is None or not page.get("extract"):
+            return None
+        return {"extract": page["extract"], "revision_id": page.get("lastrevid")}
+
+    async def fetch_revision_id(self, topic: str, language: str, timeout: float = None) -> Optional[int]:
+        """Lấy revision id hiện tại của trang (không tải nội dung, dùng để kiểm tra trang có thay đổi)
+
+        Returns:
+            int: Revision id, None nếu trang không tồn tại
+        """
+        page = await self._query(topic, language, "info", timeout)
+        return page.get("lastrevid") if page else None
+
+    async def fetch_extract(self, topic: str, language: str, timeout: float = None) -> Optional[str]:
+        """Lấy nội dung dạng text của một trang Wikipedia
+
+        Returns:
+            str: Nội dung trang, None nếu trang không tồn tại
+        """
+        page = await self.fetch_page(topic, language, timeout)
+        return page["extract"] if page else None
+
+    async def fetch_related(self, topic: str, language: str, limit: int = 10, timeout: float = None) -> List[str]:
+        """Tiêu đề các bài viết liên quan tới một trang (tìm kiếm morelike của CirrusSearch)
+
+        prop=links trả các liên kết theo thứ tự chữ cái nên vài liên kết đầu không phải là liên
+        quan nhất; morelike xếp hạng các bài viết theo nội dung và liên kết chung với trang.
+
+        Args:
+            topic: Tiêu đề trang
+            language: Mã ngôn ngữ (vi, en, ...)
+            limit: Số bài viết tối đa
+
+        Returns:
+            List[str]: Tiêu đề các bài viết, theo thứ tự liên quan giảm dần
+
+        Raises:
+            asyncio.TimeoutError: Khi request vượt quá thời gian chờ
+            aiohttp.ClientError: Khi request thất bại
+        """
+        session = await self._get_session()
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "list": "search",
+            "srsearch": f"morelike:{topic}",
+            "srnamespace": "0",
+            "srlimit": str(limit),
+            "srprop": ""
+        }
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        async with session.get(self.api_url(language), params=params, timeout=request_timeout) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return [item["title"] for item in data.get("query", {}).get("search", []) if item.get("title")]
+
+    async def close(self):
+        """Đóng HTTP session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed Wikipedia HTTP session")
+        self._session = None
+
+
+_client: Optional[WikipediaClient] = None
+
+def get_wikipedia_client() -> WikipediaClient:
+    """Trả về Wikipedia client dùng chung cho toàn process"""
+    global _client
+    if _client is None:
+        _client = WikipediaClient()
+    return _client
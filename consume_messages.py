@@ -1,110 +1,104 @@
 import asyncio
 import os
+import signal
+import argparse
+import multiprocessing
 from dotenv import load_dotenv
-from app.services.rabbitmq_service import RabbitMQService
-from app.services.crawler import Crawler
-from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime, UTC
-from app.models.task import TaskStatus
 import logging
-from bson import ObjectId
 
 # Cấu hình logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Khởi tạo MongoDB client
-client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
-db = client.data_management
-tasks_collection = db.tasks
-results_collection = db.results
-
-async def process_crawl_task(data: dict):
-    """Xử lý task crawl từ RabbitMQ"""
-    task_id = data["task_id"]
-    crawl_data = data["data"]
-    
-    crawler = Crawler()
-    try:
-        logger.info(f"Processing task {task_id}")
-        # Cập nhật trạng thái task
-        await tasks_collection.update_one(
-            {"_id": ObjectId(task_id)},
-            {"$set": {"status": TaskStatus.IN_PROGRESS, "updated_at": datetime.now(UTC)}}
-        )
-        
-        # Thực hiện crawl dữ liệu
-        for topic in crawl_data["topics"]:
-            logger.info(f"Crawling topic: {topic}")
-            results = await crawler.crawl(topic, crawl_data["sources"], crawl_data["language"])
-            
-            for source, text in results.items():
-                if text:
-                    logger.info(f"Found content from {source}")
-                    result = {
-                        "task_id": ObjectId(task_id),
-                        "topic": topic,
-                        "source": source,
-                        "language": crawl_data["language"],
-                        "text": text
-                    }
-                    result_insert = await results_collection.insert_one(result)
-                    
-                    # Cập nhật result_ids trong task
-                    await tasks_collection.update_one(
-                        {"_id": ObjectId(task_id)},
-                        {"$push": {"result_ids": str(result_insert.inserted_id)}}
-                    )
-        
-        # Cập nhật trạng thái hoàn thành
-        await tasks_collection.update_one(
-            {"_id": ObjectId(task_id)},
-            {"$set": {
-                "status": TaskStatus.COMPLETED,
-                "updated_at": datetime.now(UTC)
-            }}
-        )
-        logger.info(f"Task {task_id} completed successfully")
-    except Exception as e:
-        logger.error(f"Error processing task {task_id}: {str(e)}")
-        # Cập nhật trạng thái lỗi
-        await tasks_collection.update_one(
-            {"_id": ObjectId(task_id)},
-            {"$set": {
-                "status": TaskStatus.FAILED,
-                "error": str(e),
-                "updated_at": datetime.now(UTC)
-            }}
-        )
-    finally:
-        await crawler.close()
-
 async def consume_messages():
-    """Consume messages từ RabbitMQ"""
-    rabbitmq_service = RabbitMQService()
+    """Consume messages từ RabbitMQ và xử lý bằng CrawlService (không chạy HTTP server)"""
+    # Import trong process con để mỗi process có container và connection pool riêng
+    from app.services.container import get_container
+
+    container = get_container()
+    loop = asyncio.get_running_loop()
+    consumer = None
+    stopping = asyncio.Event()
+
+    def request_stop():
+        logger.info("Received shutdown signal, draining in-flight tasks...")
+        stopping.set()
+        if consumer:
+            consumer.cancel()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, request_stop)
+
     try:
-        # Kết nối đến RabbitMQ
-        await rabbitmq_service.connect()
-        logger.info("Connected to RabbitMQ")
-        
+        # Kết nối đến MongoDB, Redis và RabbitMQ
+        await container.start()
+        logger.info("Connected to services")
+
         # Bắt đầu tiêu thụ messages
-        await rabbitmq_service.consume_crawl_tasks(process_crawl_task)
-        
+        if not stopping.is_set():
+            consumer = asyncio.create_task(
+                container.rabbitmq_service.consume_crawl_tasks(container.crawl_service.process_crawl_task)
+            )
+            await consumer
+    except asyncio.CancelledError:
+        logger.info("Consumer stopped")
     except Exception as e:
         logger.error(f"Error consuming messages: {str(e)}")
     finally:
-        await rabbitmq_service.close()
-        logger.info("Disconnected from RabbitMQ")
+        await container.close()
+        logger.info("Disconnected from services")
 
-if __name__ == "__main__":
+def run_worker():
+    """Điểm vào của mỗi process worker, mỗi process có event loop riêng"""
     try:
         asyncio.run(consume_messages())
     except KeyboardInterrupt:
-        logger.info("Stopping consumer...")
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}") 
\ No newline at end of file
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl worker độc lập, tiêu thụ crawl_data_queue")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("CRAWL_WORKER_PROCESSES", 1)),
+                        help="Số process worker")
+    parser.add_argument("--workers", type=int, help="Số worker coroutine mỗi process (CRAWL_CONSUMER_WORKERS)")
+    parser.add_argument("--prefetch", type=int, help="prefetch_count mỗi process (RABBITMQ_PREFETCH_COUNT)")
+    args = parser.parse_args()
+
+    # Cấu hình dùng chung cho mọi process con được truyền qua biến môi trường
+    if args.workers:
+        os.environ["CRAWL_CONSUMER_WORKERS"] = str(args.workers)
+    if args.prefetch:
+        os.environ["RABBITMQ_PREFETCH_COUNT"] = str(args.prefetch)
+
+    if args.processes <= 1:
+        run_worker()
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, name=f"crawl-worker-{index}")
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {len(processes)} crawl worker processes")
+
+    def forward_signal(signum, frame):
+        # Chuyển tín hiệu dừng cho các process con để chúng drain task đang xử lý
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+
+    for process in processes:
+        process.join()
+    logger.info("All crawl worker processes stopped")
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,9 @@ from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from app.services.rabbitmq_service import RabbitMQService
-from app.services.redis_service import RedisService
 import asyncio
 import logging
-from app.services.crawl_service import CrawlService
+from app.services.container import get_container
 
 # Cấu hình logging
 logging.basicConfig(
@@ -19,21 +17,20 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Khởi tạo services
-rabbitmq_service = RabbitMQService()
-redis_service = RedisService()
-crawl_service = CrawlService()
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler cho FastAPI app"""
     try:
-        # Khởi tạo kết nối RabbitMQ
-        await rabbitmq_service.connect()
-        logger.info("Connected to RabbitMQ")
+        # Khởi tạo container chứa các service dùng chung (một Motor client, một Redis pool, một kết nối RabbitMQ)
+        container = get_container()
+        rabbitmq_service = container.rabbitmq_service
+        redis_service = container.redis_service
+        crawl_service = container.crawl_service
+
+        # Khởi tạo kết nối MongoDB, Redis và RabbitMQ
+        await container.start()
+        logger.info("Connected to MongoDB, Redis and RabbitMQ")
         
-        # Khởi tạo kết nối Redis và bắt đầu cập nhật
-        await redis_service.connect()
         # Bắt đầu cập nhật Redis trong background
         await redis_service.start_update_loop()
         logger.info("Connected to Redis and started update loop")
@@ -46,10 +43,13 @@ async def lifespan(app: FastAPI):
         
         yield  # App đang chạy
         
-        # Cleanup khi shutdown
+        # Cleanup khi shutdown: dừng consumer và chờ các task đang xử lý hoàn thành
         task.cancel()
-        await redis_service.close()
-        await rabbitmq_service.close()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await container.close()
         logger.info("Disconnected from services")
     except Exception as e:
         logger.error(f"Error in lifespan: {str(e)}")
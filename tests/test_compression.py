@@ -0,0 +1,54 @@
+import pytest
+from app.services.compression import CompressionError, TextCodec, build_dictionary
+
+SAMPLES = [
+    "Hà Nội là thủ đô của nước Cộng hòa Xã hội chủ nghĩa Việt Nam.",
+    "Thành phố Hồ Chí Minh là thành phố lớn nhất của nước Cộng hòa Xã hội chủ nghĩa Việt Nam.",
+    "Đà Nẵng là một thành phố trực thuộc trung ương của nước Cộng hòa Xã hội chủ nghĩa Việt Nam.",
+]
+TEXT = "Huế là một thành phố của nước Cộng hòa Xã hội chủ nghĩa Việt Nam."
+
+
+def test_round_trip_without_dictionary():
+    codec = TextCodec(algorithm="zlib", level=6)
+    assert codec.decompress(codec.compress(TEXT)) == TEXT
+
+
+def test_round_trip_with_dictionary():
+    codec = TextCodec(algorithm="zlib", level=6, dictionary=build_dictionary(SAMPLES))
+    assert codec.decompress(codec.compress(TEXT)) == TEXT
+
+
+def test_previous_dictionary_still_decodes_after_change():
+    old_dictionary = build_dictionary(SAMPLES)
+    new_dictionary = build_dictionary(SAMPLES + [TEXT, TEXT])
+    assert old_dictionary != new_dictionary
+    old_payload = TextCodec(algorithm="zlib", level=6, dictionary=old_dictionary).compress(TEXT)
+
+    codec = TextCodec(algorithm="zlib", level=6, dictionary=new_dictionary, previous_dictionaries=[old_dictionary])
+    assert codec.decompress(old_payload) == TEXT
+    assert codec.decompress(codec.compress(TEXT)) == TEXT
+
+
+def test_missing_dictionary_is_reported():
+    old_payload = TextCodec(algorithm="zlib", level=6, dictionary=build_dictionary(SAMPLES)).compress(TEXT)
+    codec = TextCodec(algorithm="zlib", level=6, dictionary=build_dictionary(SAMPLES + [TEXT, TEXT]))
+    with pytest.raises(CompressionError, match="TEXT_COMPRESSION_PREVIOUS_DICTS"):
+        codec.decompress(old_payload)
+
+
+def test_invalid_payload_is_rejected():
+    codec = TextCodec(algorithm="zlib", level=6)
+    with pytest.raises(CompressionError):
+        codec.decompress(b"xx")
+    with pytest.raises(CompressionError):
+        codec.decompress(b"NOTZLIB-PAYLOAD")
+
+
+def test_document_fields_round_trip():
+    codec = TextCodec(algorithm="zlib", level=6)
+    fields = codec.encode_fields(TEXT)
+    assert fields["compression"] == "zlib"
+    assert codec.decode_document(fields) == TEXT
+    # Document cũ không nén
+    assert TextCodec(algorithm="none").decode_document({"text": TEXT}) == TEXT
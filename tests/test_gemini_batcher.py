@@ -0,0 +1,92 @@
+import asyncio
+import json
+from app.services.gemini_batcher import GeminiBatcher, parse_batch_response
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiService:
+    """Trả lời batch theo kịch bản và ghi lại các lời gọi đơn lẻ"""
+
+    def __init__(self, batch_replies):
+        self.batch_replies = list(batch_replies)
+        self.batch_calls = 0
+        self.single_calls = []
+        self.active_single = 0
+        self.max_active_single = 0
+
+    async def generate(self, prompt, max_output_tokens=0):
+        self.batch_calls += 1
+        reply = self.batch_replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return FakeResponse(reply)
+
+    async def _extract_topic_uncached(self, user_input, language):
+        self.single_calls.append(user_input)
+        self.active_single += 1
+        self.max_active_single = max(self.max_active_single, self.active_single)
+        await asyncio.sleep(0.01)
+        self.active_single -= 1
+        return [f"single:{user_input}"]
+
+
+def test_parse_keeps_valid_entries_only():
+    text = "```json\n" + json.dumps({"results": [
+        {"id": 0, "topics": ["Hà Nội"]},
+        {"id": 1, "topics": []},
+        {"id": 2, "topics": ["ok", 3]},
+        {"id": 7, "topics": ["out of range"]},
+        {"id": "3", "topics": ["string id"]},
+        "not an object",
+        {"id": 4, "topics": ["Huế", "Đà Nẵng"]}
+    ]}, ensure_ascii=False) + "\n```"
+    assert parse_batch_response(text, 5) == {0: ["Hà Nội"], 4: ["Huế", "Đà Nẵng"]}
+
+
+def test_parse_invalid_response():
+    assert parse_batch_response("no json here", 2) == {}
+    assert parse_batch_response("{not valid json}", 2) == {}
+    assert parse_batch_response('{"other": []}', 2) == {}
+
+
+async def test_missing_items_fall_back_to_single_calls():
+    reply = json.dumps({"results": [{"id": 0, "topics": ["a"]}, {"id": 2, "topics": ["c"]}]})
+    service = FakeGeminiService([reply])
+    batcher = GeminiBatcher(service, window=0.01, max_batch_size=3)
+
+    results = await asyncio.gather(*(batcher.submit(text, "vi") for text in ("x", "y", "z")))
+
+    assert results == [["a"], ["single:y"], ["c"]]
+    assert service.batch_calls == 1
+    assert service.single_calls == ["y"]
+
+
+async def test_failed_batch_is_retried():
+    reply = json.dumps({"results": [{"id": 0, "topics": ["a"]}, {"id": 1, "topics": ["b"]}]})
+    service = FakeGeminiService([RuntimeError("429"), reply])
+    batcher = GeminiBatcher(service, window=0.01, max_batch_size=2)
+    batcher.retry_delay = 0.01
+
+    results = await asyncio.gather(batcher.submit("x", "vi"), batcher.submit("y", "vi"))
+
+    assert results == [["a"], ["b"]]
+    assert service.batch_calls == 2
+    assert service.single_calls == []
+
+
+async def test_fallback_concurrency_is_bounded():
+    service = FakeGeminiService([RuntimeError("429")] * 3)
+    batcher = GeminiBatcher(service, window=0.01, max_batch_size=8)
+    batcher.retry_delay = 0.01
+    batcher._fallback_semaphore = asyncio.Semaphore(2)
+
+    texts = [f"t{i}" for i in range(8)]
+    results = await asyncio.gather(*(batcher.submit(text, "vi") for text in texts))
+
+    assert results == [[f"single:{text}"] for text in texts]
+    assert service.batch_calls == batcher.retries + 1
+    assert service.max_active_single == 2
@@ -0,0 +1,107 @@
+import pytest
+import xml.etree.ElementTree as ET
+from app.services.pubmed_client import PubMedClient
+
+
+def article_xml(pmid, title, abstract=None, doi=None):
+    abstract_xml = f"<Abstract><AbstractText Label=\"BACKGROUND\">{abstract}</AbstractText></Abstract>" if abstract else ""
+    doi_xml = f"<ArticleIdList><ArticleId IdType=\"doi\">{doi}</ArticleId></ArticleIdList>" if doi else ""
+    return (
+        "<PubmedArticle><MedlineCitation>"
+        f"<PMID>{pmid}</PMID>"
+        "<Article><Journal><Title>Test Journal</Title>"
+        "<JournalIssue><PubDate><Year>2024</Year><Month>Jan</Month></PubDate></JournalIssue></Journal>"
+        f"<ArticleTitle>{title}</ArticleTitle>{abstract_xml}"
+        "<AuthorList><Author><LastName>Nguyen</LastName><ForeName>An</ForeName></Author></AuthorList>"
+        "</Article></MedlineCitation>"
+        f"<PubmedData>{doi_xml}</PubmedData></PubmedArticle>"
+    )
+
+
+PAYLOAD = (
+    "<?xml version=\"1.0\" ?><PubmedArticleSet>"
+    + article_xml("1", "First <i>article</i>", "Abstract one.", "10.1/one")
+    + article_xml("2", "No abstract")
+    + article_xml("3", "Third article", "Abstract three.")
+    + "</PubmedArticleSet>"
+).encode("utf-8")
+
+
+class FakeContent:
+    def __init__(self, data):
+        self.data = data
+        self.read = 0
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.data), size):
+            self.read += 1
+            yield self.data[start:start + size]
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    closed = False
+
+    def __init__(self, data):
+        self.content = FakeContent(data)
+        self.requests = []
+
+    def post(self, url, data=None):
+        self.requests.append((url, data))
+        return FakeResponse(self.content)
+
+
+def make_client(data, chunk_size):
+    client = PubMedClient(api_url="http://pubmed.test", chunk_size=chunk_size)
+    client._session = FakeSession(data)
+    return client
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 16])
+async def test_efetch_parses_articles_across_chunks(chunk_size):
+    client = make_client(PAYLOAD, chunk_size)
+
+    records = await client.efetch(["1", "2", "3"])
+
+    # Bài không có abstract bị bỏ qua
+    assert [record.title for record in records] == ["First article", "Third article"]
+    first = records[0]
+    assert first.abstract == "BACKGROUND: Abstract one."
+    assert first.doi == "10.1/one"
+    assert first.url == "https://pubmed.ncbi.nlm.nih.gov/1/"
+    assert first.journal == "Test Journal"
+    assert first.published == "2024-Jan"
+    assert first.authors == ["Nguyen, An"]
+    url, data = client._session.requests[0]
+    assert url == "http://pubmed.test/efetch.fcgi"
+    assert data["id"] == "1,2,3"
+
+
+async def test_efetch_stops_reading_at_limit():
+    client = make_client(PAYLOAD, 32)
+
+    records = await client.efetch(["1", "2", "3"], limit=1)
+
+    assert [record.title for record in records] == ["First article"]
+    # Dừng trước khi đọc hết response
+    assert client._session.content.read < -(-len(PAYLOAD) // 32)
+
+
+async def test_efetch_rejects_invalid_xml():
+    client = make_client(b"<PubmedArticleSet><PubmedArticle></PubmedArticleSet>", 16)
+
+    with pytest.raises(ET.ParseError):
+        await client.efetch(["1"])
@@ -0,0 +1,130 @@
+from pymongo.errors import BulkWriteError
+from app.services.mongodb_service import MongoDBService
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeCollection:
+    """Collection trong bộ nhớ với unique index tùy chọn, đủ cho store_result_documents"""
+
+    def __init__(self, unique_key=None):
+        self.documents = {}
+        self.unique_key = unique_key
+        # Gọi ngay trước insert_many, dùng để giả lập worker khác vừa lưu cùng nội dung
+        self.before_insert = None
+
+    def find(self, query, projection=None):
+        values = set(query["content_hash"]["$in"])
+        return FakeCursor([dict(doc) for doc in self.documents.values() if doc.get("content_hash") in values])
+
+    def _key(self, document):
+        return tuple(document.get(field) for field in self.unique_key) if self.unique_key else None
+
+    async def insert_many(self, documents, ordered=False):
+        if self.before_insert:
+            hook, self.before_insert = self.before_insert, None
+            hook()
+        taken = {self._key(doc) for doc in self.documents.values()} if self.unique_key else set()
+        errors = []
+        for index, document in enumerate(documents):
+            key = self._key(document)
+            if key is not None and key in taken:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+                continue
+            taken.add(key)
+            self.documents[document["_id"]] = dict(document)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+
+    async def bulk_write(self, operations, ordered=False):
+        for operation in operations:
+            # UpdateOne không có API công khai để đọc filter/update
+            document = self.documents[operation._filter["_id"]]
+            document.update(operation._doc.get("$set", {}))
+            for field, value in operation._doc.get("$addToSet", {}).items():
+                for item in value["$each"]:
+                    if item not in document.setdefault(field, []):
+                        document[field].append(item)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.tasks = FakeCollection()
+        self.results = FakeCollection(unique_key=("content_hash", "source", "language"))
+        self.result_aliases = FakeCollection()
+
+
+class FakeClient:
+    def __init__(self):
+        self.data_management = FakeDatabase()
+
+
+def make_service():
+    return MongoDBService(FakeClient())
+
+
+async def test_same_content_in_one_batch_is_stored_once():
+    service = make_service()
+    first = service.build_result_document(None, "Hanoi", "wikipedia", "en", "Body")
+    second = service.build_result_document(None, "Ha Noi", "wikipedia", "en", "Body")
+
+    stored = await service.store_result_documents([first, second])
+
+    assert stored == {str(first["_id"]): str(first["_id"]), str(second["_id"]): str(first["_id"])}
+    results = service.results_collection.documents
+    assert list(results) == [first["_id"]]
+    assert results[first["_id"]]["topics"] == ["Hanoi", "Ha Noi"]
+    assert service.result_aliases_collection.documents[second["_id"]]["result_id"] == first["_id"]
+
+
+async def test_same_content_in_other_language_is_kept_apart():
+    service = make_service()
+    english = service.build_result_document(None, "Hanoi", "wikipedia", "en", "Body")
+    vietnamese = service.build_result_document(None, "Hanoi", "wikipedia", "vi", "Body")
+
+    stored = await service.store_result_documents([english, vietnamese])
+
+    assert stored[str(vietnamese["_id"])] == str(vietnamese["_id"])
+    assert len(service.results_collection.documents) == 2
+    assert not service.result_aliases_collection.documents
+
+
+async def test_existing_content_is_reused():
+    service = make_service()
+    original = service.build_result_document(None, "Hanoi", "wikipedia", "en", "Body")
+    await service.store_result_documents([original])
+
+    # Chỉ khác khoảng trắng: cùng content_hash sau khi chuẩn hóa
+    redirect = service.build_result_document(None, "Hà Nội", "wikipedia", "en", "Body ")
+    stored = await service.store_result_documents([redirect])
+
+    assert stored == {str(redirect["_id"]): str(original["_id"])}
+    assert list(service.results_collection.documents) == [original["_id"]]
+    assert service.results_collection.documents[original["_id"]]["topics"] == ["Hanoi", "Hà Nội"]
+    assert service.result_aliases_collection.documents[redirect["_id"]]["result_id"] == original["_id"]
+
+
+async def test_insert_collision_reuses_the_other_worker_result():
+    service = make_service()
+    other = service.build_result_document(None, "Hanoi", "wikipedia", "en", "Body")
+    ours = service.build_result_document(None, "Ha Noi", "wikipedia", "en", "Body")
+    unrelated = service.build_result_document(None, "Huế", "wikipedia", "en", "Other body")
+    results = service.results_collection
+    results.before_insert = lambda: results.documents.__setitem__(other["_id"], dict(other))
+
+    stored = await service.store_result_documents([ours, unrelated])
+
+    assert stored == {str(ours["_id"]): str(other["_id"]), str(unrelated["_id"]): str(unrelated["_id"])}
+    assert set(results.documents) == {other["_id"], unrelated["_id"]}
+    assert results.documents[other["_id"]]["topics"] == ["Hanoi", "Ha Noi"]
+    assert service.result_aliases_collection.documents[ours["_id"]]["result_id"] == other["_id"]
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from app.services.single_flight import SingleFlight
+
+
+class FakeRedis:
+    """Các lệnh Redis mà SingleFlight dùng, có hết hạn theo px"""
+
+    def __init__(self):
+        self.values = {}
+        self.lease_ttls = []
+
+    def _get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self.values.pop(key, None)
+            return None
+        return value
+
+    def _set(self, key, value, px):
+        self.values[key] = (value, time.monotonic() + px / 1000 if px else None)
+
+    async def get(self, key):
+        return self._get(key)
+
+    async def mget(self, *keys):
+        return [self._get(key) for key in keys]
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and self._get(key) is not None:
+            return None
+        if key.endswith(":lease"):
+            self.lease_ttls.append(px)
+        self._set(key, value, px)
+        return True
+
+    def register_script(self, source):
+        async def release(keys, args):
+            lease_key, done_key = keys
+            token, payload, done_ttl = args
+            if self._get(lease_key) == token:
+                self.values.pop(lease_key, None)
+            self._set(done_key, payload, int(done_ttl))
+            return 1
+        return release
+
+
+class FakeRedisService:
+    healthy = True
+
+    def __init__(self, client):
+        self.redis_client = client
+
+
+def make_workers(count=2, **kwargs):
+    """Các SingleFlight dùng chung một Redis, mỗi cái giống một process riêng"""
+    client = FakeRedis()
+    kwargs.setdefault("poll_interval", 0.005)
+    kwargs.setdefault("max_poll_interval", 0.02)
+    return client, [SingleFlight(FakeRedisService(client), "test", **kwargs) for _ in range(count)]
+
+
+async def follow(value):
+    return ("follower", value)
+
+
+async def test_only_one_leader_across_workers():
+    _, (first, second) = make_workers()
+    calls = []
+
+    async def lead():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ("leader", "id1"), "id1"
+
+    results = await asyncio.gather(*(worker.run("key", lead, follow) for worker in (first, first, second, second)))
+
+    assert len(calls) == 1
+    # Cùng process dùng chung future của leader, process khác dựng lại từ payload
+    assert results == [("leader", "id1"), ("leader", "id1"), ("follower", "id1"), ("follower", "id1")]
+
+
+async def test_late_caller_reuses_stored_result():
+    _, (first, second) = make_workers()
+
+    async def lead():
+        return ("leader", "id1"), "id1"
+
+    assert await first.run("key", lead, follow) == ("leader", "id1")
+    assert await second.run("key", lead, follow) == ("follower", "id1")
+
+
+async def test_follower_runs_itself_when_leader_fails():
+    _, (first, second) = make_workers()
+
+    async def failing_lead():
+        await asyncio.sleep(0.02)
+        raise RuntimeError("upstream down")
+
+    async def lead():
+        return ("own", "id2"), "id2"
+
+    leader_task = asyncio.create_task(first.run("key", failing_lead, follow))
+    await asyncio.sleep(0.005)
+    follower_result = await second.run("key", lead, follow)
+
+    assert follower_result == ("own", "id2")
+    assert isinstance((await asyncio.gather(leader_task, return_exceptions=True))[0], RuntimeError)
+
+
+async def test_lease_ttl_per_call():
+    client, (worker,) = make_workers(count=1, lease_ttl=30)
+
+    async def lead():
+        return ("leader", "id1"), "id1"
+
+    await worker.run("a", lead, follow)
+    await worker.run("b", lead, follow, lease_ttl=50)
+
+    assert client.lease_ttls == [30000, 50000]
+
+
+async def test_follower_waits_as_long_as_the_lease():
+    _, (first, second) = make_workers(lease_ttl=0.02)
+    calls = []
+
+    async def slow_lead():
+        calls.append("leader")
+        await asyncio.sleep(0.1)
+        return ("leader", "id1"), "id1"
+
+    async def lead():
+        calls.append("follower")
+        return ("own", "id2"), "id2"
+
+    # Lease mặc định ngắn hơn leader: follower tự làm lại; lease theo thời hạn của leader thì không
+    leader_task = asyncio.create_task(first.run("short", slow_lead, follow))
+    await asyncio.sleep(0.005)
+    assert await second.run("short", lead, follow) == ("own", "id2")
+    await leader_task
+
+    calls.clear()
+    leader_task = asyncio.create_task(first.run("long", slow_lead, follow, lease_ttl=1))
+    await asyncio.sleep(0.005)
+    assert await second.run("long", lead, follow, lease_ttl=1) == ("follower", "id1")
+    await leader_task
+    assert calls == ["leader"]
+
+
+async def test_without_redis_calls_are_coalesced_in_process():
+    worker = SingleFlight(None, "test")
+    calls = []
+
+    async def lead():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ("leader", "id1"), "id1"
+
+    results = await asyncio.gather(*(worker.run("key", lead, follow) for _ in range(3)))
+
+    assert len(calls) == 1
+    assert results == [("leader", "id1")] * 3